@@ -4,13 +4,73 @@ import os
 from model_config import *
 from ollama import *
 from operations.detect_objects import *
+from operations.detect_hazards import *
 from operations.detect_scene import *
+from operations.extract_features import *
 from operations.detect_text import *
 from operations.detect_currency import *
+from operations.route_locally import *
+from operations.track_focus import *
+from pipeline import *
+from result_encoding import (
+    RESULT_FORMAT_COMPACT,
+    class_table_payload,
+    encode_response,
+    forget_client_result_format,
+    set_client_result_format,
+)
+from circuit_breaker import get_breaker_states
+from metrics import (
+    ACTIVE_SOCKETS,
+    REQUEST_LATENCY,
+    REQUESTS_IN_FLIGHT,
+    observe_stage,
+    render_metrics,
+)
+from tracing import (
+    configure_tracing,
+    finish_trace,
+    get_sample_rate,
+    maybe_start_trace,
+    set_sample_rate,
+)
+from profiling import (
+    PROFILE_MODES,
+    profiling_status,
+    start_profiling,
+    start_request_profile,
+    stop_request_profile,
+)
+from request_context import (
+    RequestContext,
+    DeadlineExceeded,
+    begin_request,
+    end_request,
+)
+from db import init_db, insert_history_rows
+from history_writer import configure_history_writer, record_history
+from user_settings import (
+    bind_session_user,
+    configure_user_settings,
+    forget_session_user,
+    get_session_email,
+    get_session_settings,
+    get_user_record,
+    normalize_customization,
+    update_user_customization,
+)
+from user_auth import (
+    auth_enabled,
+    authenticate_user,
+    bearer_token,
+    configure_user_auth,
+    issue_user_token,
+    token_email,
+)
 
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"  # Keep if needed
 
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
 import cv2
@@ -40,6 +100,15 @@ template_dir = os.path.abspath(
 )
 app = Flask(__name__, template_folder=template_dir)
 CORS(app)
+configure_tracing(TRACE_SAMPLE_RATE, TRACE_OUTPUT_PATH, TRACE_OTLP_ENDPOINT)
+init_db(app)
+configure_user_settings(app, USER_SETTINGS_CACHE_SIZE, USER_SETTINGS_CACHE_TTL)
+configure_user_auth(app, USER_AUTH_SECRET, USER_TOKEN_MAX_AGE)
+start_ollama_session()
+if HISTORY_ENABLED:
+    configure_history_writer(
+        insert_history_rows, HISTORY_BATCH_SIZE, HISTORY_FLUSH_INTERVAL, HISTORY_MAX_BUFFER
+    )
 socketio = SocketIO(
     app,
     cors_allowed_origins="*",
@@ -52,15 +121,45 @@ socketio = SocketIO(
 @socketio.on("connect")
 def handle_connect():
     logger.info(f"Client connected: {request.sid}")
+    ACTIVE_SOCKETS.inc()
     emit(
         "response",
         {"event": "connect", "result": {"status": "connected", "id": request.sid}},
     )
+    # Settings are bound only for a valid ?token= from /login (see user_auth.py)
+    user_email = token_email(request.args.get("token"), request.args.get("email"))
+    if user_email is None and (request.args.get("token") or request.args.get("email")):
+        logger.warning(f"[{request.sid}] Unauthenticated settings binding ignored.")
+    user_settings = bind_session_user(request.sid, user_email) if user_email else None
+    result_format = request.args.get("result_format")
+    if not result_format and user_settings and user_settings.compact_results:
+        result_format = RESULT_FORMAT_COMPACT
+    if result_format:
+        handle_set_result_format({"format": result_format})
 
 
 @socketio.on("disconnect")
 def handle_disconnect():
     logger.info(f"Client disconnected: {request.sid}")
+    ACTIVE_SOCKETS.dec()
+    forget_client_ocr_language(request.sid)
+    forget_focus_tracker(request.sid)
+    forget_client_route(request.sid)
+    forget_client_result_format(request.sid)
+    forget_session_user(request.sid)
+
+
+@socketio.on("set_result_format")
+def handle_set_result_format(data):
+    # {"format": "compact"} switches detection responses to packed bytes; "json" switches back
+    result_format = data.get("format") if isinstance(data, dict) else None
+    if not set_client_result_format(request.sid, result_format):
+        logger.warning(f"Client {request.sid} requested unknown result format '{result_format}'.")
+        emit("response", error_payload(f"Unsupported result format '{result_format}'"))
+        return
+    logger.info(f"Client {request.sid} result format: {result_format}")
+    if result_format == RESULT_FORMAT_COMPACT:
+        emit("class_table", class_table_payload(TARGET_CLASSES))
 
 
 @socketio.on("message")
@@ -70,323 +169,135 @@ def handle_message(data):
     detection_type_from_payload = "unknown"
     supervision_request_type = None
     final_response_payload = None
+    request_status = None
+    request_ctx = RequestContext(client_sid, start_time=start_time)
+    request_ctx.user_settings = get_session_settings(client_sid)
+    request_ctx.trace = maybe_start_trace("handle_message", {"client_sid": client_sid})
+    request_ctx_token = begin_request(request_ctx)
+    request_profile = start_request_profile()
+    REQUESTS_IN_FLIGHT.inc()
 
     try:
-        if not isinstance(data, dict):
-            logger.warning(
-                f"Invalid data format from {client_sid}. Expected dict, got {type(data)}."
-            )
-            emit(
-                "response",
-                {"result": {"status": "error", "message": "Invalid data format"}},
-            )
+        invalid_payload = validate_message(data, client_sid)
+        if invalid_payload:
+            emit("response", invalid_payload)
             return
 
-        image_data = data.get("image")
         detection_type_from_payload = data.get("type")
         supervision_request_type = data.get(
             "request_type"
         )  # Will be None if not present
-        if not image_data or not detection_type_from_payload:
-            logger.warning(
-                f"Missing 'image' or 'type' from {client_sid}. Payload: {data}"
-            )
-            emit(
-                "response",
-                {"result": {"status": "error", "message": "Missing 'image' or 'type'"}},
-            )
-            return
+        is_supervision = is_supervision_request(
+            detection_type_from_payload, supervision_request_type
+        )
+        request_ctx.feature = request_feature(detection_type_from_payload)
+        if is_supervision:
+            request_ctx.origin = "supervision"
+        request_ctx.set_budget(
+            resolve_request_budget(data, detection_type_from_payload)
+        )
 
         try:
-            if image_data.startswith("data:image"):
-                _, encoded = image_data.split(",", 1)
-            else:
-                encoded = image_data  # Assume it's already base64 if no prefix
-            image_bytes = base64.b64decode(encoded)
-            image_np_buffer = np.frombuffer(image_bytes, np.uint8)
-            image_np = cv2.imdecode(image_np_buffer, cv2.IMREAD_COLOR)
-
-            if image_np is None:
-                raise ValueError(
-                    "cv2.imdecode returned None. Image data might be corrupt or not a supported format."
-                )
-            logger.debug(f"[{client_sid}] Image decoded. Shape: {image_np.shape}")
+            image_bytes, image_np = decode_request_frame(data, client_sid)
+            request_ctx.frame = image_np
+            request_ctx.frame_bytes = image_bytes
         except Exception as decode_err:
             logger.error(
                 f"Image decode error for {client_sid}: {decode_err}", exc_info=True
             )
-            emit(
-                "response",
-                {"result": {"status": "error", "message": "Invalid image data"}},
-            )
+            emit("response", error_payload("Invalid image data"))
+            request_status = "invalid_image"
             return
 
-        if (
-            detection_type_from_payload == "supervision"
-            and supervision_request_type == "llm_route"
-        ):
+        final_response_payload = frame_quality_payload(
+            image_np, detection_type_from_payload, is_supervision, client_sid
+        )
+        if final_response_payload:
+            emit("response", final_response_payload)
+            return
+
+        if is_supervision:
             logger.info(
                 f"Handling SuperVision LLM routing request from {client_sid}..."
             )
-            # Ensure OLLAMA_MODEL_NAME and OLLAMA_API_URL are available for get_llm_feature_choice
-            # These should be imported from model_config.py
-            chosen_feature_by_llm = get_llm_feature_choice(image_np, client_sid)
-            supervision_string_result = "Error: LLM feature execution failed"
+            # Near-duplicate of the last routed frame, or a confident routing head
+            chosen_feature_by_llm = run_scheduled(
+                "local_routing", get_embedding_feature_choice, image_np, client_sid
+            )
+            if not chosen_feature_by_llm and not request_ctx.user_settings.prefer_local_routing:
+                with observe_stage("routing"):
+                    chosen_feature_by_llm = get_llm_feature_choice(image_np, client_sid)
+            if not chosen_feature_by_llm:
+                # Ollama failed or its circuit is open: route on-device instead of erroring out
+                logger.warning(
+                    f"[{client_sid}] LLM routing unavailable. Falling back to local routing."
+                )
+                request_ctx.check("local_routing")
+                chosen_feature_by_llm = run_scheduled(
+                    "local_routing", get_local_feature_choice, image_np, client_sid
+                )
 
             if chosen_feature_by_llm:
                 logger.info(
                     f"[{client_sid}] LLM selected: {chosen_feature_by_llm}. Running detection..."
                 )
-                try:
-                    if (
-                        chosen_feature_by_llm == "object_detection"
-                        or chosen_feature_by_llm == "hazard_detection"
-                    ):
-                        obj_dict_result = detect_objects(image_np)
-                        if obj_dict_result.get(
-                            "status"
-                        ) == "ok" and obj_dict_result.get("detections"):
-                            names = [d["name"] for d in obj_dict_result["detections"]]
-                            supervision_string_result = (
-                                ", ".join(names)
-                                if names
-                                else "No objects detected by SuperVision"
-                            )
-                        elif obj_dict_result.get("status") == "none":
-                            supervision_string_result = (
-                                "No objects detected by SuperVision"
-                            )
-                        else:
-                            supervision_string_result = obj_dict_result.get(
-                                "message",
-                                f"Object/Hazard detection issue for SuperVision: {obj_dict_result.get('status')}",
-                            )
-                    elif chosen_feature_by_llm == "scene_detection":
-                        scene_label = detect_scene(image_np)
-                        if "Error" in scene_label or "Unknown" in scene_label:
-                            supervision_string_result = f"Scene analysis: {scene_label}"
-                        else:
-                            supervision_string_result = (
-                                f"The scene is likely a {scene_label}."
-                            )
-                    elif chosen_feature_by_llm == "text_detection":
-                        # detect_text returns a string of detected text or an error/no text message
-                        text_content = detect_text(
-                            image_np, DEFAULT_OCR_LANG
-                        )  # DEFAULT_OCR_LANG from model_config
-                        # DEFAULT_OCR_LANG should be available from `from model_config import *`
-                        text_content = detect_text(image_np, DEFAULT_OCR_LANG)
-                        if "Error" in text_content:
-                            supervision_string_result = f"Text analysis: {text_content}"
-                        elif "No text detected" in text_content:
-                            supervision_string_result = "No text found in the image."
-                        else:
-                            supervision_string_result = (
-                                f"The image contains the following text: {text_content}"
-                            )
-                            logger.info(
-                                f"[{client_sid}] Text detected by OCR (Supervision), attempting LLM cleaning. Original length: {len(text_content)}"
-                            )
-                            cleaned_text = clean_text_with_llm(text_content, client_sid)
-                            if cleaned_text:
-                                supervision_string_result = cleaned_text
-                                logger.info(
-                                    f"[{client_sid}] Text cleaning successful (Supervision). Cleaned length: {len(cleaned_text)}"
-                                )
-                            else:
-                                supervision_string_result = text_content
-                                logger.warning(
-                                    f"[{client_sid}] Text cleaning failed (Supervision). Using original OCR text."
-                                )
-                    elif chosen_feature_by_llm == "currency_detection":
-                        currency_output = detect_currency(image_np)
-                        if currency_output.get("status") == "ok":
-                            supervision_string_result = f"Detected currency: {currency_output.get('currency', 'Unknown currency')}"
-                        elif currency_output.get("status") == "none":
-                            supervision_string_result = (
-                                "No currency detected by SuperVision"
-                            )
-                        else:
-                            supervision_string_result = currency_output.get(
-                                "message", "Currency detection issue for SuperVision"
-                            )
-                    else:
-                        logger.error(
-                            f"[{client_sid}] Invalid feature '{chosen_feature_by_llm}' from LLM."
-                        )
-                        supervision_string_result = (
-                            "Error: Invalid analysis type by LLM"
-                        )
-
-                    final_response_payload = {
-                        "result": supervision_string_result,
-                        "feature_id": chosen_feature_by_llm,
-                        "is_from_supervision_llm": True,
-                    }
-                except Exception as exec_e:
-                    logger.error(
-                        f"[{client_sid}] Error executing selected LLM feature '{chosen_feature_by_llm}': {exec_e}",
-                        exc_info=True,
-                    )
-                    final_response_payload = {
-                        "result": f"Error running {chosen_feature_by_llm}",
-                        "feature_id": chosen_feature_by_llm,
-                        "is_from_supervision_llm": True,
-                    }
-            else:
-                logger.error(
-                    f"[{client_sid}] Failed to get feature choice from Ollama."
+                request_ctx.check(chosen_feature_by_llm)
+                request_ctx.feature = chosen_feature_by_llm  # Label later stages by the routed feature
+                remember_routing_choice(image_np, chosen_feature_by_llm, client_sid)
+                final_response_payload = run_scheduled(
+                    chosen_feature_by_llm,
+                    run_supervision_feature,
+                    chosen_feature_by_llm,
+                    image_np,
+                    client_sid,
                 )
-                final_response_payload = {
-                    "result": "Error: Smart analysis failed (LLM issue)",
-                    "feature_id": "supervision_error",
-                    "is_from_supervision_llm": True,
-                }
+            else:
+                final_response_payload = supervision_routing_failed_payload(client_sid)
         else:  # Direct request (not LLM routed supervision)
-            logger.info(
-                f"Processing direct request '{detection_type_from_payload}' from {client_sid}"
+            request_ctx.check(detection_type_from_payload)
+            detection_function_output = run_scheduled(
+                detection_type_from_payload,
+                run_direct_feature,
+                detection_type_from_payload,
+                image_np,
+                data,
+                client_sid,
             )
-            detection_function_output = {
-                "status": "error",
-                "message": "Error: Unknown processing error",
-            }  # Default
-            if detection_type_from_payload == "object_detection":
-                detection_function_output = detect_objects(image_np)
-            elif detection_type_from_payload == "focus_detection":
-                focus_object_name = data.get("focus_object")
-                if not focus_object_name:
-                    logger.warning(
-                        f"Direct focus_detection from {client_sid} missing 'focus_object'."
-                    )
-                    detection_function_output = {
-                        "status": "error",
-                        "message": "Missing 'focus_object' for focus detection",
-                    }
-                else:
-                    detection_function_output = detect_objects(
-                        image_np, focus_object=focus_object_name
-                    )
-            elif detection_type_from_payload == "scene_detection":
-                scene_label = detect_scene(image_np)  # Returns a string
-                if "Error" in scene_label:  # detect_scene indicates error with "Error"
-                    detection_function_output = {
-                        "status": "error",
-                        "message": scene_label,
-                    }
-                elif (
-                    "Unknown" in scene_label
-                ):  # detect_scene indicates no confident detection with "Unknown"
-                    detection_function_output = {"status": "none", "scene": scene_label}
-                else:
-                    detection_function_output = {"status": "ok", "scene": scene_label}
-            elif detection_type_from_payload == "text_detection":
-                # DEFAULT_OCR_LANG and SUPPORTED_OCR_LANGS should be from model_config
-                requested_language = data.get("language", DEFAULT_OCR_LANG).lower()
-                validated_language = (
-                    requested_language
-                    if requested_language in SUPPORTED_OCR_LANGS
-                    else DEFAULT_OCR_LANG
-                )
-                if validated_language != requested_language:
-                    logger.warning(
-                        f"Client {client_sid} invalid lang '{requested_language}', using '{DEFAULT_OCR_LANG}'."
-                    )
-                text_result_str = detect_text(
-                    image_np, language_code=validated_language
-                )
-                if "Error" in text_result_str:
-                    detection_function_output = {
-                        "status": "error",
-                        "message": text_result_str,
-                    }
-                elif "No text detected" in text_result_str:
-                    detection_function_output = {
-                        "status": "none",
-                        "text": text_result_str,
-                    }
-                else:
-                    detection_function_output = {
-                        "status": "ok",
-                        "text": text_result_str,
-                    }
-            elif (
-                detection_type_from_payload == "hazard_detection"
-            ):  # Assumes detect_objects handles this
-                detection_function_output = detect_objects(
-                    image_np
-                )  # Or a specialized hazard function
-                logger.info(
-                    f"[{client_sid}] Text detected by OCR (Direct), attempting LLM cleaning. Original length: {len(text_result_str)}"
-                )
-                cleaned_text = clean_text_with_llm(text_result_str, client_sid)
-                if cleaned_text:
-                    detection_function_output = {
-                        "status": "ok",
-                        "text": cleaned_text,
-                    }
-                    logger.info(
-                        f"[{client_sid}] Text cleaning successful (Direct). Cleaned length: {len(cleaned_text)}"
-                    )
-                else:
-                    detection_function_output = {
-                        "status": "ok",
-                        "text": text_result_str,
-                        "warning": "Text cleaning by LLM failed, showing original OCR text.",
-                    }
-                    logger.warning(
-                        f"[{client_sid}] Text cleaning failed (Direct). Using original OCR text."
-                    )
-            elif detection_type_from_payload == "hazard_detection":
-                detection_function_output = detect_objects(image_np)
-            elif detection_type_from_payload == "currency_detection":
-                detection_function_output = detect_currency(image_np)  # Returns dict
-            else:
-                logger.warning(
-                    f"Unsupported direct type '{detection_type_from_payload}' from {client_sid}"
-                )
-                detection_function_output = {
-                    "status": "error",
-                    "message": f"Unsupported type '{detection_type_from_payload}'",
-                }
             final_response_payload = {"result": detection_function_output}
         if final_response_payload:
-            processing_time = time.time() - start_time
-            log_result_summary = str(final_response_payload.get("result", "N/A"))
-            if isinstance(final_response_payload.get("result"), dict):
-                log_result_summary = (
-                    f"Dict keys: {list(final_response_payload['result'].keys())}"
-                )
-            log_result_short = (
-                (log_result_summary[:100] + "...")
-                if len(log_result_summary) > 100
-                else log_result_summary
+            log_completion(
+                final_response_payload, detection_type_from_payload, client_sid, start_time
             )
-            log_type = final_response_payload.get(
-                "feature_id", detection_type_from_payload
-            )
-            log_origin = (
-                "Supervision(LLM)"
-                if final_response_payload.get("is_from_supervision_llm")
-                else "Direct"
-            )
-            logger.info(
-                f"Completed '{log_type}' ({log_origin}) for {client_sid} in {processing_time:.3f}s. Result summary: '{log_result_short}'"
-            )
-            emit("response", final_response_payload)
+            with observe_stage("emit"):
+                emit(
+                    "response",
+                    encode_response(
+                        final_response_payload,
+                        client_sid,
+                        detection_type_from_payload,
+                        DETECTION_CLASS_IDS,
+                    ),
+                )
         else:
             logger.error(
                 f"[{client_sid}] Failed to generate a response payload for type '{detection_type_from_payload}'."
             )
-            emit(
-                "response",
-                {
-                    "result": {
-                        "status": "error",
-                        "message": "Server Error: Failed to process request.",
-                    }
-                },
-            )
+            emit("response", error_payload("Server Error: Failed to process request."))
 
+    except DeadlineExceeded as deadline_e:
+        # The client has moved on; skip the remaining work and just release its ack
+        processing_time = time.time() - start_time
+        logger.warning(
+            f"Abandoned '{detection_type_from_payload}' for {client_sid} after {processing_time:.3f}s: {deadline_e}"
+        )
+        request_status = "deadline_exceeded"
+        emit(
+            "response",
+            error_payload(
+                "Request deadline exceeded",
+                is_supervision_request(detection_type_from_payload, supervision_request_type),
+            ),
+        )
     except Exception as e:
         processing_time = time.time() - start_time
         logger.error(
@@ -394,21 +305,44 @@ def handle_message(data):
             exc_info=True,
         )
         try:
-            error_resp = {
-                "result": {
-                    "status": "error",
-                    "message": "Internal server error during processing.",
-                }
-            }
-            if (
-                detection_type_from_payload == "supervision"
-                and supervision_request_type == "llm_route"
-            ):
-                error_resp["feature_id"] = "supervision_error"
-                error_resp["is_from_supervision_llm"] = True
-            emit("response", error_resp)
+            emit(
+                "response",
+                error_payload(
+                    "Internal server error during processing.",
+                    is_supervision_request(detection_type_from_payload, supervision_request_type),
+                ),
+            )
         except Exception as emit_e:
             logger.error(f"Failed to emit error response to {client_sid}: {emit_e}")
+    finally:
+        if request_status is None:
+            request_status = response_status(final_response_payload)
+        REQUEST_LATENCY.observe(
+            time.time() - start_time,
+            feature=request_ctx.feature or "unknown",
+            origin=request_ctx.origin,
+            status=request_status,
+        )
+        REQUESTS_IN_FLIGHT.dec()
+        record_history(
+            client_sid=client_sid,
+            user_email=get_session_email(client_sid),
+            feature=request_feature(request_ctx.feature),
+            origin=request_ctx.origin,
+            status=request_status,
+            latency_ms=(time.time() - start_time) * 1000.0,
+            result_summary=history_summary(final_response_payload),
+        )
+        stop_request_profile(request_profile)
+        finish_trace(
+            request_ctx.trace,
+            {
+                "feature": request_ctx.feature or "unknown",
+                "origin": request_ctx.origin,
+                "status": request_status,
+            },
+        )
+        end_request(request_ctx_token)
 
 
 @socketio.on_error_default
@@ -437,16 +371,131 @@ def home():
     )
 
 
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/upstreams", methods=["GET"])
+def upstream_status():
+    # Circuit breaker state for Ollama / Roboflow
+    return jsonify(get_breaker_states())
+
+
+@app.route("/resources", methods=["GET"])
+def resource_status():
+    # Thread budgets per engine, CPU utilization since the previous sample, and memory
+    return jsonify({**thread_topology.report(), "memory": process_memory()})
+
+
+def _admin_authorized():
+    return bool(ADMIN_TOKEN) and request.headers.get("X-Admin-Token") == ADMIN_TOKEN
+
+
+@app.route("/admin/profile", methods=["GET", "POST"])
+def admin_profile():
+    """
+    GET: current/last profiling window. POST: start one, e.g.
+    /admin/profile?mode=sample&seconds=30 (or mode=cprofile). Optional
+    ?trace_sample_rate=0.1 also changes the trace sampling rate.
+    """
+    if not _admin_authorized():
+        return jsonify({"status": "forbidden"}), 403
+    if request.method == "GET":
+        return jsonify({"status": "ok", **profiling_status(), "trace_sample_rate": get_sample_rate()})
+
+    if "trace_sample_rate" in request.args:
+        try:
+            set_sample_rate(float(request.args["trace_sample_rate"]))
+        except ValueError:
+            return jsonify({"status": "error", "message": "Invalid trace_sample_rate"}), 400
+    mode = request.args.get("mode")
+    if not mode:
+        return jsonify({"status": "ok", "trace_sample_rate": get_sample_rate()})
+    try:
+        seconds = min(float(request.args.get("seconds", 10)), PROFILE_MAX_SECONDS)
+    except ValueError:
+        return jsonify({"status": "error", "message": "Invalid seconds"}), 400
+    session, error = start_profiling(mode, seconds, PROFILE_OUTPUT_DIR)
+    if error:
+        return jsonify({"status": "error", "message": error, "modes": PROFILE_MODES}), 409
+    return jsonify({"status": "started", "session": session})
+
+
+def _authenticated_email(claimed_email):
+    """(email, None) for the request's bearer token, or (None, error response)."""
+    if not auth_enabled():
+        return None, (jsonify({"success": False, "message": "User accounts are disabled"}), 503)
+    email = token_email(bearer_token(request.headers.get("Authorization")), claimed_email)
+    if email is None:
+        return None, (jsonify({"success": False, "message": "Authentication required"}), 401)
+    return email, None
+
+
+@app.route("/login", methods=["POST"])
+def login():
+    if not auth_enabled():
+        return jsonify({"success": False, "message": "User accounts are disabled"}), 503
+    data = request.get_json(silent=True) or {}
+    email = data.get("email")
+    password = data.get("password")
+    if not email or not password:
+        return jsonify({"success": False, "message": "email and password are required"}), 400
+    try:
+        email = authenticate_user(email, password)
+    except Exception as e:
+        logger.error(f"Failed to check login: {e}", exc_info=True)
+        return jsonify({"success": False, "message": "Database error"}), 500
+    if email is None:
+        return jsonify({"success": False, "message": "Invalid email or password"}), 401
+    return jsonify(
+        {"success": True, "token": issue_user_token(email), "expires_in": USER_TOKEN_MAX_AGE}
+    )
+
+
 @app.route("/update_customization", methods=["POST"])
 def update_customization():
-    logger.warning("Route /update_customization hit (not implemented).")
-    return jsonify({"status": "not_implemented"}), 501
+    data = request.get_json(silent=True) or {}
+    email, error_response = _authenticated_email(data.get("email"))
+    if error_response:
+        return error_response
+    customization = normalize_customization(data.get("customization"))
+    if customization is None:
+        return (
+            jsonify({"success": False, "message": "a 0/1 customization string is required"}),
+            400,
+        )
+    try:
+        user = update_user_customization(email, customization)
+    except Exception as e:
+        logger.error(f"Failed to update customization: {e}", exc_info=True)
+        return jsonify({"success": False, "message": "Database error"}), 500
+    if user is None:
+        return jsonify({"success": False, "message": "User not found"}), 404
+    return jsonify({"success": True, "message": "Customization updated"})
 
 
 @app.route("/get_user_info", methods=["GET"])
 def get_user_info():
-    logger.warning("Route /get_user_info hit (not implemented).")
-    return jsonify({"status": "not_implemented"}), 501
+    email, error_response = _authenticated_email(request.args.get("email"))
+    if error_response:
+        return error_response
+    try:
+        user = get_user_record(email)
+    except Exception as e:
+        logger.error(f"Failed to load user info: {e}", exc_info=True)
+        return jsonify({"success": False, "message": "Database error"}), 500
+    if user is None:
+        return jsonify({"success": False, "message": "User not found"}), 404
+    return jsonify(
+        {
+            "success": True,
+            "name": user.name,
+            "email": user.email,
+            "customization": user.customization,
+            "settings": user.settings.to_dict(),
+        }
+    )
 
 
 @app.route("/add_test_user", methods=["POST"])
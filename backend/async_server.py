@@ -0,0 +1,329 @@
+# backend/async_server.py
+# asyncio deployment mode: python-socketio AsyncServer under uvicorn (ASGI) instead of
+# the threading Flask-SocketIO server in App.py. Sockets cost a coroutine instead of an
+# OS thread, Ollama routing is awaited natively with aiohttp, and the operations run on
+# bounded executors (CPU pool for models/OCR, I/O pool for calls that still block on HTTP).
+# The Flask HTTP routes (/metrics, /upstreams, /resources, /admin/...) are served from the same port.
+#
+#   python async_server.py
+#   uvicorn async_server:asgi_app --host 0.0.0.0 --port 5000
+
+import asyncio
+import contextvars
+import os
+import sys
+import time
+from urllib.parse import parse_qs
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+import socketio
+import uvicorn
+from asgiref.wsgi import WsgiToAsgi
+
+from App import app as flask_app
+from pipeline import *
+from ollama_async import get_llm_feature_choice_async
+from frame_encoding import encode_frame_base64
+from metrics import ACTIVE_SOCKETS, REQUEST_LATENCY, REQUESTS_IN_FLIGHT, observe_stage
+from tracing import finish_trace, maybe_start_trace
+from profiling import run_profiled
+from request_context import RequestContext, DeadlineExceeded, begin_request, end_request
+from history_writer import record_history
+from user_auth import token_email
+from user_settings import (
+    bind_session_user,
+    forget_session_user,
+    get_session_email,
+    get_session_settings,
+)
+from result_encoding import (
+    RESULT_FORMAT_COMPACT,
+    class_table_payload,
+    encode_response,
+    forget_client_result_format,
+    set_client_result_format,
+)
+
+sio = socketio.AsyncServer(
+    async_mode="asgi",
+    cors_allowed_origins="*",
+    max_http_buffer_size=20 * 1024 * 1024,  # 20MB
+)
+asgi_app = socketio.ASGIApp(sio, other_asgi_app=WsgiToAsgi(flask_app))
+
+cpu_executor = cpu_scheduler  # Priority-ordered (see scheduler.py); ordinary Executor API
+io_executor = ThreadPoolExecutor(ASYNC_IO_WORKERS, thread_name_prefix="visionaid-io")
+_http_session = None
+
+
+async def get_http_session():
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=ASYNC_IO_WORKERS)
+        )
+    return _http_session
+
+
+async def run_in_executor(executor, func, *args):
+    """Runs func on executor with the caller's request context (deadline, metrics, trace)."""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(executor, ctx.run, run_profiled, func, *args)
+
+
+async def run_scheduled_async(feature, func, *args):
+    """Like pipeline.run_scheduled, without blocking the event loop."""
+    if feature_is_io_bound(feature):
+        return await run_in_executor(io_executor, func, *args)
+    return await asyncio.wrap_future(
+        cpu_scheduler.submit_with_priority(cpu_scheduler.priority_for(feature), func, *args)
+    )
+
+
+@sio.event
+async def connect(sid, environ):
+    logger.info(f"Client connected: {sid}")
+    ACTIVE_SOCKETS.inc()
+    await sio.emit(
+        "response",
+        {"event": "connect", "result": {"status": "connected", "id": sid}},
+        to=sid,
+    )
+    query = parse_qs(environ.get("QUERY_STRING", ""))
+    user_settings = None
+    # Settings are bound only for a valid ?token= from /login (see user_auth.py)
+    user_email = token_email(query.get("token", [None])[0], query.get("email", [None])[0])
+    if user_email is None and (query.get("token") or query.get("email")):
+        logger.warning(f"[{sid}] Unauthenticated settings binding ignored.")
+    if user_email:
+        # Cache miss hits MySQL, so keep it off the event loop
+        user_settings = await run_in_executor(io_executor, bind_session_user, sid, user_email)
+    result_format = query.get("result_format", [None])[0]
+    if not result_format and user_settings and user_settings.compact_results:
+        result_format = RESULT_FORMAT_COMPACT
+    if result_format:
+        await set_result_format(sid, {"format": result_format})
+
+
+@sio.event
+async def disconnect(sid):
+    logger.info(f"Client disconnected: {sid}")
+    ACTIVE_SOCKETS.dec()
+    forget_client_ocr_language(sid)
+    forget_focus_tracker(sid)
+    forget_client_route(sid)
+    forget_client_result_format(sid)
+    forget_session_user(sid)
+
+
+@sio.event
+async def set_result_format(sid, data):
+    result_format = data.get("format") if isinstance(data, dict) else None
+    if not set_client_result_format(sid, result_format):
+        logger.warning(f"Client {sid} requested unknown result format '{result_format}'.")
+        await sio.emit(
+            "response", error_payload(f"Unsupported result format '{result_format}'"), to=sid
+        )
+        return
+    logger.info(f"Client {sid} result format: {result_format}")
+    if result_format == RESULT_FORMAT_COMPACT:
+        await sio.emit("class_table", class_table_payload(TARGET_CLASSES), to=sid)
+
+
+@sio.on("message")
+async def handle_message(sid, data):
+    client_sid = sid
+    start_time = time.time()
+    detection_type_from_payload = "unknown"
+    supervision_request_type = None
+    final_response_payload = None
+    request_status = None
+    request_ctx = RequestContext(client_sid, start_time=start_time)
+    request_ctx.user_settings = get_session_settings(client_sid)
+    request_ctx.trace = maybe_start_trace("handle_message", {"client_sid": client_sid})
+    request_ctx_token = begin_request(request_ctx)
+    REQUESTS_IN_FLIGHT.inc()
+
+    try:
+        invalid_payload = validate_message(data, client_sid)
+        if invalid_payload:
+            await sio.emit("response", invalid_payload, to=sid)
+            return
+
+        detection_type_from_payload = data.get("type")
+        supervision_request_type = data.get("request_type")
+        is_supervision = is_supervision_request(
+            detection_type_from_payload, supervision_request_type
+        )
+        request_ctx.feature = request_feature(detection_type_from_payload)
+        if is_supervision:
+            request_ctx.origin = "supervision"
+        request_ctx.set_budget(resolve_request_budget(data, detection_type_from_payload))
+
+        try:
+            image_bytes, image_np = await run_in_executor(
+                cpu_executor, decode_request_frame, data, client_sid
+            )
+            request_ctx.frame = image_np
+            request_ctx.frame_bytes = image_bytes
+        except Exception as decode_err:
+            logger.error(f"Image decode error for {client_sid}: {decode_err}", exc_info=True)
+            await sio.emit("response", error_payload("Invalid image data"), to=sid)
+            request_status = "invalid_image"
+            return
+
+        final_response_payload = await run_in_executor(
+            cpu_executor,
+            frame_quality_payload,
+            image_np,
+            detection_type_from_payload,
+            is_supervision,
+            client_sid,
+        )
+        if final_response_payload:
+            await sio.emit("response", final_response_payload, to=sid)
+            return
+
+        if is_supervision:
+            logger.info(f"Handling SuperVision LLM routing request from {client_sid}...")
+            # Near-duplicate of the last routed frame, or a confident routing head
+            chosen_feature_by_llm = await run_scheduled_async(
+                "local_routing", get_embedding_feature_choice, image_np, client_sid
+            )
+            if not chosen_feature_by_llm and not request_ctx.user_settings.prefer_local_routing:
+                with observe_stage("routing"):
+                    image_base64 = await run_in_executor(
+                        cpu_executor,
+                        encode_frame_base64,
+                        image_np,
+                        OUTBOUND_JPEG_MAX_SIDE,
+                        OUTBOUND_JPEG_QUALITY,
+                    )
+                    if image_base64 is not None:
+                        chosen_feature_by_llm = await get_llm_feature_choice_async(
+                            image_base64, await get_http_session(), client_sid
+                        )
+            if not chosen_feature_by_llm:
+                logger.warning(
+                    f"[{client_sid}] LLM routing unavailable. Falling back to local routing."
+                )
+                request_ctx.check("local_routing")
+                chosen_feature_by_llm = await run_scheduled_async(
+                    "local_routing", get_local_feature_choice, image_np, client_sid
+                )
+
+            if chosen_feature_by_llm:
+                request_ctx.check(chosen_feature_by_llm)
+                request_ctx.feature = chosen_feature_by_llm
+                remember_routing_choice(image_np, chosen_feature_by_llm, client_sid)
+                final_response_payload = await run_scheduled_async(
+                    chosen_feature_by_llm,
+                    run_supervision_feature,
+                    chosen_feature_by_llm,
+                    image_np,
+                    client_sid,
+                )
+            else:
+                final_response_payload = supervision_routing_failed_payload(client_sid)
+        else:
+            request_ctx.check(detection_type_from_payload)
+            detection_function_output = await run_scheduled_async(
+                detection_type_from_payload,
+                run_direct_feature,
+                detection_type_from_payload,
+                image_np,
+                data,
+                client_sid,
+            )
+            final_response_payload = {"result": detection_function_output}
+
+        log_completion(final_response_payload, detection_type_from_payload, client_sid, start_time)
+        with observe_stage("emit"):
+            await sio.emit(
+                "response",
+                encode_response(
+                    final_response_payload,
+                    client_sid,
+                    detection_type_from_payload,
+                    DETECTION_CLASS_IDS,
+                ),
+                to=sid,
+            )
+
+    except DeadlineExceeded as deadline_e:
+        processing_time = time.time() - start_time
+        logger.warning(
+            f"Abandoned '{detection_type_from_payload}' for {client_sid} after {processing_time:.3f}s: {deadline_e}"
+        )
+        request_status = "deadline_exceeded"
+        await sio.emit(
+            "response",
+            error_payload(
+                "Request deadline exceeded",
+                is_supervision_request(detection_type_from_payload, supervision_request_type),
+            ),
+            to=sid,
+        )
+    except Exception as e:
+        processing_time = time.time() - start_time
+        logger.error(
+            f"Unhandled error in async handle_message (type: '{detection_type_from_payload}') for {client_sid} after {processing_time:.3f}s: {e}",
+            exc_info=True,
+        )
+        try:
+            await sio.emit(
+                "response",
+                error_payload(
+                    "Internal server error during processing.",
+                    is_supervision_request(detection_type_from_payload, supervision_request_type),
+                ),
+                to=sid,
+            )
+        except Exception as emit_e:
+            logger.error(f"Failed to emit error response to {client_sid}: {emit_e}")
+    finally:
+        if request_status is None:
+            request_status = response_status(final_response_payload)
+        REQUEST_LATENCY.observe(
+            time.time() - start_time,
+            feature=request_ctx.feature or "unknown",
+            origin=request_ctx.origin,
+            status=request_status,
+        )
+        REQUESTS_IN_FLIGHT.dec()
+        record_history(
+            client_sid=client_sid,
+            user_email=get_session_email(client_sid),
+            feature=request_feature(request_ctx.feature),
+            origin=request_ctx.origin,
+            status=request_status,
+            latency_ms=(time.time() - start_time) * 1000.0,
+            result_summary=history_summary(final_response_payload),
+        )
+        finish_trace(
+            request_ctx.trace,
+            {
+                "feature": request_ctx.feature or "unknown",
+                "origin": request_ctx.origin,
+                "status": request_status,
+            },
+        )
+        end_request(request_ctx_token)
+
+
+if __name__ == "__main__":
+    host_ip = os.environ.get("FLASK_HOST", "0.0.0.0")
+    port_num = int(os.environ.get("FLASK_PORT", 5000))
+    logger.info(
+        f"Starting asyncio Socket.IO server on http://{host_ip}:{port_num} "
+        f"(CPU workers: {SCHEDULER_WORKERS}, I/O workers: {ASYNC_IO_WORKERS})"
+    )
+    try:
+        uvicorn.run(asgi_app, host=host_ip, port=port_num, log_level="info")
+    except Exception as run_e:
+        logger.critical(f"Failed to start async server: {run_e}", exc_info=True)
+        sys.exit(1)
+    finally:
+        logger.info("Server shutdown.")
@@ -0,0 +1,205 @@
+# backend/batch_process.py
+# Offline batch runner: streams the frames of an image directory or a video file
+# through the operations on a pool of worker processes and writes one JSON line per
+# frame with its results and per-stage timings. Each worker loads the models once and
+# gets an equal share of the cores (see thread_topology.py), image files are read
+# and decoded inside the workers, and at most --prefetch frames are in flight. Frames
+# already in the output file are skipped, so an interrupted run continues where it
+# stopped when started again with the same arguments.
+#
+#   python batch_process.py photos/ --ops detect_objects,detect_scene --output photos.jsonl
+#   python batch_process.py walk.mp4 --every 15 --workers 4 --output walk.jsonl
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+import cv2
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".webm")
+OPERATION_FEATURES = {  # Operation -> feature name used for metrics and priorities
+    "detect_objects": "object_detection",
+    "detect_hazards": "hazard_detection",
+    "detect_scene": "scene_detection",
+    "detect_text": "text_detection",
+    "detect_currency": "currency_detection",
+}
+ALL_OPERATIONS = tuple(OPERATION_FEATURES)
+
+_operations = {}  # Per worker process: name -> callable, set by _init_worker
+_ocr_lang = None
+
+
+def _init_worker(op_names, ocr_lang):
+    global _ocr_lang
+    # Imported here so the parent process never loads the models
+    from operations.detect_currency import detect_currency
+    from operations.detect_hazards import detect_hazards
+    from operations.detect_objects import detect_objects
+    from operations.detect_scene import detect_scene
+    from operations.detect_text import detect_text
+
+    available = {
+        "detect_objects": detect_objects,
+        "detect_hazards": detect_hazards,
+        "detect_scene": detect_scene,
+        "detect_text": lambda image_np: detect_text(image_np, language_code=_ocr_lang),
+        "detect_currency": detect_currency,
+    }
+    _operations.update((name, available[name]) for name in op_names)
+    _ocr_lang = ocr_lang
+
+
+def _process_frame(task):
+    """Runs the selected operations on one frame. task = (frame_id, path or BGR frame)."""
+    from request_context import RequestContext, begin_request, end_request
+
+    frame_id, source = task
+    record = {"frame": frame_id, "pid": os.getpid(), "timings_ms": {}, "results": {}}
+    start = time.perf_counter()
+    if isinstance(source, str):
+        image_np = cv2.imread(source, cv2.IMREAD_COLOR)
+        record["timings_ms"]["decode"] = (time.perf_counter() - start) * 1000.0
+        if image_np is None:
+            record["error"] = "Could not read image"
+            return record
+    else:
+        image_np = source
+
+    # One request context per frame, so operations share per-frame work (e.g. embeddings)
+    ctx = RequestContext(f"batch-{os.getpid()}", origin="batch")
+    ctx.frame = image_np
+    token = begin_request(ctx)
+    try:
+        for name, operation in _operations.items():
+            ctx.feature = OPERATION_FEATURES[name]
+            op_start = time.perf_counter()
+            try:
+                record["results"][name] = operation(image_np)
+            except Exception as e:
+                record["results"][name] = {"status": "error", "message": str(e)}
+            record["timings_ms"][name] = (time.perf_counter() - op_start) * 1000.0
+    finally:
+        end_request(token)
+    record["timings_ms"]["total"] = (time.perf_counter() - start) * 1000.0
+    return record
+
+
+def image_tasks(directory):
+    """(frame_id, path) for every image under directory, in sorted order. Ids are relative paths."""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, directory).replace(os.sep, "/"), path
+
+
+def video_tasks(path, every=1, skip=frozenset()):
+    """(frame_id, BGR frame) for every `every`-th frame; frames in `skip` are not decoded."""
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video: {path}")
+    try:
+        index = 0
+        while capture.grab():  # grab() without retrieve() skips the decode-to-BGR work
+            frame_id = f"{os.path.basename(path)}#{index}"
+            if index % every == 0 and frame_id not in skip:
+                ok, frame = capture.retrieve()
+                if not ok:
+                    break
+                yield frame_id, frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def completed_frames(output_path):
+    """Frame ids already written to output_path. Drops a torn last line from a crash."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "rb+") as output:
+        data = output.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            output.truncate(end)
+        for line in data[:end].splitlines():
+            try:
+                done.add(json.loads(line)["frame"])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+def bounded(tasks, slots):
+    """Yields tasks only while a slot is free, so the pool's feeder can't read ahead."""
+    for task in tasks:
+        slots.acquire()
+        yield task
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run VisionAid operations over images or a video.")
+    parser.add_argument("source", help="Image directory or video file")
+    parser.add_argument("--ops", default="detect_objects,detect_scene", help=f"Comma-separated, from {','.join(ALL_OPERATIONS)}")
+    parser.add_argument("--output", required=True, help="JSONL file to write (appended to when resuming)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per 2 cores)")
+    parser.add_argument("--prefetch", type=int, default=None, help="Frames in flight (default: 2 per worker)")
+    parser.add_argument("--every", type=int, default=1, help="Video: process every N-th frame")
+    parser.add_argument("--ocr-lang", default="eng", help="Tesseract language for detect_text")
+    args = parser.parse_args()
+
+    op_names = [name.strip() for name in args.ops.split(",") if name.strip()]
+    unknown = [name for name in op_names if name not in ALL_OPERATIONS]
+    if unknown:
+        parser.error(f"Unknown operations: {unknown}. Choose from {list(ALL_OPERATIONS)}")
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    workers = args.workers or max(1, cores // 2)
+    prefetch = args.prefetch or 2 * workers
+
+    # Split the cores between the workers; read by thread_topology.py in each worker
+    threads_per_worker = str(max(1, cores // workers))
+    for variable in ("TORCH_THREADS", "OPENCV_THREADS", "OMP_THREAD_LIMIT", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[variable] = threads_per_worker
+    os.environ["SCHEDULER_WORKERS"] = "1"
+
+    done = completed_frames(args.output)
+    if os.path.isdir(args.source):
+        tasks = (task for task in image_tasks(args.source) if task[0] not in done)
+    elif args.source.lower().endswith(VIDEO_EXTENSIONS):
+        tasks = video_tasks(args.source, max(1, args.every), done)
+    else:
+        parser.error(f"Source must be a directory or a video ({', '.join(VIDEO_EXTENSIONS)})")
+    if done:
+        print(f"Resuming: {len(done)} frame(s) already in {args.output}", file=sys.stderr)
+    print(f"Running {op_names} with {workers} worker(s) x {threads_per_worker} thread(s)", file=sys.stderr)
+
+    slots = threading.BoundedSemaphore(prefetch)
+    processed = 0
+    start = time.perf_counter()
+    context = multiprocessing.get_context("spawn")  # No forked torch/OpenMP state
+    with context.Pool(workers, initializer=_init_worker, initargs=(op_names, args.ocr_lang)) as pool, \
+            open(args.output, "a", encoding="utf-8") as output:
+        for record in pool.imap_unordered(_process_frame, bounded(tasks, slots)):
+            slots.release()
+            output.write(json.dumps(record, default=str) + "\n")
+            output.flush()  # A crash loses at most the frames still in flight
+            processed += 1
+            if processed % 100 == 0:
+                elapsed = time.perf_counter() - start
+                print(f"{processed} frame(s), {processed / elapsed:.2f}/s", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    print(
+        f"Done: {processed} frame(s) in {elapsed:.1f}s ({processed / elapsed if elapsed else 0:.2f}/s)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# backend/bench/bench_currency.py
+# End-to-end latency of the local currency model vs. the Roboflow API.
+#
+#   python -m bench.bench_currency path/to/notes/ --iterations 5 --output currency_bench.json
+
+import argparse
+
+from bench.common import load_frames, print_summary, summarize, time_calls, write_results
+from operations.detect_currency import (
+    currency_model,
+    detect_currency_local,
+    detect_currency_roboflow,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark currency detection backends.")
+    parser.add_argument("paths", nargs="*", help="Image files or directories (default: synthetic frame)")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--skip-roboflow", action="store_true", help="Only benchmark the local model")
+    parser.add_argument("--output", default=None, help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    frames = load_frames(args.paths, args.max_frames)
+    backends = {}
+    if currency_model is not None:
+        backends["local"] = detect_currency_local
+    else:
+        print("Local currency model not loaded (check CURRENCY_BACKEND / CURRENCY_MODEL_PATH). Skipping.")
+    if not args.skip_roboflow:
+        backends["roboflow"] = detect_currency_roboflow
+
+    results = {}
+    for backend_name, func in backends.items():
+        latencies, outputs = time_calls(func, frames, args.iterations, args.warmup)
+        summary = summarize(latencies)
+        summary["outputs"] = outputs
+        results[backend_name] = summary
+        print_summary(f"currency/{backend_name}", summary)
+
+    if args.output:
+        write_results(args.output, "currency_backends", results)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
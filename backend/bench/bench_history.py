@@ -0,0 +1,85 @@
+# backend/bench/bench_history.py
+# Cost of request history writes on the handler thread: one INSERT per request vs.
+# queueing into the batched HistoryWriter. Uses a throwaway SQLite database as a
+# stand-in for MySQL unless DATABASE_URL is already set.
+#
+#   python -m bench.bench_history --rows 5000 --output history_bench.json
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from bench.common import print_summary, summarize, write_results
+
+
+def sample_row(i):
+    return {
+        "created_at": datetime.utcnow(),
+        "client_sid": f"bench-{i % 50}",
+        "user_email": None,
+        "feature": "object_detection",
+        "origin": "direct",
+        "status": "ok",
+        "latency_ms": 42.0,
+        "result_summary": "person, chair",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark request history writes.")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--flush-interval", type=float, default=1.0)
+    parser.add_argument("--output", default=None, help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="visionaid-bench-"), "history.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    from flask import Flask
+
+    from db import ensure_schema, init_db, insert_history_rows
+    from history_writer import HistoryWriter
+
+    app = Flask(__name__)
+    init_db(app)
+    if not ensure_schema():
+        raise SystemExit(f"Database not reachable: {os.environ['DATABASE_URL']}")
+
+    results = {}
+
+    latencies = []
+    wall_start = time.perf_counter()
+    for i in range(args.rows):
+        start = time.perf_counter()
+        insert_history_rows([sample_row(i)])
+        latencies.append(time.perf_counter() - start)
+    results["per_request_insert"] = summarize(latencies, time.perf_counter() - wall_start)
+    print_summary("history/per_request_insert", results["per_request_insert"])
+
+    writer = HistoryWriter(
+        insert_history_rows, args.batch_size, args.flush_interval, max_buffer=args.rows
+    )
+    writer.start()
+    latencies = []
+    wall_start = time.perf_counter()
+    for i in range(args.rows):
+        start = time.perf_counter()
+        writer.record(**sample_row(i))
+        latencies.append(time.perf_counter() - start)
+    writer.stop(timeout=60)
+    summary = summarize(latencies, time.perf_counter() - wall_start)
+    summary["unflushed_rows"] = writer.pending()
+    results["batched_writer"] = summary
+    print_summary("history/batched_writer", summary)
+
+    if args.output:
+        write_results(args.output, "request_history", results)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
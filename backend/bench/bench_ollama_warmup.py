@@ -0,0 +1,77 @@
+# backend/bench/bench_ollama_warmup.py
+# Checks the Ollama warm-up and keep-alive logic (ollama_session.py) against the local
+# stub, which charges `--load-latency` whenever a model is not resident:
+#   cold      - first request with no warm-up (pays the load)
+#   warm      - first request after OllamaSessionManager warmed the models
+#   kept      - request after idling longer than keep_alive, with the pinger running
+#
+#   python -m bench.bench_ollama_warmup --load-latency 2 --keep-alive 3s --idle 5
+
+import argparse
+import time
+
+import requests
+
+from bench.common import write_results
+from bench.stubs import OllamaStub
+from ollama_session import OllamaSessionManager
+
+MODELS = ("routing-model", "cleaning-model")
+
+
+def timed_generate(url, model, keep_alive):
+    start = time.perf_counter()
+    response = requests.post(
+        url,
+        json={"model": model, "system": "Fixed instructions.", "prompt": "hello", "stream": False, "keep_alive": keep_alive},
+        timeout=60,
+    )
+    response.raise_for_status()
+    return (time.perf_counter() - start) * 1000.0
+
+
+def wait_until(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check Ollama warm-up and keep-alive against a stub.")
+    parser.add_argument("--load-latency", type=float, default=1.0, help="Seconds the stub takes to load a model")
+    parser.add_argument("--keep-alive", default="3s", help="keep_alive sent with every request")
+    parser.add_argument("--ping-interval", type=float, default=1.0)
+    parser.add_argument("--idle", type=float, default=5.0, help="Idle seconds before the 'kept' request")
+    parser.add_argument("--output", default=None, help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    cold_stub = OllamaStub(load_latency=args.load_latency).start()
+    results["cold_ms"] = timed_generate(cold_stub.generate_url, MODELS[0], args.keep_alive)
+    cold_stub.stop()
+
+    stub = OllamaStub(load_latency=args.load_latency).start()
+    manager = OllamaSessionManager(stub.generate_url, MODELS, args.keep_alive, args.ping_interval).start()
+    if not wait_until(lambda: all(stub.is_loaded(m) for m in MODELS), 10 + 2 * args.load_latency):
+        raise SystemExit("Models were not warmed up")
+    results["warm_ms"] = timed_generate(stub.generate_url, MODELS[0], args.keep_alive)
+
+    time.sleep(args.idle)
+    results["still_loaded_after_idle"] = all(stub.is_loaded(m) for m in MODELS)
+    results["kept_ms"] = timed_generate(stub.generate_url, MODELS[1], args.keep_alive)
+    results["model_loads"] = stub.loads  # 2 expected: one per model, at warm-up
+    manager.stop()
+    stub.stop()
+
+    for key, value in results.items():
+        print(f"{key:<26} {value:.1f}" if isinstance(value, float) else f"{key:<26} {value}")
+    if args.output:
+        write_results(args.output, "ollama_warmup", results)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
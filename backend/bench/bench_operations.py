@@ -0,0 +1,79 @@
+# backend/bench/bench_operations.py
+# Micro-benchmarks for each operation over a fixed set of frames. Roboflow and Ollama
+# are replaced by local stubs (see stubs.py) so only our own code path is measured.
+#
+#   python -m bench.bench_operations fixtures/ --iterations 10 --output ops.json
+#   python -m bench.bench_operations --ops detect_objects,detect_scene --max-frames 20
+
+import argparse
+import os
+
+from bench.common import load_frames, print_summary, summarize, time_calls, write_results
+from bench.stubs import OllamaStub, RoboflowStub
+
+ALL_OPERATIONS = (
+    "detect_objects",
+    "detect_scene",
+    "detect_text",
+    "detect_currency",
+    "get_llm_feature_choice",
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark VisionAid operations.")
+    parser.add_argument("paths", nargs="*", help="Image files or directories (default: synthetic frame)")
+    parser.add_argument("--ops", default=",".join(ALL_OPERATIONS), help="Comma-separated operations to run")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="Seconds the HTTP stubs wait before answering")
+    parser.add_argument("--output", default=None, help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    roboflow_stub = RoboflowStub(latency=args.stub_latency).start()
+    ollama_stub = OllamaStub(latency=args.stub_latency).start()
+    # Must be set before the operations import model_config / ollama
+    os.environ["ROBOFLOW_MODEL_ENDPOINT"] = roboflow_stub.endpoint
+    os.environ["OLLAMA_URL"] = ollama_stub.generate_url
+    os.environ["CURRENCY_BACKEND"] = "roboflow"
+
+    from ollama import get_llm_feature_choice
+    from operations.detect_currency import detect_currency
+    from operations.detect_objects import detect_objects
+    from operations.detect_scene import detect_scene
+    from operations.detect_text import detect_text
+
+    operations = {
+        "detect_objects": detect_objects,
+        "detect_scene": detect_scene,
+        "detect_text": detect_text,
+        "detect_currency": detect_currency,
+        "get_llm_feature_choice": get_llm_feature_choice,
+    }
+    selected = [name.strip() for name in args.ops.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in operations]
+    if unknown:
+        parser.error(f"Unknown operations: {unknown}. Choose from {list(operations)}")
+
+    frames = load_frames(args.paths, args.max_frames)
+    print(f"Benchmarking {selected} over {len(frames)} frame(s) x {args.iterations} iteration(s)")
+
+    results = {"config": {"frames": len(frames), "iterations": args.iterations, "stub_latency": args.stub_latency}}
+    try:
+        for name in selected:
+            latencies, _ = time_calls(operations[name], frames, args.iterations, args.warmup)
+            summary = summarize(latencies, wall_time=sum(latencies))
+            results[name] = summary
+            print_summary(name, summary)
+    finally:
+        roboflow_stub.stop()
+        ollama_stub.stop()
+
+    if args.output:
+        write_results(args.output, "operations", results)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# backend/bench/bench_worker_memory.py
+# Per-worker memory with heap-loaded vs mmap-shared weights (weight_store.py). Starts
+# --workers processes that each load the Places365 ResNet-50 (optionally also a YOLO
+# model), run one forward pass and report RSS/PSS/private memory before and after.
+# PSS splits shared pages between the processes, so the PSS sum is what the node pays.
+#
+#   python -m bench.bench_worker_memory --workers 4 --mode heap
+#   python -m bench.bench_worker_memory --workers 4 --mode mmap --yolo models/yolov8x-worldv2.pt
+
+import argparse
+import multiprocessing
+
+from bench.common import write_results
+
+PLACES365_WEIGHTS = "models/resnet50_places365.pth.tar"
+
+
+def _read_places365(path):
+    import torch
+
+    checkpoint = torch.load(path, map_location="cpu")
+    state_dict = checkpoint.get("state_dict", checkpoint)
+    return {k.replace("module.", ""): v for k, v in state_dict.items()}
+
+
+def _load_models(mode, yolo_path, ready, release, results):
+    import numpy as np
+    import torch
+    import torchvision.models as models
+
+    from weight_store import load_state_dict_shared, process_memory, share_module_weights
+
+    torch.set_num_threads(1)
+    before = process_memory()
+    model = models.resnet50(weights=None)
+    model.fc = torch.nn.Linear(model.fc.in_features, 365)
+    if mode == "mmap":
+        model.load_state_dict(load_state_dict_shared(PLACES365_WEIGHTS, _read_places365), assign=True)
+    else:
+        model.load_state_dict(_read_places365(PLACES365_WEIGHTS))
+    model.eval()
+    with torch.no_grad():
+        model(torch.zeros(1, 3, 224, 224))
+    if yolo_path:
+        from ultralytics import YOLO
+
+        yolo = YOLO(yolo_path)
+        yolo.fuse()
+        if mode == "mmap":
+            share_module_weights(yolo.model, yolo_path, "fused", repr(yolo.names))
+        yolo.predict(np.zeros((480, 640, 3), dtype=np.uint8), verbose=False)
+    ready.wait()  # Measure only once every worker has mapped its weights
+    results.put({"before": before, "after": process_memory()})
+    release.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-worker memory with heap vs mmap weights.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--mode", choices=("heap", "mmap"), default="mmap")
+    parser.add_argument("--yolo", default=None, help="Also load this YOLO checkpoint")
+    parser.add_argument("--output", default=None, help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    ready = context.Barrier(args.workers)
+    release = context.Barrier(args.workers + 1)
+    results = context.Queue()
+    workers = [
+        context.Process(target=_load_models, args=(args.mode, args.yolo, ready, release, results))
+        for _ in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    reports = [results.get() for _ in workers]
+    release.wait()
+    for worker in workers:
+        worker.join()
+
+    for index, report in enumerate(reports):
+        print(
+            f"worker {index}: "
+            + "  ".join(
+                f"{kind} {report['before'].get(kind, 0) / 2**20:.0f} -> {value / 2**20:.0f} MB"
+                for kind, value in report["after"].items()
+            )
+        )
+    total_pss = sum(report["after"].get("pss", 0) for report in reports)
+    total_rss = sum(report["after"].get("rss", 0) for report in reports)
+    print(f"{args.mode}: {args.workers} workers, total PSS {total_pss / 2**20:.0f} MB (sum of RSS {total_rss / 2**20:.0f} MB)")
+    if args.output:
+        write_results(
+            args.output,
+            "worker_memory",
+            {"mode": args.mode, "workers": reports, "total_pss": total_pss, "total_rss": total_rss},
+        )
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
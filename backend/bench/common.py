@@ -0,0 +1,148 @@
+# backend/bench/common.py
+# Shared helpers for the benchmark scripts. Run them from the backend directory,
+# e.g. `python -m bench.bench_currency`, so the model paths in model_config resolve.
+
+import json
+import os
+import platform
+import subprocess
+import time
+
+import cv2
+import numpy as np
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def synthetic_frame(width=640, height=480, text="VisionAid Benchmark"):
+    """Deterministic stand-in frame for when no fixture images are given."""
+    frame = np.full((height, width, 3), 200, dtype=np.uint8)
+    cv2.rectangle(frame, (40, 60), (width - 40, height - 60), (30, 90, 160), -1)
+    cv2.putText(
+        frame, text, (60, height // 2), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 2
+    )
+    return frame
+
+
+def frame_id(path, root):
+    """Path of an image relative to the directory it was found in, with "/" separators."""
+    return os.path.relpath(path, root).replace(os.sep, "/")
+
+
+def load_frames(paths, max_frames=None):
+    """
+    Loads BGR frames from image files and/or directories (walked recursively and sorted,
+    so runs are repeatable). Frames are named like batch_process.py names them: by path
+    relative to their directory, or as given for files. Two frames with the same name
+    are an error, not a silent overwrite. Falls back to a single synthetic frame when
+    no paths are given.
+    """
+    files = []
+    for path in paths or []:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                for name in sorted(names):
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        file_path = os.path.join(root, name)
+                        files.append((frame_id(file_path, path), file_path))
+        else:
+            files.append((path.replace(os.sep, "/"), path))
+    if max_frames:
+        files = files[:max_frames]
+
+    frames = []
+    seen = set()
+    for name, file_path in files:
+        if name in seen:
+            raise ValueError(f"Two frames named {name}; pass directories with distinct layouts")
+        seen.add(name)
+        frame = cv2.imread(file_path, cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError(f"Could not read image: {file_path}")
+        frames.append((name, frame))
+    if not frames:
+        frames.append(("synthetic", synthetic_frame()))
+    return frames
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+def summarize(latencies, wall_time=None):
+    """Latency summary in milliseconds, plus throughput when the wall time is known."""
+    values = sorted(latencies)
+    summary = {
+        "count": len(values),
+        "mean_ms": (sum(values) / len(values) * 1000.0) if values else 0.0,
+        "p50_ms": percentile(values, 50) * 1000.0,
+        "p95_ms": percentile(values, 95) * 1000.0,
+        "p99_ms": percentile(values, 99) * 1000.0,
+        "max_ms": (values[-1] * 1000.0) if values else 0.0,
+    }
+    if wall_time:
+        summary["per_sec"] = len(values) / wall_time
+    return summary
+
+
+def time_calls(func, frames, iterations, warmup=1):
+    """Calls func(frame) over the frames `iterations` times. Returns (latencies, last results)."""
+    for _ in range(warmup):
+        for _, frame in frames:
+            func(frame)
+    latencies = []
+    results = {}
+    for _ in range(iterations):
+        for name, frame in frames:
+            start = time.perf_counter()
+            results[name] = func(frame)
+            latencies.append(time.perf_counter() - start)
+    return latencies, results
+
+
+def git_revision():
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode()
+            .strip()
+        )
+    except Exception:
+        return "unknown"
+
+
+def write_results(path, name, results):
+    """Writes a benchmark report as JSON, tagged with the commit and machine it ran on."""
+    report = {
+        "benchmark": name,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_revision": git_revision(),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def print_summary(label, summary):
+    line = (
+        f"{label:<28} n={summary['count']:<5} mean={summary['mean_ms']:8.1f}ms "
+        f"p50={summary['p50_ms']:8.1f}ms p95={summary['p95_ms']:8.1f}ms p99={summary['p99_ms']:8.1f}ms"
+    )
+    if "per_sec" in summary:
+        line += f" {summary['per_sec']:7.2f}/s"
+    print(line)
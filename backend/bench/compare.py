@@ -0,0 +1,50 @@
+# backend/bench/compare.py
+# Compares two benchmark JSON reports (from the same benchmark) and flags regressions.
+#
+#   python -m bench.compare baseline.json candidate.json --threshold 0.10
+
+import argparse
+import json
+import sys
+
+COMPARED_FIELDS = ("mean_ms", "p50_ms", "p95_ms", "p99_ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+    if baseline.get("benchmark") != candidate.get("benchmark"):
+        print(f"Warning: comparing '{baseline.get('benchmark')}' with '{candidate.get('benchmark')}'")
+    print(f"baseline {baseline.get('git_revision')} -> candidate {candidate.get('git_revision')}")
+
+    regressions = []
+    for name, base_summary in baseline.get("results", {}).items():
+        cand_summary = candidate.get("results", {}).get(name)
+        if not isinstance(base_summary, dict) or not isinstance(cand_summary, dict):
+            continue
+        for field in COMPARED_FIELDS:
+            if field not in base_summary or field not in cand_summary:
+                continue
+            base_value, cand_value = base_summary[field], cand_summary[field]
+            change = (cand_value - base_value) / base_value if base_value else 0.0
+            marker = ""
+            if change > args.threshold:
+                marker = "  REGRESSION"
+                regressions.append((name, field, change))
+            print(f"{name:<28} {field:<8} {base_value:10.1f} -> {cand_value:10.1f} ms ({change:+.1%}){marker}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# backend/bench/load_generator.py
+# Multi-client Socket.IO load generator for a running backend. Each simulated client
+# keeps one frame in flight (like the app) and the round trip is measured from emit
+# until its "response" event arrives.
+#
+#   python -m bench.load_generator --url http://localhost:5000 --clients 16 \
+#       --features object_detection,scene_detection --duration 60 --output load.json
+#
+# --idle-clients opens extra connections that only stay connected, to compare how many
+# sockets the threading (App.py) and asyncio (async_server.py) modes sustain.
+
+import argparse
+import base64
+import threading
+import time
+
+import cv2
+import socketio
+
+from bench.common import load_frames, print_summary, summarize, write_results
+
+
+def encode_frames(frames, quality=85):
+    encoded = []
+    for _, frame in frames:
+        ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError("Failed to JPEG-encode fixture frame")
+        encoded.append(base64.b64encode(buffer.tobytes()).decode("utf-8"))
+    return encoded
+
+
+def build_payload(feature, image_b64, args):
+    payload = {"image": image_b64, "type": feature}
+    if feature == "supervision":
+        payload["request_type"] = "llm_route"
+    elif feature == "focus_detection":
+        payload["focus_object"] = args.focus_object
+    elif feature == "text_detection":
+        payload["language"] = args.language
+    return payload
+
+
+class LoadClient(threading.Thread):
+    def __init__(self, index, url, feature, images, args, stop_at):
+        super().__init__(daemon=True)
+        self.index = index
+        self.url = url
+        self.feature = feature
+        self.images = images
+        self.args = args
+        self.stop_at = stop_at
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+        self._response_event = threading.Event()
+        self._last_response = None
+        self.sio = socketio.Client(reconnection=False)
+        self.sio.on("response", self._on_response)
+
+    def _on_response(self, data):
+        if isinstance(data, dict) and data.get("event") == "connect":
+            return  # Greeting sent by handle_connect
+        self._last_response = data
+        self._response_event.set()
+
+    def run(self):
+        try:
+            self.sio.connect(self.url, transports=["websocket"], wait_timeout=10)
+        except Exception as e:
+            print(f"client {self.index}: connect failed: {e}")
+            self.errors += 1
+            return
+        frame_index = self.index
+        try:
+            while time.time() < self.stop_at:
+                image_b64 = self.images[frame_index % len(self.images)]
+                frame_index += 1
+                self._response_event.clear()
+                start = time.perf_counter()
+                self.sio.emit("message", build_payload(self.feature, image_b64, self.args))
+                if not self._response_event.wait(self.args.timeout):
+                    self.errors += 1
+                    continue
+                self.latencies.append(time.perf_counter() - start)
+                result = (self._last_response or {}).get("result")
+                status = result.get("status", "ok") if isinstance(result, dict) else "ok"
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+        finally:
+            self.sio.disconnect()
+
+
+def open_idle_clients(url, count):
+    idle = []
+    failures = 0
+    for _ in range(count):
+        client = socketio.Client(reconnection=False)
+        try:
+            client.connect(url, transports=["websocket"], wait_timeout=10)
+            idle.append(client)
+        except Exception:
+            failures += 1
+    return idle, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Socket.IO load generator for the VisionAid backend.")
+    parser.add_argument("paths", nargs="*", help="Image files or directories (default: synthetic frame)")
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--features", default="object_detection", help="Comma-separated request types")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent clients per feature")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--timeout", type=float, default=90.0, help="Seconds to wait for each response")
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--focus-object", default="cup")
+    parser.add_argument("--language", default="eng")
+    parser.add_argument("--idle-clients", type=int, default=0, help="Extra connections kept open without sending frames")
+    parser.add_argument("--output", default=None, help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    images = encode_frames(load_frames(args.paths, args.max_frames))
+    features = [f.strip() for f in args.features.split(",") if f.strip()]
+    idle_clients, idle_failures = open_idle_clients(args.url, args.idle_clients)
+    if args.idle_clients:
+        print(f"Holding {len(idle_clients)} idle connections ({idle_failures} failed to connect)")
+    stop_at = time.time() + args.duration
+
+    clients = []
+    for feature in features:
+        for i in range(args.clients):
+            clients.append(LoadClient(i, args.url, feature, images, args, stop_at))
+    print(f"Starting {len(clients)} clients against {args.url} for {args.duration:.0f}s...")
+    started = time.time()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join(args.duration + args.timeout + 10)
+    wall_time = time.time() - started
+
+    results = {
+        "config": {
+            "url": args.url,
+            "clients_per_feature": args.clients,
+            "duration": args.duration,
+            "frames": len(images),
+            "idle_clients_connected": len(idle_clients),
+            "idle_clients_failed": idle_failures,
+        }
+    }
+    for feature in features:
+        feature_clients = [c for c in clients if c.feature == feature]
+        latencies = [lat for c in feature_clients for lat in c.latencies]
+        summary = summarize(latencies, wall_time=wall_time)
+        summary["errors"] = sum(c.errors for c in feature_clients)
+        statuses = {}
+        for c in feature_clients:
+            for status, count in c.statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+        summary["statuses"] = statuses
+        results[feature] = summary
+        print_summary(feature, summary)
+
+    for client in idle_clients:
+        client.disconnect()
+
+    if args.output:
+        write_results(args.output, "socketio_load", results)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+# backend/bench/parity.py
+# Accuracy parity for performance work. `record` runs the operations over a fixture
+# set and stores every output with its latency; `compare` scores a candidate run
+# against a golden run of the same frames:
+#   detect_objects / detect_hazards - matched-box mean IoU, recall and precision (same class, IoU >= --iou)
+#   detect_scene                    - top-1 label agreement
+#   detect_text                     - character error rate (edit distance / golden length)
+# and exits non-zero when a score is outside the given limits. Alternate engine
+# configurations are recorded via environment variables or --set overrides of
+# model_config constants. `compare` also accepts batch_process.py JSONL output.
+# bench/fixtures/ is a small set of committed frames (printed text, a sign, plain
+# scenes); add real camera frames next to them for detection coverage.
+#
+#   python -m bench.parity record bench/fixtures/ --output bench/golden.json
+#   python -m bench.parity record bench/fixtures/ --set HAZARD_IMGSZ=320 --output candidate.json
+#   python -m bench.parity compare bench/golden.json candidate.json --min-iou 0.85 --max-cer 0.02
+
+import argparse
+import json
+import sys
+import time
+
+from bench.common import load_frames, print_summary, summarize, write_results
+
+ALL_OPERATIONS = ("detect_objects", "detect_hazards", "detect_scene", "detect_text")
+DETECTION_OPERATIONS = ("detect_objects", "detect_hazards")
+
+
+def parse_override(text):
+    name, _, value = text.partition("=")
+    try:
+        return name, json.loads(value)
+    except ValueError:
+        return name, value  # Plain string
+
+
+def apply_overrides(overrides, modules):
+    """Sets model_config constants in every module that star-imported them."""
+    for name, value in overrides:
+        patched = [module.__name__ for module in modules if hasattr(module, name)]
+        if not patched:
+            raise SystemExit(f"--set {name}: no such setting")
+        for module in modules:
+            if hasattr(module, name):
+                setattr(module, name, value)
+        print(f"Override {name}={value!r} in {', '.join(patched)}")
+
+
+def record(args):
+    import model_config
+    import operations.detect_hazards
+    import operations.detect_objects
+    import operations.detect_scene
+    import operations.detect_text
+    import operations.extract_features
+
+    apply_overrides(
+        [parse_override(item) for item in args.set],
+        [
+            model_config,
+            operations.detect_objects,
+            operations.detect_hazards,
+            operations.detect_scene,
+            operations.detect_text,
+            operations.extract_features,
+        ],
+    )
+    operations_by_name = {
+        "detect_objects": operations.detect_objects.detect_objects,
+        "detect_hazards": operations.detect_hazards.detect_hazards,
+        "detect_scene": operations.detect_scene.detect_scene,
+        "detect_text": lambda frame: operations.detect_text.detect_text(frame, args.ocr_lang),
+    }
+    frames = load_frames(args.paths, args.max_frames)
+    results = {"config": {"frames": len(frames), "overrides": args.set}, "operations": {}}
+    for name in args.ops.split(","):
+        operation = operations_by_name[name]
+        for _, frame in frames[: args.warmup]:
+            operation(frame)
+        outputs, latencies = {}, []
+        for frame_name, frame in frames:
+            start = time.perf_counter()
+            outputs[frame_name] = operation(frame)
+            latencies.append(time.perf_counter() - start)
+        summary = summarize(latencies)
+        print_summary(name, summary)
+        results["operations"][name] = {"outputs": outputs, "latency": summary}
+    write_results(args.output, "parity", results)
+    print(f"Results written to {args.output}")
+
+
+def load_run(path):
+    """{operation: {"outputs": {frame: output}, "latency": summary}} from a parity report or batch JSONL."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    try:
+        return json.loads(text)["results"]["operations"]
+    except (ValueError, KeyError):
+        pass
+    run = {}
+    latencies = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        for name, output in record.get("results", {}).items():
+            run.setdefault(name, {"outputs": {}})["outputs"][record["frame"]] = output
+            latencies.setdefault(name, []).append(record["timings_ms"][name] / 1000.0)
+    for name, values in latencies.items():
+        run[name]["latency"] = summarize(values)
+    return run
+
+
+def box_iou(a, b):
+    """IoU of two detect_objects detections (normalized center/size boxes)."""
+    ax1, ay1 = a["center_x"] - a["width"] / 2, a["center_y"] - a["height"] / 2
+    bx1, by1 = b["center_x"] - b["width"] / 2, b["center_y"] - b["height"] / 2
+    ix = max(0.0, min(ax1 + a["width"], bx1 + b["width"]) - max(ax1, bx1))
+    iy = max(0.0, min(ay1 + a["height"], by1 + b["height"]) - max(ay1, by1))
+    intersection = ix * iy
+    union = a["width"] * a["height"] + b["width"] * b["height"] - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def match_detections(golden, candidate, min_iou):
+    """Greedy same-class matching, best IoU first. Returns the IoUs of matched pairs."""
+    pairs = sorted(
+        (
+            (box_iou(g, c), gi, ci)
+            for gi, g in enumerate(golden)
+            for ci, c in enumerate(candidate)
+            if g["name"] == c["name"]
+        ),
+        reverse=True,
+    )
+    used_golden, used_candidate, ious = set(), set(), []
+    for iou, gi, ci in pairs:
+        if iou < min_iou:
+            break
+        if gi in used_golden or ci in used_candidate:
+            continue
+        used_golden.add(gi)
+        used_candidate.add(ci)
+        ious.append(iou)
+    return ious
+
+
+def edit_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            )
+        previous = current
+    return previous[-1]
+
+
+def score_detections(golden_outputs, candidate_outputs, min_iou):
+    ious, golden_count, candidate_count = [], 0, 0
+    for frame, golden in golden_outputs.items():
+        golden_boxes = golden.get("detections", []) if isinstance(golden, dict) else []
+        candidate = candidate_outputs.get(frame)
+        candidate_boxes = candidate.get("detections", []) if isinstance(candidate, dict) else []
+        golden_count += len(golden_boxes)
+        candidate_count += len(candidate_boxes)
+        ious.extend(match_detections(golden_boxes, candidate_boxes, min_iou))
+    return {
+        "mean_iou": sum(ious) / len(ious) if ious else (1.0 if not golden_count else 0.0),
+        "recall": len(ious) / golden_count if golden_count else 1.0,
+        "precision": len(ious) / candidate_count if candidate_count else 1.0,
+    }
+
+
+def score_scene(golden_outputs, candidate_outputs):
+    agree = sum(1 for frame, label in golden_outputs.items() if candidate_outputs.get(frame) == label)
+    return {"top1_agreement": agree / len(golden_outputs) if golden_outputs else 1.0}
+
+
+def score_text(golden_outputs, candidate_outputs):
+    errors = characters = 0
+    for frame, golden in golden_outputs.items():
+        candidate = candidate_outputs.get(frame) or ""
+        errors += edit_distance(golden, candidate)
+        characters += max(1, len(golden))
+    return {"cer": errors / characters if characters else 0.0}
+
+
+def compare(args):
+    golden_run, candidate_run = load_run(args.golden), load_run(args.candidate)
+    failures = []
+    for name, golden in golden_run.items():
+        candidate = candidate_run.get(name)
+        if candidate is None:
+            print(f"{name:<16} missing from candidate")
+            continue
+        missing = set(golden["outputs"]) - set(candidate["outputs"])
+        if missing:
+            print(f"{name:<16} {len(missing)} golden frame(s) missing from candidate")
+        if name in DETECTION_OPERATIONS:
+            scores = score_detections(golden["outputs"], candidate["outputs"], args.iou)
+            limits = {"mean_iou": args.min_iou, "recall": args.min_recall, "precision": args.min_precision}
+        elif name == "detect_scene":
+            scores = score_scene(golden["outputs"], candidate["outputs"])
+            limits = {"top1_agreement": args.min_scene_agreement}
+        elif name == "detect_text":
+            scores = score_text(golden["outputs"], candidate["outputs"])
+            limits = {}
+            if scores["cer"] > args.max_cer:
+                failures.append((name, "cer", scores["cer"]))
+        else:
+            continue
+        for metric, limit in limits.items():
+            if scores[metric] < limit:
+                failures.append((name, metric, scores[metric]))
+        speedup = ""
+        if golden.get("latency") and candidate.get("latency") and candidate["latency"]["p50_ms"]:
+            speedup = (
+                f"  p50 {golden['latency']['p50_ms']:.1f} -> {candidate['latency']['p50_ms']:.1f} ms"
+                f" ({golden['latency']['p50_ms'] / candidate['latency']['p50_ms']:.2f}x)"
+            )
+        print(f"{name:<16} " + " ".join(f"{k}={v:.4f}" for k, v in scores.items()) + speedup)
+
+    for name, metric, value in failures:
+        print(f"FAIL {name} {metric}={value:.4f}")
+    if failures:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and compare operation outputs for accuracy parity.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="Run the operations and store their outputs")
+    record_parser.add_argument("paths", nargs="*", help="Image files or directories (default: synthetic frame)")
+    record_parser.add_argument("--output", required=True)
+    record_parser.add_argument("--ops", default=",".join(ALL_OPERATIONS))
+    record_parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE", help="Override a model_config constant (JSON value)")
+    record_parser.add_argument("--ocr-lang", default="eng")
+    record_parser.add_argument("--max-frames", type=int, default=None)
+    record_parser.add_argument("--warmup", type=int, default=1, help="Frames run before timing")
+    record_parser.set_defaults(func=record)
+
+    compare_parser = commands.add_parser("compare", help="Score a candidate run against a golden run")
+    compare_parser.add_argument("golden")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--iou", type=float, default=0.5, help="IoU for a box to count as matched")
+    compare_parser.add_argument("--min-iou", type=float, default=0.85)
+    compare_parser.add_argument("--min-recall", type=float, default=0.95)
+    compare_parser.add_argument("--min-precision", type=float, default=0.95)
+    compare_parser.add_argument("--min-scene-agreement", type=float, default=0.95)
+    compare_parser.add_argument("--max-cer", type=float, default=0.02)
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    if args.command == "record":
+        unknown = [name for name in args.ops.split(",") if name not in ALL_OPERATIONS]
+        if unknown:
+            parser.error(f"Unknown operations: {unknown}. Choose from {list(ALL_OPERATIONS)}")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# backend/bench/stubs.py
+# Local stand-ins for the Roboflow and Ollama HTTP APIs with configurable latency,
+# so operations that call them can be benchmarked without network or GPU variance.
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    server_version = "VisionAidStub/1.0"
+
+    def log_message(self, format, *args):  # Keep benchmark output clean
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        stub = self.server.stub
+        stub.requests_served += 1
+        if stub.fail:
+            self.send_response(503)
+            self.end_headers()
+            return
+        if stub.latency:
+            time.sleep(stub.latency)
+        payload = json.dumps(stub.respond(self.path, body)).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class StubServer:
+    """Runs a stub API on 127.0.0.1 in a background thread. `fail=True` simulates an outage."""
+
+    def __init__(self, latency=0.0, fail=False, port=0):
+        self.latency = latency
+        self.fail = fail
+        self.requests_served = 0
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), _StubHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._httpd.server_address[1]
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def respond(self, path, body):
+        raise NotImplementedError
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class RoboflowStub(StubServer):
+    """Answers like detect.roboflow.com with a single confident banknote prediction."""
+
+    def __init__(self, latency=0.0, fail=False, port=0, currency="100 AED", confidence=0.9):
+        super().__init__(latency, fail, port)
+        self.currency = currency
+        self.confidence = confidence
+
+    @property
+    def endpoint(self):
+        return f"{self.base_url}/currency-stub/1"
+
+    def respond(self, path, body):
+        return {
+            "predictions": [
+                {
+                    "x": 320, "y": 240, "width": 300, "height": 150,
+                    "class": self.currency, "confidence": self.confidence,
+                }
+            ]
+        }
+
+
+def parse_keep_alive(value, default=300.0):
+    """Ollama keep_alive ("30m", "90s", "1h", seconds, negative = forever) in seconds."""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float("inf") if value < 0 else float(value)
+    units = {"s": 1, "m": 60, "h": 3600}
+    text = str(value).strip()
+    if text and text[-1] in units:
+        seconds = float(text[:-1]) * units[text[-1]]
+    else:
+        seconds = float(text)
+    return float("inf") if seconds < 0 else seconds
+
+
+class OllamaStub(StubServer):
+    """
+    Answers /api/generate: a feature id for image prompts, the prompt's text otherwise.
+    Also mimics model residency: a request for a model that is not loaded waits
+    `load_latency` first, and a model unloads after its last keep_alive runs out.
+    An empty prompt only loads the model, as in Ollama.
+    """
+
+    def __init__(self, latency=0.0, fail=False, port=0, feature="scene_detection", load_latency=0.0):
+        super().__init__(latency, fail, port)
+        self.feature = feature
+        self.load_latency = load_latency
+        self.last_payload = None
+        self.loads = 0
+        self._resident = {}  # model -> time.monotonic() it unloads at
+        self._resident_lock = threading.Lock()
+
+    @property
+    def generate_url(self):
+        return f"{self.base_url}/api/generate"
+
+    def is_loaded(self, model):
+        with self._resident_lock:
+            return self._resident.get(model, 0.0) > time.monotonic()
+
+    def _touch_model(self, model, keep_alive):
+        with self._resident_lock:
+            cold = self._resident.get(model, 0.0) <= time.monotonic()
+            if cold:
+                self.loads += 1
+        if cold and self.load_latency:
+            time.sleep(self.load_latency)
+        with self._resident_lock:
+            self._resident[model] = time.monotonic() + parse_keep_alive(keep_alive)
+
+    def respond(self, path, body):
+        try:
+            self.last_payload = json.loads(body or b"{}")
+        except ValueError:
+            self.last_payload = {}
+        model = self.last_payload.get("model", "")
+        self._touch_model(model, self.last_payload.get("keep_alive"))
+        if not self.last_payload.get("prompt") and not self.last_payload.get("images"):
+            return {"model": model, "response": "", "done": True, "done_reason": "load"}
+        if self.last_payload.get("images"):
+            text = self.feature
+        else:
+            # Echo the text to clean (the instructions come in "system"), like a cleaner that changes nothing
+            text = self.last_payload.get("prompt", "")
+        return {"model": self.last_payload.get("model", ""), "response": text, "done": True}
@@ -0,0 +1,259 @@
+# backend/circuit_breaker.py
+# Per-upstream circuit breakers so a slow or down Ollama/Roboflow fails fast
+# instead of holding a server thread for the full request timeout.
+
+import logging
+import threading
+import time
+from collections import deque
+
+from metrics import Gauge, register, register_collector
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised by CircuitBreaker.call when the upstream is not being called."""
+
+    def __init__(self, name, retry_in):
+        super().__init__(f"Circuit '{name}' is open (retry in {retry_in:.1f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker.
+
+    Calls are recorded in a time window of `window_seconds`. A call counts as bad if it
+    raised or took longer than `slow_call_seconds`. Once at least `min_calls` are in the
+    window and the bad ratio reaches `failure_rate_threshold`, the breaker opens and
+    rejects calls for `open_seconds`. It then goes half-open and lets up to
+    `half_open_max_calls` probe calls through: one good probe closes it again,
+    one bad probe re-opens it.
+    """
+
+    def __init__(
+        self,
+        name,
+        window_seconds=30.0,
+        min_calls=5,
+        failure_rate_threshold=0.5,
+        slow_call_seconds=10.0,
+        open_seconds=15.0,
+        half_open_max_calls=1,
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self._lock = threading.Lock()
+        self._calls = deque()  # (timestamp, is_bad, latency)
+        self._state = STATE_CLOSED
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self._times_opened = 0
+        self._rejected_calls = 0
+
+    def _prune(self, now):
+        cutoff = now - self.window_seconds
+        while self._calls and self._calls[0][0] < cutoff:
+            self._calls.popleft()
+
+    def _open(self, now):
+        self._state = STATE_OPEN
+        self._opened_at = now
+        self._half_open_in_flight = 0
+        self._times_opened += 1
+
+    def allow_request(self):
+        """Returns True if the caller may contact the upstream now."""
+        with self._lock:
+            now = time.time()
+            if self._state == STATE_OPEN:
+                if now - self._opened_at < self.open_seconds:
+                    self._rejected_calls += 1
+                    return False
+                self._state = STATE_HALF_OPEN
+                self._half_open_in_flight = 0
+                logger.info(f"Circuit '{self.name}' half-open, probing upstream.")
+            if self._state == STATE_HALF_OPEN:
+                if self._half_open_in_flight >= self.half_open_max_calls:
+                    self._rejected_calls += 1
+                    return False
+                self._half_open_in_flight += 1
+            return True
+
+    def record(self, success, latency):
+        with self._lock:
+            now = time.time()
+            is_bad = (not success) or latency > self.slow_call_seconds
+            if self._state == STATE_HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+                if is_bad:
+                    self._open(now)
+                    logger.warning(
+                        f"Circuit '{self.name}' probe failed ({latency:.2f}s). Re-opened for {self.open_seconds:.0f}s."
+                    )
+                else:
+                    self._state = STATE_CLOSED
+                    self._calls.clear()
+                    logger.info(f"Circuit '{self.name}' closed, upstream recovered.")
+                return
+            if self._state == STATE_OPEN:
+                return  # Late result of a call admitted before the breaker opened
+
+            self._calls.append((now, is_bad, latency))
+            self._prune(now)
+            total = len(self._calls)
+            bad = sum(1 for _, call_bad, _ in self._calls if call_bad)
+            if total >= self.min_calls and bad / total >= self.failure_rate_threshold:
+                self._open(now)
+                logger.error(
+                    f"Circuit '{self.name}' opened: {bad}/{total} bad calls in {self.window_seconds:.0f}s. Failing fast for {self.open_seconds:.0f}s."
+                )
+
+    def call(self, func, *args, **kwargs):
+        """
+        Runs func through the breaker. Raises CircuitOpenError without calling func
+        when the breaker is open; exceptions from func are recorded and re-raised.
+        """
+        if not self.allow_request():
+            raise self.open_error()
+        start = time.time()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record(False, time.time() - start)
+            raise
+        self.record(True, time.time() - start)
+        return result
+
+    def call_clamped(self, clamped, timeout_errors, func, *args, **kwargs):
+        """
+        call() for a request whose timeout may have been cut short by the client's
+        deadline (`clamped`). Such a timeout (one of `timeout_errors`) says nothing about
+        the upstream, so it is not recorded; otherwise one client sending short
+        deadlines could open the breaker for everyone.
+        """
+        if not self.allow_request():
+            raise self.open_error()
+        start = time.time()
+        try:
+            result = func(*args, **kwargs)
+        except timeout_errors:
+            if clamped:
+                self.release()
+            else:
+                self.record(False, time.time() - start)
+            raise
+        except Exception:
+            self.record(False, time.time() - start)
+            raise
+        self.record(True, time.time() - start)
+        return result
+
+    def release(self):
+        """Ends a call admitted by allow_request without recording it (frees a half-open probe slot)."""
+        with self._lock:
+            if self._state == STATE_HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    def open_error(self):
+        """CircuitOpenError for a rejected call, for callers that use allow_request/record directly."""
+        with self._lock:
+            retry_in = max(0.0, self.open_seconds - (time.time() - self._opened_at))
+        return CircuitOpenError(self.name, retry_in)
+
+    def snapshot(self):
+        with self._lock:
+            now = time.time()
+            if self._state == STATE_OPEN and now - self._opened_at >= self.open_seconds:
+                state = STATE_HALF_OPEN  # Will transition on the next request
+            else:
+                state = self._state
+            self._prune(now)
+            latencies = [latency for _, _, latency in self._calls]
+            return {
+                "name": self.name,
+                "state": state,
+                "window_calls": len(self._calls),
+                "window_failures": sum(1 for _, bad, _ in self._calls if bad),
+                "window_avg_latency": (sum(latencies) / len(latencies)) if latencies else 0.0,
+                "times_opened": self._times_opened,
+                "rejected_calls": self._rejected_calls,
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name, **settings):
+    """Returns the process-wide breaker for an upstream, creating it on first use."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, **settings)
+            _breakers[name] = breaker
+        return breaker
+
+
+def get_breaker_states():
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+# --- Metrics ---
+_STATE_VALUES = {STATE_CLOSED: 0, STATE_HALF_OPEN: 1, STATE_OPEN: 2}
+BREAKER_STATE = register(
+    Gauge(
+        "visionaid_circuit_breaker_state",
+        "Circuit breaker state per upstream (0=closed, 1=half_open, 2=open).",
+        ("upstream",),
+    )
+)
+BREAKER_WINDOW_FAILURE_RATIO = register(
+    Gauge(
+        "visionaid_circuit_breaker_window_failure_ratio",
+        "Share of bad calls in the breaker's rolling window.",
+        ("upstream",),
+    )
+)
+BREAKER_TIMES_OPENED = register(
+    Gauge(
+        "visionaid_circuit_breaker_opened_total",
+        "Times the breaker has opened since startup.",
+        ("upstream",),
+    )
+)
+BREAKER_REJECTED_CALLS = register(
+    Gauge(
+        "visionaid_circuit_breaker_rejected_calls_total",
+        "Calls failed fast by the breaker since startup.",
+        ("upstream",),
+    )
+)
+
+
+def _collect_breaker_metrics():
+    for name, state in get_breaker_states().items():
+        BREAKER_STATE.set(_STATE_VALUES[state["state"]], upstream=name)
+        ratio = (
+            state["window_failures"] / state["window_calls"] if state["window_calls"] else 0.0
+        )
+        BREAKER_WINDOW_FAILURE_RATIO.set(ratio, upstream=name)
+        BREAKER_TIMES_OPENED.set(state["times_opened"], upstream=name)
+        BREAKER_REJECTED_CALLS.set(state["rejected_calls"], upstream=name)
+
+
+register_collector(_collect_breaker_metrics)
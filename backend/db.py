@@ -1,22 +1,54 @@
 import os
 
-from App import *
-
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"  # Keep if needed
 
+import logging
+import threading
+import time
+from datetime import datetime
+
 from flask_sqlalchemy import SQLAlchemy
 
+logger = logging.getLogger(__name__)
 
+# Set DATABASE_URL=sqlite:///visionaid.db to run locally without MySQL
 DB_URI = os.environ.get(
     "DATABASE_URL", "mysql+pymysql://root:@127.0.0.1:3306/visualaiddb"
 )
-app.config["SQLALCHEMY_DATABASE_URI"] = DB_URI
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["SQLALCHEMY_ECHO"] = False
-db = SQLAlchemy(app)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 5))  # Seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))  # MySQL drops idle connections (wait_timeout)
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "True").lower() in ("true", "1", "t")
+DB_CONNECT_TIMEOUT = int(os.environ.get("DB_CONNECT_TIMEOUT", 5))
+# After a failed schema setup, callers get False straight away for this many seconds
+# instead of each waiting out a connect timeout while the DB is down
+DB_RETRY_SECONDS = float(os.environ.get("DB_RETRY_SECONDS", 30))
+
+db = SQLAlchemy()
+_app = None
+_schema_ready = False
+_schema_failed_at = None  # time.monotonic() of the last failed setup
+_schema_lock = threading.Lock()
 
 
-def test_db_connection():
+def engine_options(uri):
+    """SQLAlchemy create_engine kwargs for `uri`. SQLite manages its own pool."""
+    if uri.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False}}
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if uri.startswith("mysql"):
+        options["connect_args"] = {"connect_timeout": DB_CONNECT_TIMEOUT}
+    return options
+
+
+def test_db_connection(app):
     try:
         with app.app_context():
             with db.engine.connect() as connection:
@@ -37,12 +69,99 @@ class User(db.Model):
     customization = db.Column(db.String(255), default="0" * 255)
 
 
-with app.app_context():
-    try:
-        db.create_all()
-        if not test_db_connection():
+class RequestHistory(db.Model):
+    """One row per handled socket request (written in batches by history_writer.py)."""
+
+    __tablename__ = "request_history"
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    client_sid = db.Column(db.String(64))
+    user_email = db.Column(db.String(255), index=True)
+    feature = db.Column(db.String(64), nullable=False, index=True)
+    origin = db.Column(db.String(32), nullable=False)
+    status = db.Column(db.String(32), nullable=False)
+    latency_ms = db.Column(db.Float, nullable=False)
+    result_summary = db.Column(db.String(255))
+
+
+def init_db(app):
+    """
+    Binds the database to the Flask app (called from App.py). Does not connect:
+    the schema is created by ensure_schema() on first use, and a background
+    thread warms it up so a slow or absent MySQL doesn't block startup.
+    """
+    global _app
+    _app = app
+    app.config["SQLALCHEMY_DATABASE_URI"] = DB_URI
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SQLALCHEMY_ECHO"] = False
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(DB_URI)
+    db.init_app(app)
+    threading.Thread(target=ensure_schema, name="db-schema-init", daemon=True).start()
+
+
+def _retry_pending():
+    return (
+        _schema_failed_at is not None
+        and time.monotonic() - _schema_failed_at < DB_RETRY_SECONDS
+    )
+
+
+def ensure_schema():
+    """
+    Creates the tables once. Returns False if the DB is unreachable, and keeps
+    returning False without trying again until DB_RETRY_SECONDS have passed.
+    """
+    global _schema_ready, _schema_failed_at
+    if _schema_ready:
+        return True
+    if _retry_pending():
+        return False
+    with _schema_lock:
+        if _schema_ready:
+            return True
+        if _retry_pending():  # Another thread just failed
+            return False
+        try:
+            with _app.app_context():
+                db.create_all()
+            _schema_ready = test_db_connection(_app)
+        except Exception as e:
+            logger.error(f"Error during DB schema setup: {e}", exc_info=False)
+            _schema_failed_at = time.monotonic()
+            return False
+        if not _schema_ready:
+            _schema_failed_at = time.monotonic()
             logger.warning(
-                "Database connection failed during startup. DB features may not work."
+                f"Database connection failed. DB features may not work; retrying in {DB_RETRY_SECONDS:.0f}s."
+            )
+        else:
+            _schema_failed_at = None
+    return _schema_ready
+
+
+_HISTORY_STRING_LENGTHS = {
+    column.name: column.type.length
+    for column in RequestHistory.__table__.columns
+    if isinstance(column.type, db.String) and column.type.length
+}
+
+
+def fit_history_row(row):
+    """The row with string values cut to their column's length, so no value fails the insert."""
+    fitted = dict(row)
+    for name, length in _HISTORY_STRING_LENGTHS.items():
+        if fitted.get(name) is not None:
+            fitted[name] = str(fitted[name])[:length]
+    return fitted
+
+
+def insert_history_rows(rows):
+    """Bulk insert of RequestHistory rows (list of column dicts) in one transaction."""
+    if not ensure_schema():
+        raise RuntimeError("Database unavailable")
+    with _app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(
+                RequestHistory.__table__.insert(), [fit_history_row(row) for row in rows]
             )
-    except Exception as e:
-        logger.error(f"Error during initial DB setup: {e}", exc_info=True)
@@ -0,0 +1,75 @@
+# backend/frame_encoding.py
+# One base64 JPEG per frame for every outbound call (Ollama routing, Roboflow currency).
+# The client already sent a JPEG, so when the decoded frame is passed on untouched and is
+# small enough, its original bytes are reused; otherwise the frame is downscaled and
+# encoded once, and the result is cached on the request context for later callers.
+
+import base64
+import logging
+
+import cv2
+
+from metrics import observe_stage, record_cache_lookup
+from request_context import get_request_context
+
+try:  # Optional, faster libjpeg-turbo based encoder
+    import simplejpeg
+except ImportError:
+    simplejpeg = None
+
+logger = logging.getLogger(__name__)
+
+JPEG_MAGIC = b"\xff\xd8\xff"
+
+
+def _encode_jpeg(image_np, max_side, quality):
+    height, width = image_np.shape[:2]
+    scale = max_side / float(max(height, width)) if max_side else 1.0
+    if scale < 1.0:
+        with observe_stage("resize"):
+            image_np = cv2.resize(
+                image_np, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+            )
+    with observe_stage("jpeg_encode"):
+        if simplejpeg is not None and image_np.ndim == 3 and image_np.shape[2] == 3:
+            return simplejpeg.encode_jpeg(
+                image_np if image_np.flags["C_CONTIGUOUS"] else image_np.copy(),
+                quality=quality,
+                colorspace="BGR",
+            )
+        success, buffer = cv2.imencode(
+            ".jpg", image_np, [cv2.IMWRITE_JPEG_QUALITY, quality]
+        )
+        if not success:
+            return None
+        return buffer.tobytes()
+
+
+def encode_frame_base64(image_np, max_side, quality):
+    """
+    Returns the frame as a base64 JPEG string for outbound APIs, or None if encoding failed.
+    Reuses the client's original JPEG when image_np is the request's decoded frame and
+    fits within max_side; caches the result on the request context either way.
+    """
+    ctx = get_request_context()
+    is_request_frame = ctx is not None and ctx.frame is image_np
+    if is_request_frame and ctx.frame_jpeg_base64 is not None:
+        record_cache_lookup("outbound_jpeg", True)
+        return ctx.frame_jpeg_base64
+    record_cache_lookup("outbound_jpeg", False)
+
+    jpeg_bytes = None
+    if is_request_frame and ctx.frame_bytes and ctx.frame_bytes.startswith(JPEG_MAGIC):
+        height, width = image_np.shape[:2]
+        if not max_side or max(height, width) <= max_side:
+            jpeg_bytes = ctx.frame_bytes
+    if jpeg_bytes is None:
+        jpeg_bytes = _encode_jpeg(image_np, max_side, quality)
+        if jpeg_bytes is None:
+            logger.error("Failed to encode frame to JPEG for outbound request.")
+            return None
+
+    encoded = base64.b64encode(jpeg_bytes).decode("utf-8")
+    if is_request_frame:
+        ctx.frame_jpeg_base64 = encoded
+    return encoded
@@ -0,0 +1,81 @@
+# backend/frame_quality.py
+# Cheap checks for frames no model can do anything useful with: motion blur
+# (variance of the Laplacian) and bad exposure (luminance histogram), measured on
+# a small grayscale copy so they cost well under a millisecond next to the models.
+# Also picks the sharpest frame of a burst, decoding each candidate at 1/4 size.
+
+import collections
+
+import cv2
+import numpy as np
+
+FrameQuality = collections.namedtuple(
+    "FrameQuality", ("sharpness", "brightness", "dark_fraction", "bright_fraction")
+)
+
+DARK_PIXEL = 32  # Luminance at or below this counts as crushed shadow
+BRIGHT_PIXEL = 235  # At or above this counts as blown highlight
+
+FRAME_ISSUE_MESSAGES = {
+    "too_dark": "The image is too dark. Turn on a light or move somewhere brighter.",
+    "too_bright": "The image is overexposed. Avoid pointing the camera at a light or window.",
+    "blurry": "The image is blurry. Hold the camera steady and try again.",
+}
+
+
+def _small_gray(image_np, max_side):
+    gray = cv2.cvtColor(image_np, cv2.COLOR_BGR2GRAY) if image_np.ndim == 3 else image_np
+    height, width = gray.shape[:2]
+    scale = max_side / float(max(height, width))
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return gray
+
+
+def measure_gray(gray):
+    histogram = cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel()
+    total = histogram.sum() or 1.0
+    return FrameQuality(
+        sharpness=float(cv2.Laplacian(gray, cv2.CV_64F).var()),
+        brightness=float(np.dot(histogram, np.arange(256)) / total),
+        dark_fraction=float(histogram[: DARK_PIXEL + 1].sum() / total),
+        bright_fraction=float(histogram[BRIGHT_PIXEL:].sum() / total),
+    )
+
+
+def assess_frame(image_np, max_side=320):
+    return measure_gray(_small_gray(image_np, max_side))
+
+
+def assess_encoded_frame(image_bytes, max_side=320):
+    """assess_frame for an undecoded JPEG/PNG; None if it can't be decoded."""
+    gray = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if gray is None:
+        return None
+    return measure_gray(_small_gray(gray, max_side))
+
+
+def frame_issue(quality, min_sharpness, dark_level, bright_level, clipped_fraction,
+                check_blur=True):
+    """
+    "too_dark", "too_bright", "blurry" or None. Exposure is checked first: a dark
+    frame also has little Laplacian energy, and "blurry" would be the wrong advice.
+    """
+    if quality.brightness < dark_level or quality.dark_fraction >= clipped_fraction:
+        return "too_dark"
+    if quality.brightness > bright_level or quality.bright_fraction >= clipped_fraction:
+        return "too_bright"
+    if check_blur and quality.sharpness < min_sharpness:
+        return "blurry"
+    return None
+
+
+def sharpest_frame(frames_bytes, max_side=320):
+    """Index of the sharpest decodable frame, or None if none decodes."""
+    best_index = None
+    best_sharpness = -1.0
+    for index, image_bytes in enumerate(frames_bytes):
+        quality = assess_encoded_frame(image_bytes, max_side)
+        if quality is not None and quality.sharpness > best_sharpness:
+            best_index, best_sharpness = index, quality.sharpness
+    return best_index
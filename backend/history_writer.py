@@ -0,0 +1,152 @@
+# backend/history_writer.py
+# Request history for analytics, kept off the hot path: handlers append a row to an
+# in-memory buffer and a background thread flushes it with one bulk insert every
+# `batch_size` rows or `flush_interval` seconds, whichever comes first. If the DB is
+# slow or down the buffer is bounded and the oldest rows are dropped (and counted).
+# A failed bulk insert is retried one row at a time, so one bad row doesn't cost the
+# whole batch; a few consecutive row failures mean the DB is down and the rest is dropped.
+
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from metrics import Counter, register
+
+logger = logging.getLogger(__name__)
+
+HISTORY_ROWS = register(
+    Counter(
+        "visionaid_history_rows_total",
+        "Request history rows by outcome (written, dropped, failed).",
+        ("result",),
+    )
+)
+
+
+class HistoryWriter:
+    def __init__(self, flush_func, batch_size=100, flush_interval=1.0, max_buffer=10000,
+                 max_row_failures=3):
+        self.flush_func = flush_func  # Called with a list of row dicts; may raise
+        self.batch_size = batch_size
+        self.max_row_failures = max_row_failures  # Consecutive, when retrying row by row
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def start(self):
+        with self._cond:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(
+                    target=self._run, name="history-writer", daemon=True
+                )
+                self._thread.start()
+
+    def record(self, **row):
+        """Queues one row. Never blocks on the database."""
+        row.setdefault("created_at", datetime.utcnow())
+        with self._cond:
+            if len(self._buffer) >= self.max_buffer:
+                self._buffer.popleft()
+                HISTORY_ROWS.inc(result="dropped")
+            self._buffer.append(row)
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            return len(self._buffer)
+
+    def _take_batch(self):
+        batch = []
+        while self._buffer and len(batch) < self.batch_size:
+            batch.append(self._buffer.popleft())
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._stopping and len(self._buffer) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def flush(self):
+        """Writes everything buffered so far, one bulk insert per batch."""
+        while True:
+            with self._cond:
+                batch = self._take_batch()
+            if not batch:
+                return
+            try:
+                self.flush_func(batch)
+                HISTORY_ROWS.inc(len(batch), result="written")
+            except Exception as e:
+                logger.warning(f"Bulk insert of {len(batch)} request history rows failed: {e}")
+                if not self._flush_rows(batch):
+                    return
+
+    def _flush_rows(self, batch):
+        """
+        Inserts the rows one at a time. Returns False (dropping the remaining rows) after
+        max_row_failures consecutive failures: the DB is down, not just one row bad.
+        Not retried later, or a DB outage would grow the buffer without bound.
+        """
+        consecutive_failures = 0
+        for index, row in enumerate(batch):
+            try:
+                self.flush_func([row])
+                HISTORY_ROWS.inc(result="written")
+                consecutive_failures = 0
+            except Exception as e:
+                HISTORY_ROWS.inc(result="failed")
+                consecutive_failures += 1
+                logger.warning(f"Dropped request history row ({row.get('feature')!r}): {e}")
+                if consecutive_failures >= self.max_row_failures:
+                    remaining = len(batch) - index - 1
+                    if remaining:
+                        HISTORY_ROWS.inc(remaining, result="failed")
+                        logger.warning(f"Dropped {remaining} more request history rows.")
+                    return False
+        return True
+
+    def stop(self, timeout=5.0):
+        """Flushes what is buffered and stops the thread."""
+        with self._cond:
+            thread = self._thread
+            self._stopping = True
+            self._cond.notify()
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            self._thread = None
+
+
+_writer = None
+
+
+def configure_history_writer(flush_func, batch_size, flush_interval, max_buffer):
+    """Starts the process-wide writer used by record_history()."""
+    global _writer
+    if _writer is None:
+        _writer = HistoryWriter(flush_func, batch_size, flush_interval, max_buffer)
+        _writer.start()
+        atexit.register(_writer.stop)
+    return _writer
+
+
+def record_history(**row):
+    if _writer is not None:
+        _writer.record(**row)
@@ -0,0 +1,227 @@
+# backend/metrics.py
+# Minimal in-process metrics registry rendered in the Prometheus text format at /metrics.
+# Per-stage latencies are labelled from the current RequestContext (feature, origin).
+# For requests sampled by tracing.py, each stage is also recorded as a span.
+
+import contextlib
+import threading
+import time
+
+from request_context import get_request_context
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+def _escape_label_value(value):
+    """Backslash, double quote and newline escaped, as the text exposition format requires."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount=1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        with self._lock:
+            items = sorted(
+                (key, list(state["counts"]), state["sum"], state["count"])
+                for key, state in self._values.items()
+            )
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+_registry = []
+_collectors = []
+_registry_lock = threading.Lock()
+
+
+def register(metric):
+    with _registry_lock:
+        _registry.append(metric)
+    return metric
+
+
+def register_collector(collector):
+    """Registers a callable that refreshes gauges right before /metrics is rendered."""
+    with _registry_lock:
+        _collectors.append(collector)
+
+
+def render_metrics():
+    with _registry_lock:
+        collectors = list(_collectors)
+        metrics = list(_registry)
+    for collector in collectors:
+        collector()
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- VisionAid metrics ---
+STAGE_LATENCY = register(
+    Histogram(
+        "visionaid_stage_duration_seconds",
+        "Time spent in each processing stage of a request.",
+        ("feature", "origin", "stage"),
+    )
+)
+REQUEST_LATENCY = register(
+    Histogram(
+        "visionaid_request_duration_seconds",
+        "End-to-end handle_message time.",
+        ("feature", "origin", "status"),
+    )
+)
+REQUESTS_IN_FLIGHT = register(
+    Gauge("visionaid_requests_in_flight", "Requests currently being processed.")
+)
+ACTIVE_SOCKETS = register(
+    Gauge("visionaid_active_sockets", "Connected Socket.IO clients.")
+)
+REQUESTS_IN_FLIGHT.set(0)
+ACTIVE_SOCKETS.set(0)
+CACHE_LOOKUPS = register(
+    Counter(
+        "visionaid_cache_lookups_total",
+        "Cache lookups by cache and result (hit/miss).",
+        ("cache", "result"),
+    )
+)
+
+
+def record_stage(stage, seconds):
+    """Records a stage that was timed by the caller (e.g. around a long loop)."""
+    ctx = get_request_context()
+    if ctx is None:
+        STAGE_LATENCY.observe(seconds, feature="none", origin="none", stage=stage)
+        return
+    if ctx.trace is not None:
+        ctx.trace.add_span(stage, seconds)
+    STAGE_LATENCY.observe(
+        seconds, feature=ctx.feature or "unknown", origin=ctx.origin, stage=stage
+    )
+
+
+@contextlib.contextmanager
+def observe_stage(stage):
+    """Times the enclosed block as `stage` for the current request (and traces it if sampled)."""
+    ctx = get_request_context()
+    trace = ctx.trace if ctx is not None else None
+    span = trace.start_span(stage) if trace is not None else None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if span is not None:
+            trace.end_span(span)
+        if ctx is None:
+            STAGE_LATENCY.observe(elapsed, feature="none", origin="none", stage=stage)
+        else:
+            STAGE_LATENCY.observe(
+                elapsed, feature=ctx.feature or "unknown", origin=ctx.origin, stage=stage
+            )
+
+
+def record_cache_lookup(cache, hit):
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
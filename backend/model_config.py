@@ -2,6 +2,9 @@ import os
 
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"  # Keep if needed
 
+# Must come before torch: sets the OpenMP/MKL/Tesseract thread limits (see thread_topology.py)
+from thread_topology import thread_topology
+
 import torch
 import logging
 import pytesseract  # For OCR
@@ -9,7 +12,19 @@ import torchvision.models as models  # For Places365
 import torchvision.transforms as transforms  # For Places365
 import requests
 import sys
+import threading
 from ultralytics import YOLO  # Using YOLO from ultralytics
+from ultralytics import __version__ as ULTRALYTICS_VERSION
+
+from weight_store import (
+    MMAP_SUPPORTED,
+    format_memory,
+    load_state_dict_shared,
+    process_memory,
+    share_module_weights,
+)
+
+thread_topology.apply()
 
 
 # --- Debug Configuration ---
@@ -71,6 +86,47 @@ elif DEFAULT_OCR_LANG not in SUPPORTED_OCR_LANGS:
         f"Default OCR Lang '{DEFAULT_OCR_LANG}' not in detected/defined list {SUPPORTED_OCR_LANGS}. OCR might fail if '{DEFAULT_OCR_LANG}' is requested and unavailable."
     )
 
+# --- OCR Script Detection ---
+# Clients may send language "auto" (or omit it in SuperVision) to let Tesseract OSD
+# (--psm 0) pick the language from the detected script. Mixed-script frames are read
+# with a combined language string such as "ara+eng".
+OCR_AUTO_LANG = "auto"
+OSD_SCRIPT_TO_LANG = {
+    "Latin": "eng",
+    "Arabic": "ara",
+    "Cyrillic": "rus",
+    "Greek": "ell",
+    "Hebrew": "heb",
+    "Devanagari": "hin",
+    "Bengali": "ben",
+    "Tamil": "tam",
+    "Thai": "tha",
+    "Han": "chi_sim",
+    "Hangul": "kor",
+    "Japanese": "jpn",
+    "Katakana": "jpn",
+    "Hiragana": "jpn",
+}
+OSD_MIN_SCRIPT_CONFIDENCE = 1.0  # Tesseract script_conf below this is treated as unreliable
+OSD_MAX_IMAGE_SIDE = 1024  # OSD only needs coarse glyph shapes, so run it on a downscaled copy
+OCR_LANG_CACHE_TTL = 10.0  # Seconds a client's detected language is reused before re-running OSD
+# The cached language is only reused while the client's view looks the same: frames are
+# compared by an 8x8 average hash, and more differing bits than this re-runs OSD
+OCR_LANG_MAX_VIEW_CHANGE = 12
+# Selective LLM cleanup: OCR lines whose mean Tesseract word confidence (0-100) is at
+# least this are returned as-is; only runs of lower-confidence lines go to the LLM,
+# together with this many correct neighbouring lines on each side as context.
+OCR_CLEANUP_MIN_CONFIDENCE = 85.0
+OCR_CLEANUP_CONTEXT_LINES = 1
+# Longer text is split at paragraph (else line) boundaries into chunks of about this
+# many characters, cleaned concurrently and reassembled in order
+OCR_CLEANUP_CHUNK_CHARS = 600
+OSD_AVAILABLE = "osd" in SUPPORTED_OCR_LANGS
+if not OSD_AVAILABLE:
+    logger.warning(
+        "Tesseract 'osd' data not installed. Automatic OCR language detection will fall back to the default language."
+    )
+
 # --- Constants ---
 OBJECT_DETECTION_CONFIDENCE = 0.55
 MAX_OBJECTS_TO_RETURN = 4
@@ -78,18 +134,250 @@ CURRENCY_DETECTION_CONFIDENCE = 0.6  # Confidence for currency (can be used for
 
 # --- Roboflow API Configuration for Currency Detection ---
 ROBOFLOW_API_KEY = "Ey5qUJWyHf0BwJnIjXBv"  # YOUR ACTUAL ROBOFLOW API KEY
-ROBOFLOW_MODEL_ENDPOINT = "https://detect.roboflow.com/currency-vzh7u/2" # YOUR ROBOFLOW MODEL ENDPOINT
+ROBOFLOW_MODEL_ENDPOINT = os.environ.get(
+    "ROBOFLOW_MODEL_ENDPOINT", "https://detect.roboflow.com/currency-vzh7u/2"
+)  # YOUR ROBOFLOW MODEL ENDPOINT (override to point at a local stub)
+
+ROBOFLOW_REQUEST_TIMEOUT = 20
+
+# --- Outbound Image Encoding (see frame_encoding.py) ---
+# Frames sent to Ollama/Roboflow are encoded once per request and shared. The client's
+# own JPEG is reused when the frame is no larger than OUTBOUND_JPEG_MAX_SIDE; otherwise
+# it is downscaled and re-encoded (with simplejpeg if installed, else OpenCV).
+OUTBOUND_JPEG_MAX_SIDE = 1024
+OUTBOUND_JPEG_QUALITY = 85
+
+# --- Text Cleaning Cache (see text_cleaning_cache.py) ---
+# LLM-cleaned OCR text is cached in memory and in a SQLite file shared by all worker
+# processes. Set TEXT_CLEANING_CACHE_PATH="" to keep the cache in memory only.
+TEXT_CLEANING_CACHE_PATH = os.environ.get(
+    "TEXT_CLEANING_CACHE_PATH", "cache/text_cleaning.sqlite3"
+)
+TEXT_CLEANING_CACHE_MEMORY_ENTRIES = 2048
+TEXT_CLEANING_CACHE_MAX_ROWS = 100000
+
+# --- Tracing & Profiling (see tracing.py / profiling.py) ---
+# TRACE_SAMPLE_RATE is the share of requests traced (0 disables tracing entirely).
+# Traces go to TRACE_OUTPUT_PATH as OTLP/JSON lines and/or to an OTLP/HTTP collector,
+# e.g. TRACE_OTLP_ENDPOINT=http://localhost:4318/v1/traces.
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", "0"))
+TRACE_OUTPUT_PATH = os.environ.get("TRACE_OUTPUT_PATH", "traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.environ.get("TRACE_OTLP_ENDPOINT")
+PROFILE_OUTPUT_DIR = os.environ.get("PROFILE_OUTPUT_DIR", "profiles")
+PROFILE_MAX_SECONDS = 300
+# Admin routes (/admin/...) are disabled unless this token is set; send it as X-Admin-Token.
+ADMIN_TOKEN = os.environ.get("VISIONAID_ADMIN_TOKEN")
+
+# --- Asyncio Server Mode (see async_server.py) ---
+# CPU-bound operations (YOLO, Places365, Tesseract) run on the shared priority scheduler
+# (SCHEDULER_WORKERS below); operations that still block on HTTP (Roboflow, text
+# cleaning) run on the larger I/O pool.
+ASYNC_IO_WORKERS = int(os.environ.get("ASYNC_IO_WORKERS", 64))
+
+# --- Request Types ---
+# "type" values the servers handle. Any other client-sent type is recorded as
+# UNKNOWN_FEATURE in metrics labels, traces and request history, so clients can't
+# create unbounded label sets.
+KNOWN_FEATURES = (
+    "object_detection",
+    "focus_detection",
+    "hazard_detection",
+    "scene_detection",
+    "text_detection",
+    "currency_detection",
+    "supervision",
+)
+UNKNOWN_FEATURE = "unknown"
+
+# --- Request Deadlines (see request_context.py) ---
+# Server-side latency budget per request type. Clients may send a tighter or looser
+# budget as "deadline_ms" (milliseconds from when the server receives the frame),
+# capped at MAX_REQUEST_DEADLINE_SECONDS. Upstream and OCR timeouts are clamped to
+# whatever is left, and stages that would start after the deadline are skipped.
+FEATURE_DEADLINE_SECONDS = {
+    "hazard_detection": 2.0,
+    "focus_detection": 2.0,
+    "object_detection": 5.0,
+    "scene_detection": 5.0,
+    "currency_detection": 15.0,
+    "text_detection": 30.0,
+    "supervision": 90.0,
+}
+DEFAULT_REQUEST_DEADLINE_SECONDS = 30.0
+MAX_REQUEST_DEADLINE_SECONDS = 120.0
+MIN_UPSTREAM_TIMEOUT_SECONDS = 0.5  # Don't start an HTTP/OCR call with less budget than this
+
+# --- Upstream Circuit Breakers (see circuit_breaker.py) ---
+# Calls slower than slow_call_seconds count as failures. Once the breaker opens,
+# callers get their fallback immediately for open_seconds before a probe is let through.
+CIRCUIT_BREAKER_SETTINGS = {
+    "ollama": {
+        "window_seconds": 60.0,
+        "min_calls": 3,
+        "failure_rate_threshold": 0.5,
+        "slow_call_seconds": 20.0,
+        "open_seconds": 30.0,
+        "half_open_max_calls": 1,
+    },
+    "roboflow": {
+        "window_seconds": 60.0,
+        "min_calls": 3,
+        "failure_rate_threshold": 0.5,
+        "slow_call_seconds": 8.0,
+        "open_seconds": 30.0,
+        "half_open_max_calls": 1,
+    },
+}
+
+# --- Currency Detection Backend ---
+# "local" runs the YOLO currency model in-process (no network round trip, works offline).
+# "roboflow" always uses the hosted API. With "local", Roboflow is still used as a
+# fallback when the local model is missing or errors, unless CURRENCY_ROBOFLOW_FALLBACK is off.
+CURRENCY_BACKEND = os.environ.get("CURRENCY_BACKEND", "local").lower()
+CURRENCY_ROBOFLOW_FALLBACK = os.environ.get(
+    "CURRENCY_ROBOFLOW_FALLBACK", "True"
+).lower() in ("true", "1", "t")
+CURRENCY_MODEL_PATH = os.environ.get("CURRENCY_MODEL_PATH", "models/best.pt")
+CURRENCY_CLASS_NAMES_PATH = "models/aed_class_names.txt"
+
+
+# --- Focus Tracking (see operations/track_focus.py) ---
+# YOLO seeds a per-client tracker; frames in between are followed by template matching.
+FOCUS_TRACKING_ENABLED = os.environ.get("FOCUS_TRACKING_ENABLED", "True").lower() in ("true", "1", "t")
+FOCUS_REDETECT_INTERVAL = 5  # Run YOLO at least every Nth focus frame
+FOCUS_TRACK_MIN_SCORE = 0.6  # Template match score (TM_CCOEFF_NORMED) below this re-runs YOLO
+FOCUS_TRACKER_MAX_GAP_SECONDS = 1.0  # Longer pause between frames -> camera likely moved, re-detect
+FOCUS_SEARCH_SCALE = 2.0  # Search window size relative to the object box
+FOCUS_TEMPLATE_MIN_SIDE = 8  # Pixels; smaller boxes are always re-detected
+FOCUS_REINIT_IOU = 0.1  # A new detection overlapping the track less than this restarts the filter
+FOCUS_KALMAN_PROCESS_NOISE = 1e-2
+FOCUS_KALMAN_MEASUREMENT_NOISE = 1e-1
+ROI_PADDING = 0.5  # Focus re-detection crops the last box grown by this fraction on each side
+ROI_MIN_SIDE = 320  # Pixels; keeps some context around small boxes
+ROI_MAX_FRAME_FRACTION = 0.6  # Crops larger than this share of the frame just use the full frame
+
+
+# --- Hazard Detection (see operations/detect_hazards.py) ---
+# Hazards run on their own small YOLO-World model with a short vocabulary at a lower
+# input size. If HAZARD_MODEL_PATH is missing, the main model is used and its results
+# are filtered to HAZARD_CLASSES (every entry must also be in TARGET_CLASSES).
+HAZARD_CLASSES = [
+    "car", "bus", "truck", "motorcycle", "bicycle", "train", "scooter",
+    "knife", "scissors", "stairs", "escalator", "traffic cone", "stop sign",
+    "traffic light", "fire hydrant", "dog", "horse", "cow", "snake", "bear",
+]
+HAZARD_MODEL_PATH = os.environ.get("HAZARD_MODEL_PATH", "models/yolov8s-worldv2.pt")
+HAZARD_IMGSZ = 416
+HAZARD_DETECTION_CONFIDENCE = 0.35  # Lower than objects: a missed hazard costs more than a false alarm
+MAX_HAZARDS_TO_RETURN = 4
+HAZARD_NEAR_BOX_SIDE = 0.5  # sqrt(box area) at which size alone counts as fully near
+HAZARD_HIGH_PROXIMITY = 0.6
+HAZARD_MEDIUM_PROXIMITY = 0.35
+
+# --- Scheduling (see scheduler.py) ---
+# CPU-bound operations from both servers share SCHEDULER_WORKERS threads and are
+# picked by priority (lower first), so queued hazard frames overtake scene/text work.
+# Each worker gets cores // SCHEDULER_WORKERS threads per engine (thread_topology.py).
+SCHEDULER_WORKERS = thread_topology.workers
+FEATURE_PRIORITY = {
+    "hazard_detection": 0,
+    "focus_detection": 1,
+    "object_detection": 1,
+    "local_routing": 2,
+    "scene_detection": 3,
+    "text_detection": 3,
+    "currency_detection": 3,
+}
+DEFAULT_FEATURE_PRIORITY = 3
+
+
+# --- Frame Quality Gating (see frame_quality.py) ---
+# Blurred, dark or blown-out frames get a "retry" answer telling the user what to fix
+# instead of a model run. Measured on a FRAME_QUALITY_MAX_SIDE grayscale copy.
+FRAME_QUALITY_GATING = os.environ.get("FRAME_QUALITY_GATING", "True").lower() in ("true", "1", "t")
+FRAME_QUALITY_MAX_SIDE = 320
+FRAME_MIN_SHARPNESS = 40.0  # Laplacian variance; hand-held sharp frames are well above 100
+FRAME_DARK_LEVEL = 35.0  # Mean luminance (0-255) below this is too dark
+FRAME_BRIGHT_LEVEL = 225.0  # ...above this is overexposed
+FRAME_CLIPPED_FRACTION = 0.6  # Or this share of pixels crushed to black / blown to white
+# Hazard frames come from users on the move: blur is expected and a late warning is worse
+FRAME_QUALITY_BLUR_EXEMPT = {"hazard_detection"}
+# Clients may send up to BURST_MAX_FRAMES frames ("image" plus a "burst" list); the
+# sharpest one is processed
+BURST_MAX_FRAMES = 5
+
+
+# --- Shared Scene Embedding (see operations/extract_features.py) ---
+# The pooled Places365 ResNet-50 feature is computed once per frame and shared by scene
+# classification and SuperVision routing. Routing uses it two ways before asking the
+# LLM: a frame nearly identical to the client's last routed frame reuses that choice,
+# and an optional linear head (trained offline on logged routing decisions) answers
+# when it is confident enough.
+EMBEDDING_ROUTING = os.environ.get("EMBEDDING_ROUTING", "True").lower() in ("true", "1", "t")
+ROUTE_REUSE_SIMILARITY = 0.95  # Cosine similarity of embeddings
+ROUTE_REUSE_TTL = 5.0  # Seconds a client's last routing choice can be reused
+ROUTING_HEAD_PATH = os.environ.get("ROUTING_HEAD_PATH", "models/routing_head.pt")
+ROUTING_HEAD_FEATURES = [  # Output order of the routing head
+    "object_detection", "hazard_detection", "scene_detection",
+    "text_detection", "currency_detection",
+]
+ROUTING_HEAD_MIN_CONFIDENCE = 0.8
+
+
+# --- Shared Model Weights (see weight_store.py) ---
+# Weights are mmapped from a converted copy next to each checkpoint, so worker
+# processes on one node share their physical pages instead of each holding a copy.
+SHARE_MODEL_WEIGHTS = os.environ.get("SHARE_MODEL_WEIGHTS", "True").lower() in ("true", "1", "t")
 
-# --- Obsolete local currency model paths (kept for reference or if you might switch back) ---
-# CURRENCY_MODEL_PATH = "models/best.pt"
-# CURRENCY_CLASS_NAMES_PATH = "models/aed_class_names.txt"
+
+# --- User Settings Cache (see user_settings.py) ---
+USER_SETTINGS_CACHE_SIZE = 1024  # Users kept in memory (LRU)
+USER_SETTINGS_CACHE_TTL = 300.0  # Seconds before a cached user is re-read from the DB
+
+# --- User Authentication (see user_auth.py) ---
+# /login, the per-user routes and socket settings binding are disabled unless this
+# secret is set. Tokens from /login are valid for USER_TOKEN_MAX_AGE seconds.
+USER_AUTH_SECRET = os.environ.get("VISIONAID_AUTH_SECRET")
+USER_TOKEN_MAX_AGE = int(os.environ.get("USER_TOKEN_MAX_AGE", 7 * 24 * 3600))
+
+
+# --- Request History (see history_writer.py, db.RequestHistory) ---
+# Rows are buffered and bulk-inserted every HISTORY_BATCH_SIZE rows or
+# HISTORY_FLUSH_INTERVAL seconds. Pool settings for the DB live in db.py.
+HISTORY_ENABLED = os.environ.get("HISTORY_ENABLED", "True").lower() in ("true", "1", "t")
+HISTORY_BATCH_SIZE = 200
+HISTORY_FLUSH_INTERVAL = 1.0
+HISTORY_MAX_BUFFER = 10000  # Oldest rows are dropped beyond this (DB down or too slow)
 
 
 # --- ML Model Loading ---
-logger.info("Loading ML models...")
+logger.info(f"Loading ML models... (memory: {format_memory(process_memory())})")
 # These will remain None/empty if local currency model loading is disabled
 currency_model = None
 currency_class_names = []
+hazard_model = None  # None -> hazards use yolo_model filtered to HAZARD_CLASSES
+# An ultralytics model keeps one predictor whose args every predict() call rewrites,
+# so concurrent scheduler workers must not share a model without holding its lock.
+yolo_model_lock = threading.Lock()
+hazard_model_lock = threading.Lock()
+routing_head = None  # None -> SuperVision routing only reuses near-duplicate choices
+
+
+def share_yolo_weights(model, model_path):
+    """
+    Fuses the model (predict() would, into fresh heap tensors) and mmaps its weights.
+    The class names are part of the store's fingerprint: set_classes changes the weights.
+    """
+    if not SHARE_MODEL_WEIGHTS:
+        return
+    try:
+        model.fuse()
+        variant = f"{ULTRALYTICS_VERSION}:{model.names!r}"
+        if share_module_weights(model.model, model_path, "fused", variant):
+            logger.info(f"Weights of {model_path} shared via mmap.")
+    except Exception as share_e:
+        logger.warning(f"Could not share weights of {model_path}, keeping a private copy: {share_e}")
+
 
 try:
     # --- Load YOLO-World Model ---
@@ -135,8 +423,34 @@ try:
     logger.info(f"Setting {len(TARGET_CLASSES)} target classes for YOLO-World.")
     yolo_model.set_classes(TARGET_CLASSES)
     logger.info("YOLO-World classes set.")
+    share_yolo_weights(yolo_model, yolo_model_path)
+
+    # --- Load Hazard Model (smaller YOLO-World tier, hazard vocabulary only) ---
+    if os.path.exists(HAZARD_MODEL_PATH):
+        try:
+            hazard_model = YOLO(HAZARD_MODEL_PATH)
+            hazard_model.set_classes(HAZARD_CLASSES)
+            share_yolo_weights(hazard_model, HAZARD_MODEL_PATH)
+            logger.info(
+                f"Hazard model loaded from {HAZARD_MODEL_PATH} with {len(HAZARD_CLASSES)} classes."
+            )
+        except Exception as hazard_e:
+            hazard_model = None
+            logger.error(
+                f"Failed to load hazard model: {hazard_e}. Hazard detection will use the main YOLO-World model.",
+                exc_info=True,
+            )
+    else:
+        logger.warning(
+            f"Hazard model NOT FOUND at: {HAZARD_MODEL_PATH}. Hazard detection will use the main YOLO-World model."
+        )
 
     # --- Load Places365 Model ---
+    def read_places365_state_dict(weights_filename):
+        checkpoint = torch.load(weights_filename, map_location=torch.device("cpu"))
+        state_dict = checkpoint.get("state_dict", checkpoint)
+        return {k.replace("module.", ""): v for k, v in state_dict.items()}
+
     def load_places365_model():
         logger.info("Loading Places365 model...")
         model = models.resnet50(weights=None) # Using weights=None as we load custom checkpoint
@@ -162,10 +476,14 @@ try:
         else:
             logger.debug(f"Found existing Places365 weights at {weights_filename}.")
         try:
-            checkpoint = torch.load(weights_filename, map_location=torch.device("cpu"))
-            state_dict = checkpoint.get("state_dict", checkpoint)
-            state_dict = {k.replace("module.", ""): v for k, v in state_dict.items()}
-            model.load_state_dict(state_dict)
+            if SHARE_MODEL_WEIGHTS and MMAP_SUPPORTED:
+                # Converted once; later starts (and other workers) map the converted copy
+                model.load_state_dict(
+                    load_state_dict_shared(weights_filename, read_places365_state_dict),
+                    assign=True,
+                )
+            else:
+                model.load_state_dict(read_places365_state_dict(weights_filename))
             logger.info("Places365 model weights loaded.")
             model.eval()
             return model
@@ -174,6 +492,10 @@ try:
             raise
 
     places_model = load_places365_model()
+    # Backbone up to the pooled 2048-d feature, and the 365-way classifier on top of it;
+    # both share places_model's weights (see operations/extract_features.py)
+    places_backbone = torch.nn.Sequential(*list(places_model.children())[:-1]).eval()
+    places_head = places_model.fc
 
     # --- Load Places365 Labels ---
     places_labels = []
@@ -219,11 +541,55 @@ try:
         ]
     )
 
-    # --- Custom Currency Detection Model (Roboflow API) ---
-    # The local currency model (Best.pt) loading is now removed.
-    # `currency_model` will remain None and `currency_class_names` will remain [].
-    # The `detect_currency` function in your other file should be the one updated to call Roboflow API.
-    logger.info("Local currency model loading (Best.pt) is disabled. Currency detection will use Roboflow API.")
+    # --- Optional Routing Head on the Places365 embedding ---
+    if os.path.exists(ROUTING_HEAD_PATH):
+        try:
+            routing_head = torch.nn.Linear(
+                places_model.fc.in_features, len(ROUTING_HEAD_FEATURES)
+            )
+            routing_head.load_state_dict(
+                torch.load(ROUTING_HEAD_PATH, map_location=torch.device("cpu"))
+            )
+            routing_head.eval()
+            logger.info(f"Routing head loaded from {ROUTING_HEAD_PATH}.")
+        except Exception as routing_e:
+            logger.error(
+                f"Failed to load routing head from {ROUTING_HEAD_PATH}: {routing_e}. Routing will use the LLM.",
+                exc_info=True,
+            )
+            routing_head = None
+
+    # --- Custom Currency Detection Model (local YOLO, Roboflow API fallback) ---
+    # Loaded like yolo_model above. A missing/broken local model is not fatal:
+    # `currency_model` stays None and detect_currency uses the Roboflow API instead.
+    if CURRENCY_BACKEND == "local":
+        logger.info("Loading local currency model...")
+        if not os.path.exists(CURRENCY_MODEL_PATH):
+            logger.warning(
+                f"Local currency model NOT FOUND at: {CURRENCY_MODEL_PATH}. Currency detection will use Roboflow API."
+            )
+        else:
+            try:
+                currency_model = YOLO(CURRENCY_MODEL_PATH)
+                share_yolo_weights(currency_model, CURRENCY_MODEL_PATH)
+                if os.path.exists(CURRENCY_CLASS_NAMES_PATH):
+                    with open(CURRENCY_CLASS_NAMES_PATH, "r", encoding="utf-8") as f:
+                        currency_class_names = [
+                            line.strip() for line in f if line.strip()
+                        ]
+                logger.info(
+                    f"Local currency model loaded from {CURRENCY_MODEL_PATH} ({len(currency_class_names)} class names from file)."
+                )
+            except Exception as currency_e:
+                currency_model = None
+                logger.error(
+                    f"Failed to load local currency model: {currency_e}. Currency detection will use Roboflow API.",
+                    exc_info=True,
+                )
+    else:
+        logger.info(
+            f"Currency backend '{CURRENCY_BACKEND}'. Currency detection will use Roboflow API."
+        )
     if not ROBOFLOW_API_KEY or ROBOFLOW_API_KEY == "Ey5qUJWyHf0BwJnIjXBv" or not ROBOFLOW_MODEL_ENDPOINT: # Check if placeholder or empty
         logger.warning(
             "Roboflow API Key or Endpoint for currency detection is a placeholder or not fully configured. "
@@ -234,6 +600,7 @@ try:
 
 
     logger.info("All other ML models loaded (or attempted).")
+    logger.info(f"Memory after model loading: {format_memory(process_memory())}")
 
 except SystemExit as se: # pylint: disable=broad-except
     logger.critical(str(se))
@@ -9,6 +9,13 @@ import cv2
 import base64
 import time
 
+from circuit_breaker import CircuitOpenError, get_breaker
+from ollama_session import OllamaSessionManager
+from text_cleaning_cache import TextCleaningCache, cleaning_cache_key
+from frame_encoding import encode_frame_base64
+from metrics import observe_stage
+from request_context import DeadlineExceeded, upstream_timeout
+
 
 # --- Ollama Configuration ---
 OLLAMA_MODEL_NAME = os.environ.get("OLLAMA_MODEL", "gemma3:12b")  # For routing
@@ -17,91 +24,157 @@ OLLAMA_TEXT_CLEANING_MODEL_NAME = os.environ.get(
 )  # For text cleaning
 OLLAMA_API_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434/api/generate")
 OLLAMA_REQUEST_TIMEOUT = 60
+# Cleaning requests in flight at once; match the server's OLLAMA_NUM_PARALLEL
+OLLAMA_CLEANING_CONCURRENCY = int(
+    os.environ.get("OLLAMA_CLEANING_CONCURRENCY", os.environ.get("OLLAMA_NUM_PARALLEL", 4))
+)
+# Keep both models loaded between requests (Ollama's default unloads after 5 minutes)
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_KEEPALIVE_PING_INTERVAL = float(
+    os.environ.get("OLLAMA_KEEPALIVE_PING_INTERVAL", 600)
+)  # Seconds idle before a model is pinged; keep below OLLAMA_KEEP_ALIVE
+OLLAMA_WARMUP = os.environ.get("OLLAMA_WARMUP", "True").lower() in ("true", "1", "t")
 
 logger.info(
     f"Ollama Configuration: Routing Model='{OLLAMA_MODEL_NAME}', Text Cleaning Model='{OLLAMA_TEXT_CLEANING_MODEL_NAME}', URL='{OLLAMA_API_URL}'"
 )
 
+ollama_breaker = get_breaker("ollama", **CIRCUIT_BREAKER_SETTINGS["ollama"])
+ollama_session = OllamaSessionManager(
+    OLLAMA_API_URL,
+    [OLLAMA_MODEL_NAME, OLLAMA_TEXT_CLEANING_MODEL_NAME],
+    OLLAMA_KEEP_ALIVE,
+    OLLAMA_KEEPALIVE_PING_INTERVAL,
+)
+
+
+def start_ollama_session():
+    """Warms both models in the background and keeps them resident (called from App.py)."""
+    if OLLAMA_WARMUP:
+        ollama_session.start()
+
+
+def _post_to_ollama(payload, timeout):
+    with observe_stage("upstream_ollama"):
+        response = requests.post(
+            OLLAMA_API_URL,
+            json=payload,
+            headers={"Content-Type": "application/json"},
+            timeout=timeout,
+        )
+    response.raise_for_status()
+    ollama_session.mark_used(payload["model"])
+    return response
+
+
+def _call_ollama(payload, timeout):
+    """_post_to_ollama through the breaker. A timeout cut short by the client's deadline isn't held against Ollama."""
+    return ollama_breaker.call_clamped(
+        timeout < OLLAMA_REQUEST_TIMEOUT,
+        requests.exceptions.Timeout,
+        _post_to_ollama,
+        payload,
+        timeout,
+    )
+
 
 # --- Helper Function for Ollama Interaction (Feature Choice) ---
+# The fixed instructions go in "system" and come first in the model's prompt template,
+# so Ollama can reuse their cached prefix and only the per-request part is processed.
+FEATURE_CHOICE_PROMPT = "You are an LLM that exists as middleware between the client and the server. The client is an application that helps  blind or partially blind user by providing them a camera that would take an image and send it over to the server. The server contains 5 machine learning models: object_detection, hazard_detection, scene_detection, text_detection, and text_detection. One of the models receives the image sent in by the client and outputs a response, which is then sent back to the client. Your job is to determine which model is best for the job. Simply reply with 'object_detection' if the image displayed is clearly centered and focused around a single object or thing, especially if the object in the image is close to the camera. Simply reply with 'hazard_detection' if the image shows something that could be dangerous to a user, like a stop sign or a knife or an animal. Simply reply with 'scene_detection' if the image is not focused on any particular thing and is instead showing an entire room or environment. Simply reply with 'text_detection' if the image has a lot of text clearly and legibly centered in the screen. Simply reply with 'currency_detection' if the image shows money of any kind."
+FEATURE_CHOICE_QUESTION = "Which model is best for this image?"
+VALID_FEATURES = [
+    "object_detection",
+    "hazard_detection",
+    "scene_detection",
+    "text_detection",
+    "currency_detection",
+]
+
+
+def build_feature_choice_payload(image_base64):
+    return {
+        "model": OLLAMA_MODEL_NAME,
+        "system": FEATURE_CHOICE_PROMPT,
+        "prompt": FEATURE_CHOICE_QUESTION,
+        "images": [image_base64],
+        "stream": False,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "options": {"temperature": 0.3},
+    }
+
+
+def parse_feature_choice(response_data, client_sid, start_time):
+    """Extracts a feature id from an Ollama /api/generate response, or None."""
+    llm_response_text = (
+        response_data.get("response", "")
+        .strip()
+        .lower()
+        .replace("'", "")
+        .replace('"', "")
+    )
+
+    logger.debug(f"[{client_sid}] Raw response from Ollama: '{llm_response_text}'")
+
+    chosen_feature = None
+    if llm_response_text in VALID_FEATURES:
+        chosen_feature = llm_response_text
+    else:
+        logger.warning(
+            f"[{client_sid}] Ollama response '{llm_response_text}' not exact. Searching keywords."
+        )
+        for feature in VALID_FEATURES:
+            if feature in llm_response_text:
+                if chosen_feature is None:
+                    chosen_feature = feature
+                    logger.info(f"[{client_sid}] Found keyword '{feature}'.")
+                else:
+                    logger.warning(
+                        f"[{client_sid}] Multiple keywords found. Using first: '{chosen_feature}'."
+                    )
+                    break
+
+    if chosen_feature:
+        elapsed_time = time.time() - start_time
+        logger.info(
+            f"[{client_sid}] Ollama chose feature: '{chosen_feature}' in {elapsed_time:.2f}s."
+        )
+        return chosen_feature
+    else:
+        logger.error(
+            f"[{client_sid}] Failed to extract valid feature from Ollama: '{llm_response_text}'"
+        )
+        return None
+
+
 def get_llm_feature_choice(image_np, client_sid="Unknown"):
     logger.info(
         f"[{client_sid}] Requesting feature choice from Ollama ({OLLAMA_MODEL_NAME})..."
     )
     start_time = time.time()
     try:
-        is_success, buffer = cv2.imencode(".jpg", image_np)
-        if not is_success:
+        image_base64 = encode_frame_base64(
+            image_np, OUTBOUND_JPEG_MAX_SIDE, OUTBOUND_JPEG_QUALITY
+        )
+        if image_base64 is None:
             logger.error(f"[{client_sid}] Failed to encode image to JPEG for Ollama.")
             return None
-        image_base64 = base64.b64encode(buffer.tobytes()).decode("utf-8")
 
-        prompt = "You are an LLM that exists as middleware between the client and the server. The client is an application that helps  blind or partially blind user by providing them a camera that would take an image and send it over to the server. The server contains 5 machine learning models: object_detection, hazard_detection, scene_detection, text_detection, and text_detection. One of the models receives the image sent in by the client and outputs a response, which is then sent back to the client. Your job is to determine which model is best for the job. Simply reply with 'object_detection' if the image displayed is clearly centered and focused around a single object or thing, especially if the object in the image is close to the camera. Simply reply with 'hazard_detection' if the image shows something that could be dangerous to a user, like a stop sign or a knife or an animal. Simply reply with 'scene_detection' if the image is not focused on any particular thing and is instead showing an entire room or environment. Simply reply with 'text_detection' if the image has a lot of text clearly and legibly centered in the screen. Simply reply with 'currency_detection' if the image shows money of any kind."
-        payload = {
-            "model": OLLAMA_MODEL_NAME,
-            "prompt": prompt,
-            "images": [image_base64],
-            "stream": False,
-            "options": {"temperature": 0.3},
-        }
+        payload = build_feature_choice_payload(image_base64)
 
         logger.debug(f"[{client_sid}] Sending request to Ollama: {OLLAMA_API_URL}")
-        response = requests.post(
-            OLLAMA_API_URL,
-            json=payload,
-            headers={"Content-Type": "application/json"},
-            timeout=OLLAMA_REQUEST_TIMEOUT,
-        )
-        response.raise_for_status()
-
-        response_data = response.json()
-        llm_response_text = (
-            response_data.get("response", "")
-            .strip()
-            .lower()
-            .replace("'", "")
-            .replace('"', "")
+        timeout = upstream_timeout(
+            OLLAMA_REQUEST_TIMEOUT, "ollama", MIN_UPSTREAM_TIMEOUT_SECONDS
         )
+        response = _call_ollama(payload, timeout)
 
-        logger.debug(f"[{client_sid}] Raw response from Ollama: '{llm_response_text}'")
-
-        chosen_feature = None
-        valid_features = [
-            "object_detection",
-            "hazard_detection",
-            "scene_detection",
-            "text_detection",
-            "currency_detection",
-        ]
-
-        if llm_response_text in valid_features:
-            chosen_feature = llm_response_text
-        else:
-            logger.warning(
-                f"[{client_sid}] Ollama response '{llm_response_text}' not exact. Searching keywords."
-            )
-            for feature in valid_features:
-                if feature in llm_response_text:
-                    if chosen_feature is None:
-                        chosen_feature = feature
-                        logger.info(f"[{client_sid}] Found keyword '{feature}'.")
-                    else:
-                        logger.warning(
-                            f"[{client_sid}] Multiple keywords found. Using first: '{chosen_feature}'."
-                        )
-                        break
-
-        if chosen_feature:
-            elapsed_time = time.time() - start_time
-            logger.info(
-                f"[{client_sid}] Ollama chose feature: '{chosen_feature}' in {elapsed_time:.2f}s."
-            )
-            return chosen_feature
-        else:
-            logger.error(
-                f"[{client_sid}] Failed to extract valid feature from Ollama: '{llm_response_text}'"
-            )
-            return None
+        return parse_feature_choice(response.json(), client_sid, start_time)
+    except CircuitOpenError as open_e:
+        logger.warning(f"[{client_sid}] Skipping Ollama feature choice: {open_e}")
+        return None
+    except DeadlineExceeded as deadline_e:
+        logger.warning(f"[{client_sid}] Skipping Ollama feature choice: {deadline_e}")
+        return None
     except requests.exceptions.Timeout:
         logger.error(f"[{client_sid}] Ollama request timed out.")
         return None
@@ -126,11 +199,44 @@ def get_llm_feature_choice(image_np, client_sid="Unknown"):
 
 
 # --- Helper Function for Ollama Text Cleaning ---
-def clean_text_with_llm(raw_text, client_sid="Unknown"):
+text_cleaning_cache = TextCleaningCache(
+    TEXT_CLEANING_CACHE_PATH,
+    TEXT_CLEANING_CACHE_MEMORY_ENTRIES,
+    TEXT_CLEANING_CACHE_MAX_ROWS,
+)
+TEXT_CLEANING_PROMPT = "The following is a piece of text scanned. This scan contains some errors, like random extra characters. Clean the text without changing much. Reply with only the cleaned text, in the same language you scanned it in, nothing else. If you got it in English, output it in English, and so on."
+# Used when only part of a scan is sent (see text_cleanup.py): the neighbouring lines
+# come along as read-only context so the model can fix words split across lines.
+TEXT_SPAN_CLEANING_PROMPT = "The following is part of a piece of text scanned. Only the text between <fix> and </fix> contains scan errors, like random extra characters; the lines around it are correct and only given as context. Clean the text between the tags without changing much. Reply with only the cleaned text from between the tags, in the same language you scanned it in, nothing else."
+SPAN_TAG_OPEN = "<fix>"
+SPAN_TAG_CLOSE = "</fix>"
+
+
+def build_text_cleaning_prompt(raw_text, context_before="", context_after=""):
+    """Returns (system, prompt) for cleaning `raw_text`, optionally with surrounding context."""
+    if not context_before and not context_after:
+        return TEXT_CLEANING_PROMPT, raw_text
+    prompt = f"{context_before}\n{SPAN_TAG_OPEN}\n{raw_text}\n{SPAN_TAG_CLOSE}\n{context_after}"
+    return TEXT_SPAN_CLEANING_PROMPT, prompt.strip()
+
+
+def clean_text_with_llm(raw_text, client_sid="Unknown", context_before="", context_after=""):
     logger.info(
         f"[{client_sid}] Requesting text cleaning from Ollama ({OLLAMA_TEXT_CLEANING_MODEL_NAME})..."
     )
     start_time = time.time()
+    system_prompt, prompt = build_text_cleaning_prompt(
+        raw_text, context_before, context_after
+    )
+    cache_key = cleaning_cache_key(
+        prompt, OLLAMA_TEXT_CLEANING_MODEL_NAME, system_prompt
+    )
+    cached_text = text_cleaning_cache.get(cache_key)
+    if cached_text is not None:
+        logger.info(
+            f"[{client_sid}] Cleaned text served from cache in {(time.time() - start_time) * 1000:.2f}ms."
+        )
+        return cached_text
     try:
         # old prompt
         # prompt = (
@@ -145,15 +251,12 @@ def clean_text_with_llm(raw_text, client_sid="Unknown"):
         #     "Respond with ONLY the chosen identifier string (e.g., 'scene_detection') and nothing else."
         # )
 
-        prompt = (
-            "The following is a piece of text scanned. This scan contains some errors, like random extra characters. Clean the text without changing much. Reply with only the cleaned text, in the same language you scanned it in, nothing else. If you got it in English, output it in English, and so on. Here is the text:\n"
-            f"{raw_text}"
-        )
-
         payload = {
             "model": OLLAMA_TEXT_CLEANING_MODEL_NAME,
+            "system": system_prompt,
             "prompt": prompt,
             "stream": False,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
             "options": {
                 "temperature": 0.2
             },  # Lower temperature for more deterministic cleaning
@@ -162,16 +265,18 @@ def clean_text_with_llm(raw_text, client_sid="Unknown"):
         logger.debug(
             f"[{client_sid}] Sending text cleaning request to Ollama: {OLLAMA_API_URL}"
         )
-        response = requests.post(
-            OLLAMA_API_URL,
-            json=payload,
-            headers={"Content-Type": "application/json"},
-            timeout=OLLAMA_REQUEST_TIMEOUT,
+        timeout = upstream_timeout(
+            OLLAMA_REQUEST_TIMEOUT, "ollama", MIN_UPSTREAM_TIMEOUT_SECONDS
         )
-        response.raise_for_status()
+        response = _call_ollama(payload, timeout)
 
         response_data = response.json()
         cleaned_text = response_data.get("response", "").strip()
+        if system_prompt is TEXT_SPAN_CLEANING_PROMPT:
+            # Models sometimes echo the markers back
+            cleaned_text = (
+                cleaned_text.replace(SPAN_TAG_OPEN, "").replace(SPAN_TAG_CLOSE, "").strip()
+            )
 
         if cleaned_text:
             elapsed_time = time.time() - start_time
@@ -181,12 +286,19 @@ def clean_text_with_llm(raw_text, client_sid="Unknown"):
             # Log a snippet of original and cleaned for comparison if helpful
             # logger.debug(f"[{client_sid}] Original text snippet: '{raw_text[:100]}...'")
             # logger.debug(f"[{client_sid}] Cleaned text snippet: '{cleaned_text[:100]}...'")
+            text_cleaning_cache.put(cache_key, cleaned_text)
             return cleaned_text
         else:
             logger.warning(
                 f"[{client_sid}] Ollama returned empty response for text cleaning. Raw response: {response_data}"
             )
             return None  # Indicate cleaning didn't produce output, or return raw_text
+    except CircuitOpenError as open_e:
+        logger.warning(f"[{client_sid}] Skipping Ollama text cleaning: {open_e}")
+        return None
+    except DeadlineExceeded as deadline_e:
+        logger.warning(f"[{client_sid}] Skipping Ollama text cleaning: {deadline_e}")
+        return None
     except requests.exceptions.Timeout:
         logger.error(f"[{client_sid}] Ollama text cleaning request timed out.")
         return None
@@ -0,0 +1,77 @@
+# backend/ollama_async.py
+# aiohttp versions of the Ollama helpers for the asyncio server (async_server.py).
+# Prompts, response parsing, the circuit breaker and deadlines are shared with ollama.py.
+
+import asyncio
+import time
+
+import aiohttp
+
+from ollama import *
+
+
+async def _post_to_ollama_async(session, payload, client_sid):
+    timeout = upstream_timeout(
+        OLLAMA_REQUEST_TIMEOUT, "ollama", MIN_UPSTREAM_TIMEOUT_SECONDS
+    )
+    if not ollama_breaker.allow_request():
+        raise ollama_breaker.open_error()
+    logger.debug(f"[{client_sid}] Sending async request to Ollama: {OLLAMA_API_URL}")
+    call_start = time.time()
+    try:
+        with observe_stage("upstream_ollama"):
+            async with session.post(
+                OLLAMA_API_URL,
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as response:
+                response.raise_for_status()
+                response_data = await response.json(content_type=None)
+    except asyncio.TimeoutError:
+        if timeout < OLLAMA_REQUEST_TIMEOUT:
+            ollama_breaker.release()  # Cut short by the client's deadline, not Ollama's fault
+        else:
+            ollama_breaker.record(False, time.time() - call_start)
+        raise
+    except Exception:
+        ollama_breaker.record(False, time.time() - call_start)
+        raise
+    ollama_breaker.record(True, time.time() - call_start)
+    ollama_session.mark_used(payload["model"])
+    return response_data
+
+
+async def get_llm_feature_choice_async(image_base64, session, client_sid="Unknown"):
+    """Async get_llm_feature_choice. Takes the already encoded frame (see frame_encoding.py)."""
+    logger.info(
+        f"[{client_sid}] Requesting feature choice from Ollama ({OLLAMA_MODEL_NAME})..."
+    )
+    start_time = time.time()
+    try:
+        response_data = await _post_to_ollama_async(
+            session, build_feature_choice_payload(image_base64), client_sid
+        )
+        return parse_feature_choice(response_data, client_sid, start_time)
+    except CircuitOpenError as open_e:
+        logger.warning(f"[{client_sid}] Skipping Ollama feature choice: {open_e}")
+        return None
+    except DeadlineExceeded as deadline_e:
+        logger.warning(f"[{client_sid}] Skipping Ollama feature choice: {deadline_e}")
+        return None
+    except asyncio.TimeoutError:
+        logger.error(f"[{client_sid}] Ollama request timed out.")
+        return None
+    except aiohttp.ClientResponseError as resp_e:
+        logger.error(f"[{client_sid}] Error during Ollama API request: {resp_e}")
+        return None
+    except aiohttp.ClientError as client_e:
+        logger.error(
+            f"[{client_sid}] Could not connect to Ollama at {OLLAMA_API_URL}: {client_e}"
+        )
+        return None
+    except Exception as e:
+        logger.error(
+            f"[{client_sid}] Unexpected error during Ollama interaction: {e}",
+            exc_info=True,
+        )
+        return None
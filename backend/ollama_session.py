@@ -0,0 +1,105 @@
+# backend/ollama_session.py
+# Keeps the Ollama models we use resident. Routing and text cleaning use different
+# models, and without keep_alive Ollama unloads an idle model after 5 minutes (or
+# evicts one to make room for the other), so the next request pays a multi-second
+# load. The manager loads every model once at startup and re-pings any model that
+# has been idle for `ping_interval`, each time with the configured keep_alive.
+
+import logging
+import threading
+import time
+
+import requests
+
+from metrics import Counter, Gauge, register
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_MODEL_LOADS = register(
+    Counter(
+        "visionaid_ollama_warmups_total",
+        "Warm-up/keep-alive requests sent to Ollama, by model and result.",
+        ("model", "result"),
+    )
+)
+OLLAMA_MODEL_WARM = register(
+    Gauge(
+        "visionaid_ollama_model_warm",
+        "1 if the model answered its last warm-up/keep-alive ping.",
+        ("model",),
+    )
+)
+
+
+class OllamaSessionManager:
+    def __init__(self, generate_url, models, keep_alive, ping_interval, request_timeout=120):
+        self.generate_url = generate_url
+        self.models = list(dict.fromkeys(models))  # Routing and cleaning may share a model
+        self.keep_alive = keep_alive
+        self.ping_interval = ping_interval
+        self.request_timeout = request_timeout  # First load of a large model can take a while
+        self._last_used = {model: 0.0 for model in self.models}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def mark_used(self, model):
+        """Called after a real request: the model is resident, no ping needed for a while."""
+        with self._lock:
+            self._last_used[model] = time.monotonic()
+
+    def warm(self, model):
+        """Loads `model` (an empty prompt only loads it) and resets its keep_alive timer."""
+        start = time.monotonic()
+        try:
+            response = requests.post(
+                self.generate_url,
+                json={"model": model, "prompt": "", "keep_alive": self.keep_alive, "stream": False},
+                timeout=self.request_timeout,
+            )
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            OLLAMA_MODEL_LOADS.inc(model=model, result="error")
+            OLLAMA_MODEL_WARM.set(0, model=model)
+            logger.warning(f"Ollama warm-up of '{model}' failed: {e}")
+            return False
+        OLLAMA_MODEL_LOADS.inc(model=model, result="ok")
+        OLLAMA_MODEL_WARM.set(1, model=model)
+        self.mark_used(model)
+        logger.info(
+            f"Ollama model '{model}' warm (keep_alive={self.keep_alive}) in {time.monotonic() - start:.2f}s."
+        )
+        return True
+
+    def idle_models(self):
+        now = time.monotonic()
+        with self._lock:
+            return [
+                model
+                for model, last_used in self._last_used.items()
+                if now - last_used >= self.ping_interval
+            ]
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="ollama-keepalive", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        for model in self.models:  # Startup warm-up, off the main thread
+            if self._stop.is_set():
+                return
+            self.warm(model)
+        while not self._stop.wait(min(self.ping_interval, 30.0)):
+            for model in self.idle_models():
+                self.warm(model)
@@ -2,6 +2,7 @@ import os
 import cv2
 import base64
 import requests
+from PIL import Image
 
 # Import configurations from model_config.py
 # This assumes model_config.py is in the same directory or accessible via PYTHONPATH
@@ -9,16 +10,104 @@ from model_config import (
     logger,
     ROBOFLOW_API_KEY,
     ROBOFLOW_MODEL_ENDPOINT,
-    CURRENCY_DETECTION_CONFIDENCE
+    ROBOFLOW_REQUEST_TIMEOUT,
+    CURRENCY_DETECTION_CONFIDENCE,
+    CURRENCY_ROBOFLOW_FALLBACK,
+    CIRCUIT_BREAKER_SETTINGS,
+    MIN_UPSTREAM_TIMEOUT_SECONDS,
+    OUTBOUND_JPEG_MAX_SIDE,
+    OUTBOUND_JPEG_QUALITY,
+    currency_model,
+    currency_class_names,
 )
 
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"  # Kept as in your original file
 
+from circuit_breaker import CircuitOpenError, get_breaker
+from frame_encoding import encode_frame_base64
+from metrics import observe_stage
+from request_context import DeadlineExceeded, upstream_timeout
+
+roboflow_breaker = get_breaker("roboflow", **CIRCUIT_BREAKER_SETTINGS["roboflow"])
+
+
+def _post_to_roboflow(api_url, img_base64, headers, timeout):
+    with observe_stage("upstream_roboflow"):
+        response = requests.post(api_url, data=img_base64, headers=headers, timeout=timeout)
+    response.raise_for_status()  # Raise an HTTPError for bad responses (4XX or 5XX)
+    return response
+
+
 # Link for testing currency images (from your original file)
 # https://www.centralbank.ae/en/our-operations/currency-and-coins/circulated-currency/
 
 
 def detect_currency(image_np):
+    """
+    Detects currency with the local YOLO currency model when it is loaded
+    (CURRENCY_BACKEND = "local"), otherwise with the Roboflow API.
+    If the local model errors, the Roboflow API is tried as a fallback
+    unless CURRENCY_ROBOFLOW_FALLBACK is disabled.
+    """
+    if currency_model is None:
+        return detect_currency_roboflow(image_np)
+
+    local_result = detect_currency_local(image_np)
+    if local_result.get("status") == "error" and CURRENCY_ROBOFLOW_FALLBACK:
+        logger.warning("Local currency detection failed. Falling back to Roboflow API.")
+        return detect_currency_roboflow(image_np)
+    return local_result
+
+
+def detect_currency_local(image_np):
+    """
+    Detects currency using the local YOLO currency model loaded in model_config.py.
+    Returns the same output structure as detect_currency_roboflow.
+    """
+    if currency_model is None:
+        return {"status": "error", "message": "Local currency model not loaded"}
+
+    try:
+        # Ultralytics reads numpy input as BGR; pass RGB as a PIL image like detect_objects
+        with observe_stage("preprocess"):
+            img_rgb = cv2.cvtColor(image_np, cv2.COLOR_BGR2RGB)
+            img_pil = Image.fromarray(img_rgb)
+        with observe_stage("model_forward"):
+            results = currency_model.predict(
+                img_pil, conf=CURRENCY_DETECTION_CONFIDENCE, verbose=False
+            )
+
+        best_detection = None
+        if results and results[0].boxes:
+            class_id_to_name = results[0].names
+            for box in results[0].boxes:
+                confidence = float(box.conf[0])
+                class_id = int(box.cls[0])
+                if 0 <= class_id < len(currency_class_names):
+                    class_name = currency_class_names[class_id]
+                else:
+                    class_name = class_id_to_name.get(class_id, f"Class {class_id}")
+                if best_detection is None or confidence > best_detection["confidence"]:
+                    best_detection = {"name": class_name, "confidence": confidence}
+
+        if best_detection:
+            logger.debug(
+                f"Currency detection (local): {best_detection['name']} (Conf: {best_detection['confidence']:.3f})"
+            )
+            return {
+                "status": "ok",
+                "currency": best_detection["name"],
+                "confidence": best_detection["confidence"],
+            }
+        else:
+            logger.debug("No currency detected meeting confidence criteria via local model.")
+            return {"status": "none", "message": "No currency detected"}
+    except Exception as e:
+        logger.error(f"Error during local currency detection: {e}", exc_info=True)
+        return {"status": "error", "message": "Error in currency detection"}
+
+
+def detect_currency_roboflow(image_np):
     """
     Detects currency using the Roboflow API.
     Returns the name and confidence of the most confident currency detection.
@@ -37,15 +126,15 @@ def detect_currency(image_np):
 
     try:
         # 1. Prepare the image for Roboflow API
-        # Encode the image_np (which is a NumPy array, typically BGR from OpenCV) to JPEG format bytes
-        success, img_encoded = cv2.imencode(".jpg", image_np)
-        if not success:
+        # Base64 JPEG of the frame, shared with any other outbound call for this request
+        # (reuses the client's original JPEG when possible, see frame_encoding.py)
+        img_base64 = encode_frame_base64(
+            image_np, OUTBOUND_JPEG_MAX_SIDE, OUTBOUND_JPEG_QUALITY
+        )
+        if img_base64 is None:
             logger.error("Failed to encode image to JPEG format for API submission.")
             return {"status": "error", "message": "Image encoding failed"}
 
-        # Base64 encode the JPEG bytes
-        img_base64 = base64.b64encode(img_encoded).decode("utf-8")
-
         # 2. Make the API call to Roboflow
         # The Content-Type for sending raw base64 data in the body can sometimes be 'text/plain'
         # or 'application/octet-stream'. However, Roboflow's curl examples with `base64 | curl -d @-`
@@ -65,8 +154,19 @@ def detect_currency(image_np):
         # api_url += f"&confidence={int(CURRENCY_DETECTION_CONFIDENCE * 100)}" # If API takes %
 
         logger.debug(f"Sending request to Roboflow API: {ROBOFLOW_MODEL_ENDPOINT}")
-        response = requests.post(api_url, data=img_base64, headers=headers, timeout=20) # Added timeout
-        response.raise_for_status()  # Raise an HTTPError for bad responses (4XX or 5XX)
+        timeout = upstream_timeout(
+            ROBOFLOW_REQUEST_TIMEOUT, "roboflow", MIN_UPSTREAM_TIMEOUT_SECONDS
+        )
+        # A timeout cut short by the client's deadline isn't held against Roboflow
+        response = roboflow_breaker.call_clamped(
+            timeout < ROBOFLOW_REQUEST_TIMEOUT,
+            requests.exceptions.Timeout,
+            _post_to_roboflow,
+            api_url,
+            img_base64,
+            headers,
+            timeout,
+        )
 
         api_result = response.json()
         logger.debug(f"Received Roboflow API response: {api_result}")
@@ -114,6 +214,12 @@ def detect_currency(image_np):
             logger.debug("No currency detected meeting confidence criteria via Roboflow.")
             return {"status": "none", "message": "No currency detected"}
 
+    except CircuitOpenError as open_e:
+        logger.warning(f"Skipping Roboflow currency detection: {open_e}")
+        return {"status": "error", "message": "Currency detection unavailable"}
+    except DeadlineExceeded as deadline_e:
+        logger.warning(f"Skipping Roboflow currency detection: {deadline_e}")
+        return {"status": "error", "message": "Request deadline exceeded"}
     except requests.exceptions.Timeout:
         logger.error("Error during currency detection: Roboflow API request timed out.", exc_info=True)
         return {"status": "error", "message": "API request timed out"}
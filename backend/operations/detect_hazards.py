@@ -0,0 +1,99 @@
+import os
+
+from model_config import *
+
+os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"  # Keep if needed
+
+import cv2
+import time
+from PIL import Image
+
+from metrics import observe_stage, record_stage
+
+
+_HAZARD_CLASS_SET = {name.lower() for name in HAZARD_CLASSES}
+
+
+def hazard_proximity(center_x, center_y, width, height):
+    """
+    0..1 estimate of how close a hazard is, from its normalized box: mostly apparent
+    size, then how low its bottom edge sits (closer on the ground plane), then how
+    near the walking line (horizontal center) it is.
+    """
+    size = min(1.0, (width * height) ** 0.5 / HAZARD_NEAR_BOX_SIDE)
+    bottom = min(1.0, max(0.0, center_y + height / 2.0))
+    centrality = max(0.0, 1.0 - abs(center_x - 0.5) * 2.0)
+    return 0.6 * size + 0.25 * bottom + 0.15 * centrality
+
+
+def hazard_level(proximity):
+    if proximity >= HAZARD_HIGH_PROXIMITY:
+        return "high"
+    if proximity >= HAZARD_MEDIUM_PROXIMITY:
+        return "medium"
+    return "low"
+
+
+def detect_hazards(image_np):
+    """
+    Hazard-only detection, sorted nearest first. Returns
+    {"status": "ok", "detections": [...], "alert": "high"|"medium"|"low"},
+    {"status": "none"} or {"status": "error", "message": ...}. Each detection has
+    the detect_objects fields plus "proximity" and "level".
+    """
+    if hazard_model is not None:
+        model, model_lock = hazard_model, hazard_model_lock
+    else:  # Shared with detect_objects, which uses other predict() settings
+        model, model_lock = yolo_model, yolo_model_lock
+    try:
+        with observe_stage("preprocess"):
+            img_rgb = cv2.cvtColor(image_np, cv2.COLOR_BGR2RGB)
+            img_pil = Image.fromarray(img_rgb)
+        with model_lock, observe_stage("model_forward"):
+            results = model.predict(
+                img_pil,
+                conf=HAZARD_DETECTION_CONFIDENCE,
+                imgsz=HAZARD_IMGSZ,
+                verbose=False,
+            )
+        postprocess_start = time.perf_counter()
+        hazards = []
+        if results and results[0].boxes:
+            class_id_to_name = results[0].names
+            for box in results[0].boxes:
+                class_name = class_id_to_name.get(int(box.cls[0]))
+                if class_name is None or class_name.lower() not in _HAZARD_CLASS_SET:
+                    continue  # Main-model fallback sees the full vocabulary
+                x1, y1, x2, y2 = box.xyxyn[0].tolist()
+                center_x = (x1 + x2) / 2.0
+                center_y = (y1 + y2) / 2.0
+                width = x2 - x1
+                height = y2 - y1
+                proximity = hazard_proximity(center_x, center_y, width, height)
+                hazards.append(
+                    {
+                        "name": class_name,
+                        "confidence": float(box.conf[0]),
+                        "center_x": center_x,
+                        "center_y": center_y,
+                        "width": width,
+                        "height": height,
+                        "proximity": proximity,
+                        "level": hazard_level(proximity),
+                    }
+                )
+        hazards.sort(key=lambda d: d["proximity"], reverse=True)
+        record_stage("postprocess", time.perf_counter() - postprocess_start)
+
+        if not hazards:
+            logger.debug("Hazard mode: No hazards detected.")
+            return {"status": "none"}
+        hazards = hazards[:MAX_HAZARDS_TO_RETURN]
+        logger.debug(
+            "Hazard mode: "
+            + ", ".join(f"{d['name']}({d['level']}, {d['proximity']:.2f})" for d in hazards)
+        )
+        return {"status": "ok", "detections": hazards, "alert": hazards[0]["level"]}
+    except Exception as e:
+        logger.error(f"Error during hazard detection: {e}", exc_info=True)
+        return {"status": "error", "message": "Error in hazard detection"}
@@ -5,44 +5,116 @@ from model_config import *
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"  # Keep if needed
 
 import cv2
+import time
 from PIL import Image
 
+from metrics import observe_stage, record_cache_lookup, record_stage
 
-def detect_objects(image_np, focus_object=None):
+
+def roi_crop_bounds(roi, frame_w, frame_h):
+    """
+    Pixel bounds (x1, y1, x2, y2) of the padded crop around a normalized ROI
+    ({center_x, center_y, width, height}), or None if the ROI is unusable or the
+    crop would cover most of the frame anyway.
+    """
     try:
+        center_x = float(roi["center_x"]) * frame_w
+        center_y = float(roi["center_y"]) * frame_h
+        width = float(roi["width"]) * frame_w
+        height = float(roi["height"]) * frame_h
+    except (KeyError, TypeError, ValueError):
+        return None
+    if width <= 0 or height <= 0:
+        return None
+    crop_w = min(frame_w, max(width * (1 + 2 * ROI_PADDING), ROI_MIN_SIDE))
+    crop_h = min(frame_h, max(height * (1 + 2 * ROI_PADDING), ROI_MIN_SIDE))
+    if crop_w * crop_h > ROI_MAX_FRAME_FRACTION * frame_w * frame_h:
+        return None
+    # Shift (rather than shrink) the crop when it runs past an edge
+    x1 = int(min(max(0, center_x - crop_w / 2.0), frame_w - crop_w))
+    y1 = int(min(max(0, center_y - crop_h / 2.0), frame_h - crop_h))
+    return x1, y1, int(x1 + crop_w), int(y1 + crop_h)
+
+
+def _run_yolo(image_np, crop_bounds=None):
+    """
+    YOLO-World on the frame, or on the crop at `crop_bounds` at its native resolution.
+    Returns [(confidence, class_name, box_details)] in full-frame normalized coordinates.
+    """
+    frame_h, frame_w = image_np.shape[:2]
+    x_off, y_off, crop_w, crop_h = 0, 0, frame_w, frame_h
+    if crop_bounds is not None:
+        x1, y1, x2, y2 = crop_bounds
+        image_np = image_np[y1:y2, x1:x2]
+        x_off, y_off, crop_w, crop_h = x1, y1, x2 - x1, y2 - y1
+    with observe_stage("preprocess"):
         img_rgb = cv2.cvtColor(image_np, cv2.COLOR_BGR2RGB)
         img_pil = Image.fromarray(img_rgb)
+    with yolo_model_lock, observe_stage("model_forward"):
         results = yolo_model.predict(
             img_pil, conf=OBJECT_DETECTION_CONFIDENCE, verbose=False
         )
-        all_detections = []
-        if results and results[0].boxes:
-            boxes = results[0].boxes
-            class_id_to_name = results[0].names
-            for box in boxes:
-                confidence = float(box.conf[0])
-                class_id = int(box.cls[0])
-                if class_id in class_id_to_name:
-                    class_name = class_id_to_name[class_id]
-                    norm_box = box.xyxyn[0].tolist()
-                    x1, y1, x2, y2 = norm_box
-                    center_x = (x1 + x2) / 2.0
-                    center_y = (y1 + y2) / 2.0
-                    width = x2 - x1
-                    height = y2 - y1
-                    box_details = {
-                        "name": class_name,
-                        "confidence": confidence,
-                        "center_x": center_x,
-                        "center_y": center_y,
-                        "width": width,
-                        "height": height,
-                    }
-                    all_detections.append((confidence, class_name, box_details))
-                else:
-                    logger.warning(
-                        f"Unknown class ID {class_id} detected by YOLO-World."
-                    )
+    postprocess_start = time.perf_counter()
+    all_detections = []
+    if results and results[0].boxes:
+        boxes = results[0].boxes
+        class_id_to_name = results[0].names
+        for box in boxes:
+            confidence = float(box.conf[0])
+            class_id = int(box.cls[0])
+            if class_id in class_id_to_name:
+                class_name = class_id_to_name[class_id]
+                norm_box = box.xyxyn[0].tolist()
+                x1, y1, x2, y2 = norm_box
+                # Crop-normalized -> frame-normalized (identity for a full frame)
+                x1 = (x_off + x1 * crop_w) / frame_w
+                x2 = (x_off + x2 * crop_w) / frame_w
+                y1 = (y_off + y1 * crop_h) / frame_h
+                y2 = (y_off + y2 * crop_h) / frame_h
+                center_x = (x1 + x2) / 2.0
+                center_y = (y1 + y2) / 2.0
+                width = x2 - x1
+                height = y2 - y1
+                box_details = {
+                    "name": class_name,
+                    "confidence": confidence,
+                    "center_x": center_x,
+                    "center_y": center_y,
+                    "width": width,
+                    "height": height,
+                }
+                all_detections.append((confidence, class_name, box_details))
+            else:
+                logger.warning(
+                    f"Unknown class ID {class_id} detected by YOLO-World."
+                )
+    record_stage("postprocess", time.perf_counter() - postprocess_start)
+    return all_detections
+
+
+def detect_objects(image_np, focus_object=None, roi=None):
+    """
+    `roi` ({center_x, center_y, width, height}, normalized) restricts detection to a
+    padded crop around it, e.g. the last focus result. If nothing relevant is found
+    in the crop, the full frame is searched.
+    """
+    try:
+        crop_bounds = None
+        if roi is not None:
+            frame_h, frame_w = image_np.shape[:2]
+            crop_bounds = roi_crop_bounds(roi, frame_w, frame_h)
+        all_detections = _run_yolo(image_np, crop_bounds)
+        if crop_bounds is not None:
+            focus_object_lower = focus_object.lower() if focus_object else None
+            if not any(
+                focus_object_lower is None or name.lower() == focus_object_lower
+                for _, name, _ in all_detections
+            ):
+                logger.debug(f"Nothing relevant in ROI {crop_bounds}. Searching full frame.")
+                record_cache_lookup("object_roi", False)
+                all_detections = _run_yolo(image_np)
+            else:
+                record_cache_lookup("object_roi", True)
 
         if focus_object:
             focus_object_lower = focus_object.lower()
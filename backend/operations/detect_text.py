@@ -6,15 +6,186 @@ from model_config import * # Assuming this correctly sets up logger, etc.
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"  # Keep if needed
 
 import cv2
+import numpy as np
 from PIL import Image
 import pytesseract
+import threading
 import time
+from collections import namedtuple
+from functools import lru_cache
 
+from metrics import observe_stage, record_cache_lookup, record_stage
+from request_context import DeadlineExceeded, upstream_timeout
 
-def detect_text(image_np, language_code=DEFAULT_OCR_LANG):
+
+# One OCR line: its text, Tesseract's mean word confidence (0-100) and the
+# (block_num, par_num) paragraph it belongs to
+OcrLine = namedtuple("OcrLine", ("text", "confidence", "paragraph"))
+
+# Per-client cache of the language picked by OSD (or the fallback when OSD could not
+# tell): {client_sid: (language, detected_at, view_hash)}
+_client_ocr_lang_cache = {}
+_client_ocr_lang_lock = threading.Lock()
+
+
+@lru_cache(maxsize=64)
+def validate_ocr_language(language_code):
+    """
+    Validates a Tesseract language string, which may combine several languages
+    (e.g. "eng+ara"). Unsupported parts are dropped. Returns the normalized string,
+    OCR_AUTO_LANG for automatic detection, or None if nothing usable remains.
+    """
+    if not language_code:
+        return None
+    language_code = language_code.strip().lower()
+    if language_code == OCR_AUTO_LANG:
+        return OCR_AUTO_LANG
+    parts = []
+    for part in language_code.split("+"):
+        part = part.strip()
+        if part in SUPPORTED_OCR_LANGS and part != "osd" and part not in parts:
+            parts.append(part)
+    return "+".join(parts) if parts else None
+
+
+def forget_client_ocr_language(client_sid):
+    with _client_ocr_lang_lock:
+        _client_ocr_lang_cache.pop(client_sid, None)
+
+
+def view_hash(gray_img):
+    """64-bit average hash of a grayscale frame: which 8x8 cells are brighter than the mean."""
+    cells = cv2.resize(gray_img, (8, 8), interpolation=cv2.INTER_AREA)
+    return int.from_bytes(np.packbits(cells > cells.mean()).tobytes(), "big")
+
+
+def _cache_ocr_language(client_sid, language, now, frame_hash):
+    with _client_ocr_lang_lock:
+        _client_ocr_lang_cache[client_sid] = (language, now, frame_hash)
+    return language
+
+
+def detect_ocr_language(gray_img, client_sid="Unknown"):
+    """
+    Picks the OCR language for a frame from the script reported by Tesseract OSD (--psm 0).
+    Non-Latin scripts are combined with the default language ("ara+eng") since signs and
+    labels usually mix them. Falls back to DEFAULT_OCR_LANG when OSD is unavailable or
+    not confident.
+
+    The result (fallback included) is cached per client, not per text region: it is
+    reused for OCR_LANG_CACHE_TTL seconds while the client's frames stay within
+    OCR_LANG_MAX_VIEW_CHANGE bits of view_hash. Turning to another sign changes the
+    hash and re-runs OSD; a sign in another script within the same view does not.
+    """
+    now = time.time()
+    frame_hash = view_hash(gray_img)
+    with _client_ocr_lang_lock:
+        cached = _client_ocr_lang_cache.get(client_sid)
+    if (
+        cached
+        and now - cached[1] < OCR_LANG_CACHE_TTL
+        and bin(cached[2] ^ frame_hash).count("1") <= OCR_LANG_MAX_VIEW_CHANGE
+    ):
+        record_cache_lookup("ocr_language", True)
+        logger.debug(f"[{client_sid}] Reusing cached OCR language '{cached[0]}'.")
+        return cached[0]
+    record_cache_lookup("ocr_language", False)
+
+    if not OSD_AVAILABLE:
+        return DEFAULT_OCR_LANG
+
+    try:
+        osd_img = gray_img
+        height, width = gray_img.shape[:2]
+        scale = OSD_MAX_IMAGE_SIDE / float(max(height, width))
+        if scale < 1.0:
+            osd_img = cv2.resize(
+                gray_img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+            )
+        osd_timeout = upstream_timeout(None, "tesseract_osd", MIN_UPSTREAM_TIMEOUT_SECONDS)
+        with observe_stage("ocr_script_detection"):
+            osd = pytesseract.image_to_osd(
+                Image.fromarray(osd_img),
+                config="--psm 0",
+                output_type=pytesseract.Output.DICT,
+                timeout=osd_timeout or 0,  # 0 = no timeout
+            )
+        script = osd.get("script")
+        script_conf = float(osd.get("script_conf", 0.0))
+    except DeadlineExceeded:
+        raise
+    except pytesseract.TesseractError as osd_e:
+        # OSD refuses frames with too few characters; that is not worth an error log.
+        logger.debug(f"[{client_sid}] OSD script detection failed: {osd_e}")
+        return _cache_ocr_language(client_sid, DEFAULT_OCR_LANG, now, frame_hash)
+    except Exception as osd_e:
+        logger.warning(f"[{client_sid}] Unexpected OSD error: {osd_e}")
+        return _cache_ocr_language(client_sid, DEFAULT_OCR_LANG, now, frame_hash)
+
+    script_lang = OSD_SCRIPT_TO_LANG.get(script)
+    if (
+        script_conf < OSD_MIN_SCRIPT_CONFIDENCE
+        or script_lang not in SUPPORTED_OCR_LANGS
+    ):
+        logger.debug(
+            f"[{client_sid}] OSD script '{script}' (Conf: {script_conf:.2f}) not usable. Using '{DEFAULT_OCR_LANG}'."
+        )
+        return _cache_ocr_language(client_sid, DEFAULT_OCR_LANG, now, frame_hash)
+
+    if script_lang != DEFAULT_OCR_LANG and DEFAULT_OCR_LANG in SUPPORTED_OCR_LANGS:
+        detected_lang = f"{script_lang}+{DEFAULT_OCR_LANG}"
+    else:
+        detected_lang = script_lang
+    logger.info(
+        f"[{client_sid}] OSD detected script '{script}' (Conf: {script_conf:.2f}). Using OCR lang '{detected_lang}'."
+    )
+    return _cache_ocr_language(client_sid, detected_lang, now, frame_hash)
+
+
+def detect_text(image_np, language_code=DEFAULT_OCR_LANG, client_sid="Unknown"):
+    """OCR text with one line per line, or an "Error..."/"No text detected" message."""
+    result = detect_text_lines(image_np, language_code, client_sid)
+    if isinstance(result, str):
+        return result
+    return join_ocr_lines(result)
+
+
+def join_ocr_lines(lines):
+    return "\n".join(line.text for line in lines)
+
+
+def ocr_lines_from_data(data):
+    """
+    Groups pytesseract.image_to_data(..., output_type=DICT) words into lines.
+    Returns [OcrLine] in reading order.
+    """
+    lines = {}
+    for i, word in enumerate(data["text"]):
+        word = word.strip()
+        confidence = float(data["conf"][i])
+        if not word or confidence < 0:  # conf -1: block/paragraph/line rows, not words
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append((word, confidence))
+    return [
+        OcrLine(
+            " ".join(word for word, _ in words),
+            sum(conf for _, conf in words) / len(words),
+            key[:2],
+        )
+        for key, words in lines.items()
+    ]
+
+
+def detect_text_lines(image_np, language_code=DEFAULT_OCR_LANG, client_sid="Unknown"):
+    """
+    Like detect_text, but returns [OcrLine] on success, so callers can treat
+    low-confidence lines differently and keep paragraphs together.
+    Errors and "No text detected" are returned as strings, as detect_text does.
+    """
     logger.debug(f"Starting Tesseract OCR for lang: '{language_code}'...")
-    validated_lang = language_code
-    if language_code not in SUPPORTED_OCR_LANGS:
+    validated_lang = validate_ocr_language(language_code)
+    if validated_lang is None:
         logger.warning(
             f"Requested lang '{language_code}' not in supported list {SUPPORTED_OCR_LANGS}. Falling back to '{DEFAULT_OCR_LANG}'."
         )
@@ -48,20 +219,31 @@ def detect_text(image_np, language_code=DEFAULT_OCR_LANG):
             logger.error(f"Failed to save debug OCR image: {save_e}")
 
     try:
-        gray_img = (
-            cv2.cvtColor(image_np, cv2.COLOR_BGR2GRAY)
-            if len(image_np.shape) == 3
-            else image_np
-        )
+        with observe_stage("preprocess"):
+            gray_img = (
+                cv2.cvtColor(image_np, cv2.COLOR_BGR2GRAY)
+                if len(image_np.shape) == 3
+                else image_np
+            )
+        if validated_lang == OCR_AUTO_LANG:
+            validated_lang = detect_ocr_language(gray_img, client_sid)
         img_pil = Image.fromarray(gray_img)
         custom_config = f"-l {validated_lang} --oem 3 --psm 6" # PSM 6 is generally good for uniform block of text
         logger.debug(f"Using Tesseract config: {custom_config}")
-        detected_text = pytesseract.image_to_string(img_pil, config=custom_config)
+        ocr_timeout = upstream_timeout(None, "tesseract", MIN_UPSTREAM_TIMEOUT_SECONDS)
+        with observe_stage("model_forward"):
+            ocr_data = pytesseract.image_to_data(
+                img_pil,
+                config=custom_config,
+                timeout=ocr_timeout or 0,  # 0 = no timeout
+                output_type=pytesseract.Output.DICT,
+            )
+        postprocess_start = time.perf_counter()
         
         # --- Language-Agnostic Heuristic Filtering Starts Here ---
         filtered_lines = []
-        for line in detected_text.splitlines():
-            stripped_line = line.strip()
+        for line in ocr_lines_from_data(ocr_data):
+            stripped_line = line.text.strip()
             if not stripped_line:
                 continue
 
@@ -113,9 +295,10 @@ def detect_text(image_np, language_code=DEFAULT_OCR_LANG):
                 logger.debug(f"Discarding line due to short length: '{cleaned_line}' (Length: {len(cleaned_line)})")
                 continue
             
-            filtered_lines.append(cleaned_line)
+            filtered_lines.append(line._replace(text=cleaned_line))
         
-        result_str = "\n".join(filtered_lines)
+        result_str = join_ocr_lines(filtered_lines)
+        record_stage("postprocess", time.perf_counter() - postprocess_start)
         # --- Language-Agnostic Heuristic Filtering Ends Here ---
 
         if not result_str:
@@ -124,7 +307,10 @@ def detect_text(image_np, language_code=DEFAULT_OCR_LANG):
         else:
             log_text = result_str.replace("\n", " ").replace("\r", "")[:100]
             logger.debug(f"Tesseract ({validated_lang}) OK: Found '{log_text}...' (Filtered)")
-            return result_str
+            return filtered_lines
+    except DeadlineExceeded as deadline_e:
+        logger.warning(f"Skipping Tesseract OCR ({validated_lang}): {deadline_e}")
+        return "Error: OCR deadline exceeded"
     except pytesseract.TesseractNotFoundError:
         logger.error("Tesseract executable not found.")
         return "Error: OCR Engine Not Found"
@@ -140,6 +326,13 @@ def detect_text(image_np, language_code=DEFAULT_OCR_LANG):
             return f"Error: Missing OCR language data for '{validated_lang}'"
         else:
             return f"Error during text detection ({validated_lang})"
+    except RuntimeError as rt_e:
+        # pytesseract kills the process and raises RuntimeError when `timeout` is hit
+        if "timeout" in str(rt_e).lower():
+            logger.warning(f"Tesseract OCR ({validated_lang}) hit the request deadline.")
+            return "Error: OCR deadline exceeded"
+        logger.error(f"Unexpected OCR error ({validated_lang}): {rt_e}", exc_info=True)
+        return f"Error during text detection ({validated_lang})"
     except Exception as e:
         logger.error(f"Unexpected OCR error ({validated_lang}): {e}", exc_info=True)
         return f"Error during text detection ({validated_lang})"
\ No newline at end of file
@@ -0,0 +1,111 @@
+import os
+
+from model_config import *
+
+os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"  # Keep if needed
+
+import cv2
+import threading
+import time
+import torch
+from PIL import Image
+
+from metrics import observe_stage, record_cache_lookup
+from request_context import get_request_context
+
+
+SCENE_EMBEDDING = "places365"
+
+# Last routed frame per client: {client_sid: (embedding, feature, routed_at)}
+_client_routes = {}
+_client_routes_lock = threading.Lock()
+
+
+def scene_embedding(image_np):
+    """
+    Pooled Places365 backbone feature (1-D tensor) of a frame. Computed once per
+    request: the result is kept on the request context, so scene classification,
+    routing and any other head reuse it for the same frame.
+    """
+    ctx = get_request_context()
+    cached = ctx.embeddings.get(SCENE_EMBEDDING) if ctx is not None else None
+    if cached is not None and cached[0] is image_np:
+        record_cache_lookup("scene_embedding", True)
+        return cached[1]
+    record_cache_lookup("scene_embedding", False)
+
+    with observe_stage("preprocess"):
+        img_rgb = cv2.cvtColor(image_np, cv2.COLOR_BGR2RGB)
+        img_pil = Image.fromarray(img_rgb)
+        img_tensor = scene_transform(img_pil).unsqueeze(0)
+        device = next(places_backbone.parameters()).device
+        img_tensor = img_tensor.to(device)
+    with torch.no_grad(), observe_stage("model_forward"):
+        embedding = torch.flatten(places_backbone(img_tensor), 1)[0]
+    if ctx is not None:
+        ctx.embeddings[SCENE_EMBEDDING] = (image_np, embedding)
+    return embedding
+
+
+def scene_probabilities(embedding):
+    with torch.no_grad():
+        return torch.softmax(places_head(embedding.unsqueeze(0)), dim=1)[0]
+
+
+def embedding_similarity(a, b):
+    return float(torch.nn.functional.cosine_similarity(a, b, dim=0))
+
+
+def forget_client_route(client_sid):
+    with _client_routes_lock:
+        _client_routes.pop(client_sid, None)
+
+
+def remember_routing_choice(image_np, feature, client_sid="Unknown"):
+    """Stores the routed feature with the frame's embedding, if one was computed."""
+    ctx = get_request_context()
+    cached = ctx.embeddings.get(SCENE_EMBEDDING) if ctx is not None else None
+    if not EMBEDDING_ROUTING or cached is None or cached[0] is not image_np:
+        return
+    with _client_routes_lock:
+        _client_routes[client_sid] = (cached[1], feature, time.time())
+
+
+def get_embedding_feature_choice(image_np, client_sid="Unknown"):
+    """
+    Routing without the LLM: the client's previous choice if this frame is a near
+    duplicate of the last routed one, else the routing head's answer if it is
+    confident. Returns None when the LLM should decide.
+    """
+    if not EMBEDDING_ROUTING:
+        return None
+    try:
+        embedding = scene_embedding(image_np)
+        with _client_routes_lock:
+            last_route = _client_routes.get(client_sid)
+        if last_route is not None and time.time() - last_route[2] <= ROUTE_REUSE_TTL:
+            similarity = embedding_similarity(embedding, last_route[0])
+            if similarity >= ROUTE_REUSE_SIMILARITY:
+                logger.info(
+                    f"[{client_sid}] Near-duplicate frame (similarity {similarity:.3f}), reusing route '{last_route[1]}'."
+                )
+                return last_route[1]
+
+        if routing_head is None:
+            return None
+        with torch.no_grad():
+            probabilities = torch.softmax(
+                routing_head(embedding.unsqueeze(0).to(next(routing_head.parameters()).device)),
+                dim=1,
+            )[0]
+            top_prob, top_id = torch.max(probabilities, 0)
+        if top_prob.item() < ROUTING_HEAD_MIN_CONFIDENCE:
+            return None
+        chosen_feature = ROUTING_HEAD_FEATURES[top_id.item()]
+        logger.info(
+            f"[{client_sid}] Routing head chose feature: '{chosen_feature}' (Conf: {top_prob.item():.3f})."
+        )
+        return chosen_feature
+    except Exception as e:
+        logger.error(f"[{client_sid}] Embedding routing error: {e}", exc_info=True)
+        return None
@@ -0,0 +1,45 @@
+import os
+
+from model_config import *
+from operations.detect_objects import detect_objects
+
+os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"  # Keep if needed
+
+
+# Object classes that make a frame a hazard or a reading task when the LLM router is unavailable
+LOCAL_ROUTING_HAZARD_CLASSES = set(HAZARD_CLASSES)
+LOCAL_ROUTING_TEXT_CLASSES = {
+    "book", "document", "paper", "newspaper", "magazine", "letter", "envelope",
+    "exit sign", "whiteboard", "folder", "file",
+}
+LOCAL_ROUTING_OBJECT_MIN_AREA = 0.15  # A detection covering this much of the frame is "the" object
+
+
+def get_local_feature_choice(image_np, client_sid="Unknown"):
+    """
+    Cheap stand-in for get_llm_feature_choice, used when Ollama is unavailable.
+    Picks a feature from a single YOLO-World pass: hazards first, then text-bearing
+    objects, then one prominent object, otherwise the whole scene.
+    """
+    obj_result = detect_objects(image_np)
+    if obj_result.get("status") == "error":
+        logger.error(f"[{client_sid}] Local routing failed: object detection error.")
+        return None
+
+    detections = obj_result.get("detections", [])
+    names = {d["name"].lower() for d in detections}
+    if names & LOCAL_ROUTING_HAZARD_CLASSES:
+        chosen_feature = "hazard_detection"
+    elif names & LOCAL_ROUTING_TEXT_CLASSES:
+        chosen_feature = "text_detection"
+    elif any(
+        d["width"] * d["height"] >= LOCAL_ROUTING_OBJECT_MIN_AREA for d in detections
+    ):
+        chosen_feature = "object_detection"
+    else:
+        chosen_feature = "scene_detection"
+
+    logger.info(
+        f"[{client_sid}] Local routing chose feature: '{chosen_feature}' (objects: {sorted(names) or 'none'})."
+    )
+    return chosen_feature
@@ -0,0 +1,242 @@
+import os
+
+from model_config import *
+
+os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"  # Keep if needed
+
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from metrics import observe_stage, record_cache_lookup
+from operations.detect_objects import detect_objects
+
+
+# Focus mode streams frames of the same object, so YOLO only seeds a per-client
+# tracker. In between, the object is followed by template matching in a window
+# around the Kalman-predicted box, and the Kalman filter smooths the reported
+# center/size. YOLO runs again every FOCUS_REDETECT_INTERVAL frames, when the
+# match score drops, or after a gap in the stream.
+
+
+class FocusTracker:
+    def __init__(self, focus_object):
+        self.focus_object = focus_object
+        self.name = focus_object  # Class name as YOLO reports it
+        self.kalman = None
+        self.template = None
+        self.confidence = 0.0  # YOLO confidence at the last detection
+        self.frames_since_detection = 0
+        self.last_seen = 0.0
+        self.predicted = None  # Kalman prediction for the current frame, once made
+        self.frame_shape = None
+        self.lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self.kalman is not None
+
+    def reset(self):
+        self.kalman = None
+        self.template = None
+        self.predicted = None
+
+    def needs_detection(self, image_np, now):
+        return (
+            not self.active
+            or image_np.shape != self.frame_shape
+            or self.frames_since_detection >= FOCUS_REDETECT_INTERVAL
+            or now - self.last_seen > FOCUS_TRACKER_MAX_GAP_SECONDS
+        )
+
+    def seed(self, image_np, detection, now):
+        """(Re)initializes the tracker from a YOLO focus detection."""
+        frame_h, frame_w = image_np.shape[:2]
+        box = np.array(
+            [
+                detection["center_x"] * frame_w,
+                detection["center_y"] * frame_h,
+                detection["width"] * frame_w,
+                detection["height"] * frame_h,
+            ],
+            dtype=np.float32,
+        )
+        if self.active and self.predicted is None:
+            self.predicted = self.kalman.predict()[:4].ravel()
+        if not self.active or box_iou(self.predicted, box) < FOCUS_REINIT_IOU:
+            # First sighting, or the detection is nowhere near the track: start over
+            self.kalman = _new_kalman(box)
+        else:
+            self.kalman.correct(box.reshape(4, 1))
+        self.predicted = None
+        x1, y1, x2, y2 = _box_to_pixels(box, frame_w, frame_h)
+        self.template = (
+            cv2.cvtColor(image_np[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY)
+            if x2 > x1 and y2 > y1
+            else None
+        )
+        self.name = detection["name"]
+        self.confidence = detection["confidence"]
+        self.frames_since_detection = 0
+        self.last_seen = now
+        self.frame_shape = image_np.shape
+
+    def track(self, image_np, now):
+        """
+        Follows the object by template matching around the predicted box.
+        Returns the match score in [-1, 1], or None if there was nothing to match.
+        """
+        frame_h, frame_w = image_np.shape[:2]
+        predicted = self.predicted = self.kalman.predict()[:4].ravel()
+        if self.template is None:
+            return None
+        tmpl_h, tmpl_w = self.template.shape[:2]
+        if tmpl_h < FOCUS_TEMPLATE_MIN_SIDE or tmpl_w < FOCUS_TEMPLATE_MIN_SIDE:
+            return None
+
+        search_w = max(tmpl_w * FOCUS_SEARCH_SCALE, tmpl_w + 2)
+        search_h = max(tmpl_h * FOCUS_SEARCH_SCALE, tmpl_h + 2)
+        sx1, sy1, sx2, sy2 = _box_to_pixels(
+            (predicted[0], predicted[1], search_w, search_h), frame_w, frame_h
+        )
+        if sx2 - sx1 < tmpl_w or sy2 - sy1 < tmpl_h:
+            return None  # Predicted box ran off the frame
+        search = cv2.cvtColor(image_np[sy1:sy2, sx1:sx2], cv2.COLOR_BGR2GRAY)
+        scores = cv2.matchTemplate(search, self.template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, top_left = cv2.minMaxLoc(scores)
+
+        # Template matching sees position only; keep the size from the filter
+        measured = np.array(
+            [
+                sx1 + top_left[0] + tmpl_w / 2.0,
+                sy1 + top_left[1] + tmpl_h / 2.0,
+                predicted[2],
+                predicted[3],
+            ],
+            dtype=np.float32,
+        )
+        if score >= FOCUS_TRACK_MIN_SCORE:
+            self.kalman.correct(measured.reshape(4, 1))
+            self.predicted = None
+            self.frames_since_detection += 1
+            self.last_seen = now
+        return score
+
+    def detection(self, frame_w, frame_h, confidence):
+        cx, cy, w, h = self.kalman.statePost[:4].ravel()
+        return {
+            "name": self.name,
+            "confidence": float(confidence),
+            "center_x": float(np.clip(cx / frame_w, 0.0, 1.0)),
+            "center_y": float(np.clip(cy / frame_h, 0.0, 1.0)),
+            "width": float(np.clip(w / frame_w, 0.0, 1.0)),
+            "height": float(np.clip(h / frame_h, 0.0, 1.0)),
+        }
+
+
+def box_iou(box_a, box_b):
+    """IoU of two (cx, cy, w, h) boxes."""
+    ax1, ay1 = box_a[0] - box_a[2] / 2.0, box_a[1] - box_a[3] / 2.0
+    bx1, by1 = box_b[0] - box_b[2] / 2.0, box_b[1] - box_b[3] / 2.0
+    inter_w = min(ax1 + box_a[2], bx1 + box_b[2]) - max(ax1, bx1)
+    inter_h = min(ay1 + box_a[3], by1 + box_b[3]) - max(ay1, by1)
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    inter = inter_w * inter_h
+    union = box_a[2] * box_a[3] + box_b[2] * box_b[3] - inter
+    return float(inter / union) if union > 0 else 0.0
+
+
+def _new_kalman(box):
+    # Constant-velocity model over (cx, cy, w, h) in pixels, one step per frame
+    kalman = cv2.KalmanFilter(8, 4)
+    transition = np.eye(8, dtype=np.float32)
+    transition[:4, 4:] = np.eye(4, dtype=np.float32)
+    kalman.transitionMatrix = transition
+    kalman.measurementMatrix = np.eye(4, 8, dtype=np.float32)
+    kalman.processNoiseCov = np.eye(8, dtype=np.float32) * FOCUS_KALMAN_PROCESS_NOISE
+    kalman.measurementNoiseCov = np.eye(4, dtype=np.float32) * FOCUS_KALMAN_MEASUREMENT_NOISE
+    kalman.errorCovPost = np.eye(8, dtype=np.float32)
+    state = np.zeros((8, 1), dtype=np.float32)
+    state[:4, 0] = box
+    kalman.statePost = state
+    return kalman
+
+
+def _box_to_pixels(box, frame_w, frame_h):
+    cx, cy, w, h = box
+    x1 = int(max(0, round(cx - w / 2.0)))
+    y1 = int(max(0, round(cy - h / 2.0)))
+    x2 = int(min(frame_w, round(cx + w / 2.0)))
+    y2 = int(min(frame_h, round(cy + h / 2.0)))
+    return x1, y1, max(x1, x2), max(y1, y2)
+
+
+_focus_trackers = {}  # client_sid -> FocusTracker
+_focus_trackers_lock = threading.Lock()
+
+
+def _get_tracker(client_sid, focus_object):
+    with _focus_trackers_lock:
+        tracker = _focus_trackers.get(client_sid)
+        if tracker is None or tracker.focus_object.lower() != focus_object.lower():
+            tracker = FocusTracker(focus_object)
+            _focus_trackers[client_sid] = tracker
+        return tracker
+
+
+def forget_focus_tracker(client_sid):
+    with _focus_trackers_lock:
+        _focus_trackers.pop(client_sid, None)
+
+
+def track_focus_object(image_np, focus_object, client_sid="Unknown", roi_hint=None):
+    """
+    Drop-in for detect_objects(image_np, focus_object=...) on a client's frame stream.
+    Returns {"status": "found", "detection": {...}, "tracked": bool} or detect_objects'
+    not_found/error result. YOLO re-detections look around the tracked box first,
+    or around `roi_hint` (normalized box from the client) when nothing is tracked.
+    """
+    if not FOCUS_TRACKING_ENABLED:
+        return detect_objects(image_np, focus_object=focus_object, roi=roi_hint)
+
+    tracker = _get_tracker(client_sid, focus_object)
+    frame_h, frame_w = image_np.shape[:2]
+    with tracker.lock:
+        now = time.time()
+        if not tracker.needs_detection(image_np, now):
+            try:
+                with observe_stage("focus_track"):
+                    score = tracker.track(image_np, now)
+            except cv2.error as e:
+                logger.warning(f"[{client_sid}] Focus tracking failed: {e}")
+                score = None
+            hit = score is not None and score >= FOCUS_TRACK_MIN_SCORE
+            record_cache_lookup("focus_tracker", hit)
+            if hit:
+                return {
+                    "status": "found",
+                    "detection": tracker.detection(
+                        frame_w, frame_h, tracker.confidence * score
+                    ),
+                    "tracked": True,
+                }
+            logger.debug(
+                f"[{client_sid}] Focus track lost (score: {score}). Re-running detection."
+            )
+
+        roi = roi_hint
+        if tracker.active and image_np.shape == tracker.frame_shape:
+            roi = tracker.detection(frame_w, frame_h, tracker.confidence)
+        result = detect_objects(image_np, focus_object=focus_object, roi=roi)
+        if result.get("status") != "found":
+            tracker.reset()
+            return result
+        tracker.seed(image_np, result["detection"], now)
+        return {
+            "status": "found",
+            "detection": tracker.detection(frame_w, frame_h, tracker.confidence),
+            "tracked": False,
+        }
@@ -0,0 +1,495 @@
+# backend/pipeline.py
+# Request processing shared by the threading server (App.py) and the asyncio
+# server (async_server.py): payload validation, frame decoding, running the
+# requested or LLM-selected feature, and building the "response" payload.
+
+import os
+
+from model_config import *
+from ollama import *
+from operations.detect_objects import *
+from operations.detect_hazards import *
+from operations.detect_scene import *
+from operations.extract_features import *
+from operations.detect_text import *
+from operations.detect_currency import *
+from operations.route_locally import *
+from operations.track_focus import *
+from text_cleanup import clean_ocr_lines
+from metrics import observe_stage
+from frame_quality import FRAME_ISSUE_MESSAGES, assess_frame, frame_issue, sharpest_frame
+from scheduler import PriorityExecutor
+from request_context import get_request_context
+from user_settings import DEFAULT_USER_SETTINGS
+
+os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"  # Keep if needed
+
+import base64
+import math
+import time
+
+import cv2
+import numpy as np
+
+
+# Class ids used by the compact result format (see result_encoding.py)
+DETECTION_CLASS_IDS = {name: class_id for class_id, name in enumerate(TARGET_CLASSES)}
+
+
+# CPU-bound operations of both servers run here, hazards first (see scheduler.py)
+cpu_scheduler = PriorityExecutor(
+    SCHEDULER_WORKERS,
+    FEATURE_PRIORITY,
+    DEFAULT_FEATURE_PRIORITY,
+    "visionaid-cpu",
+    initializer=thread_topology.init_worker,
+)
+
+
+def feature_is_io_bound(feature):
+    """
+    Operations that mostly wait on Roboflow or Ollama text cleaning skip the CPU scheduler.
+    Text detection still runs its OCR there (see detect_text_lines_scheduled); only the
+    wait for Ollama stays off it.
+    """
+    if feature == "currency_detection" and currency_model is None:
+        return True
+    if feature == "text_detection" and not current_user_settings().skip_text_cleaning:
+        return True
+    return False
+
+
+def run_on_cpu_scheduler(feature, func, *args):
+    """func(*args) on the CPU scheduler at `feature`'s priority; inline if already on a worker."""
+    if cpu_scheduler.in_worker():
+        return func(*args)
+    return cpu_scheduler.run(func, *args, priority=cpu_scheduler.priority_for(feature))
+
+
+def run_scheduled(feature, func, *args):
+    """Runs func(*args) for `feature` on the CPU scheduler (or inline if it is I/O-bound)."""
+    if feature_is_io_bound(feature):
+        return func(*args)
+    return run_on_cpu_scheduler(feature, func, *args)
+
+
+def detect_text_lines_scheduled(image_np, language_code, client_sid):
+    """Tesseract OCR at text priority on the CPU scheduler, so hazard frames go first under load."""
+    return run_on_cpu_scheduler(
+        "text_detection", detect_text_lines, image_np, language_code, client_sid
+    )
+
+
+def current_user_settings():
+    ctx = get_request_context()
+    if ctx is None or ctx.user_settings is None:
+        return DEFAULT_USER_SETTINGS
+    return ctx.user_settings
+
+
+def request_feature(detection_type):
+    """The feature label for a client-sent "type": itself if known, else UNKNOWN_FEATURE."""
+    return detection_type if detection_type in KNOWN_FEATURES else UNKNOWN_FEATURE
+
+
+def resolve_request_budget(data, detection_type):
+    """Seconds of budget for a request: the client's 'deadline_ms' if valid, else the feature SLO."""
+    budget = FEATURE_DEADLINE_SECONDS.get(detection_type, DEFAULT_REQUEST_DEADLINE_SECONDS)
+    client_deadline_ms = data.get("deadline_ms")
+    if client_deadline_ms is not None:
+        try:
+            client_budget = float(client_deadline_ms) / 1000.0
+        except (TypeError, ValueError):
+            client_budget = None
+        # "nan"/"inf" parse as floats but would switch the deadline off (min(nan, x) is nan)
+        if client_budget is not None and math.isfinite(client_budget) and client_budget > 0:
+            budget = client_budget
+        else:
+            logger.warning(f"Ignoring invalid deadline_ms '{client_deadline_ms}'.")
+    return min(budget, MAX_REQUEST_DEADLINE_SECONDS)
+
+
+def is_supervision_request(detection_type, supervision_request_type):
+    return detection_type == "supervision" and supervision_request_type == "llm_route"
+
+
+def error_payload(message, supervision=False):
+    payload = {"result": {"status": "error", "message": message}}
+    if supervision:
+        payload["feature_id"] = "supervision_error"
+        payload["is_from_supervision_llm"] = True
+    return payload
+
+
+def validate_message(data, client_sid):
+    """Returns an error payload for a malformed message, or None if it can be processed."""
+    if not isinstance(data, dict):
+        logger.warning(
+            f"Invalid data format from {client_sid}. Expected dict, got {type(data)}."
+        )
+        return error_payload("Invalid data format")
+    if not data.get("image") or not data.get("type"):
+        logger.warning(
+            f"Missing 'image' or 'type' from {client_sid}. Payload: {data}"
+        )
+        return error_payload("Missing 'image' or 'type'")
+    return None
+
+
+def decode_base64_image(image_data):
+    """Bytes of a (data URL or plain) base64 image."""
+    if image_data.startswith("data:image"):
+        _, encoded = image_data.split(",", 1)
+    else:
+        encoded = image_data  # Assume it's already base64 if no prefix
+    with observe_stage("base64_decode"):
+        return base64.b64decode(encoded)
+
+
+def decode_image(image_data, client_sid):
+    """Decodes a (data URL or plain) base64 image. Returns (image_bytes, BGR image_np); raises on bad data."""
+    image_bytes = (
+        image_data if isinstance(image_data, bytes) else decode_base64_image(image_data)
+    )
+    with observe_stage("imdecode"):
+        image_np_buffer = np.frombuffer(image_bytes, np.uint8)
+        image_np = cv2.imdecode(image_np_buffer, cv2.IMREAD_COLOR)
+
+    if image_np is None:
+        raise ValueError(
+            "cv2.imdecode returned None. Image data might be corrupt or not a supported format."
+        )
+    logger.debug(f"[{client_sid}] Image decoded. Shape: {image_np.shape}")
+    return image_bytes, image_np
+
+
+def decode_request_frame(data, client_sid):
+    """
+    decode_image for the message's frame. For a burst ("image" plus a "burst" list of
+    frames) only the sharpest frame, judged on 1/4-size grayscale decodes, is decoded.
+    """
+    burst = data.get("burst")
+    if not burst or not isinstance(burst, list):
+        return decode_image(data.get("image"), client_sid)
+    frames = [data.get("image")] + burst[: BURST_MAX_FRAMES - 1]
+    frames_bytes = []
+    for frame in frames:
+        try:
+            frames_bytes.append(decode_base64_image(frame))
+        except Exception as e:
+            logger.warning(f"[{client_sid}] Skipping undecodable burst frame: {e}")
+    with observe_stage("frame_quality"):
+        best_index = sharpest_frame(frames_bytes, FRAME_QUALITY_MAX_SIDE)
+    if best_index is None:
+        raise ValueError("No frame of the burst could be decoded.")
+    logger.debug(f"[{client_sid}] Burst of {len(frames)}: using frame {best_index}.")
+    return decode_image(frames_bytes[best_index], client_sid)
+
+
+def frame_quality_payload(image_np, feature, supervision, client_sid):
+    """A "retry" payload telling the user how to fix an unusable frame, or None."""
+    if not FRAME_QUALITY_GATING:
+        return None
+    with observe_stage("frame_quality"):
+        quality = assess_frame(image_np, FRAME_QUALITY_MAX_SIDE)
+    issue = frame_issue(
+        quality,
+        FRAME_MIN_SHARPNESS,
+        FRAME_DARK_LEVEL,
+        FRAME_BRIGHT_LEVEL,
+        FRAME_CLIPPED_FRACTION,
+        check_blur=feature not in FRAME_QUALITY_BLUR_EXEMPT,
+    )
+    if issue is None:
+        return None
+    logger.info(
+        f"[{client_sid}] Rejected '{feature}' frame as {issue} "
+        f"(sharpness {quality.sharpness:.1f}, brightness {quality.brightness:.1f})."
+    )
+    payload = {
+        "result": {
+            "status": "retry",
+            "reason": issue,
+            "message": FRAME_ISSUE_MESSAGES[issue],
+        }
+    }
+    if supervision:
+        payload["feature_id"] = "frame_quality"
+        payload["is_from_supervision_llm"] = True
+    return payload
+
+
+def run_supervision_feature(chosen_feature_by_llm, image_np, client_sid):
+    """Runs the feature picked by the SuperVision router and returns the response payload."""
+    supervision_string_result = "Error: LLM feature execution failed"
+    try:
+        if chosen_feature_by_llm == "hazard_detection":
+            hazard_result = detect_hazards(image_np)
+            if hazard_result.get("status") == "ok":
+                supervision_string_result = "Caution: " + ", ".join(
+                    f"{d['name']} ({d['level']})" for d in hazard_result["detections"]
+                )
+            elif hazard_result.get("status") == "none":
+                supervision_string_result = "No hazards detected by SuperVision"
+            else:
+                supervision_string_result = hazard_result.get(
+                    "message", "Hazard detection issue for SuperVision"
+                )
+        elif chosen_feature_by_llm == "object_detection":
+            obj_dict_result = detect_objects(image_np)
+            if obj_dict_result.get(
+                "status"
+            ) == "ok" and obj_dict_result.get("detections"):
+                names = [d["name"] for d in obj_dict_result["detections"]]
+                supervision_string_result = (
+                    ", ".join(names)
+                    if names
+                    else "No objects detected by SuperVision"
+                )
+            elif obj_dict_result.get("status") == "none":
+                supervision_string_result = (
+                    "No objects detected by SuperVision"
+                )
+            else:
+                supervision_string_result = obj_dict_result.get(
+                    "message",
+                    f"Object/Hazard detection issue for SuperVision: {obj_dict_result.get('status')}",
+                )
+        elif chosen_feature_by_llm == "scene_detection":
+            scene_label = detect_scene(image_np)
+            if "Error" in scene_label or "Unknown" in scene_label:
+                supervision_string_result = f"Scene analysis: {scene_label}"
+            else:
+                supervision_string_result = (
+                    f"The scene is likely a {scene_label}."
+                )
+        elif chosen_feature_by_llm == "text_detection":
+            # detect_text_lines returns [OcrLine] or an error/no text message.
+            # SuperVision has no language picker, so let OSD choose the script.
+            text_lines = detect_text_lines_scheduled(
+                image_np, OCR_AUTO_LANG, client_sid
+            )
+            if isinstance(text_lines, str) and "Error" in text_lines:
+                supervision_string_result = f"Text analysis: {text_lines}"
+            elif isinstance(text_lines, str):
+                supervision_string_result = "No text found in the image."
+            elif current_user_settings().skip_text_cleaning:
+                supervision_string_result = join_ocr_lines(text_lines)
+                logger.info(
+                    f"[{client_sid}] Text cleaning disabled in user settings. Using original OCR text."
+                )
+            else:
+                logger.info(
+                    f"[{client_sid}] Text detected by OCR (Supervision), attempting LLM cleaning of low-confidence lines ({len(text_lines)} lines)."
+                )
+                supervision_string_result, chunks_total, chunks_failed = clean_ocr_lines(
+                    text_lines, client_sid
+                )
+                if chunks_failed:
+                    logger.warning(
+                        f"[{client_sid}] Text cleaning failed for {chunks_failed}/{chunks_total} chunk(s) (Supervision). Using original OCR text there."
+                    )
+        elif chosen_feature_by_llm == "currency_detection":
+            currency_output = detect_currency(image_np)
+            if currency_output.get("status") == "ok":
+                supervision_string_result = f"Detected currency: {currency_output.get('currency', 'Unknown currency')}"
+            elif currency_output.get("status") == "none":
+                supervision_string_result = (
+                    "No currency detected by SuperVision"
+                )
+            else:
+                supervision_string_result = currency_output.get(
+                    "message", "Currency detection issue for SuperVision"
+                )
+        else:
+            logger.error(
+                f"[{client_sid}] Invalid feature '{chosen_feature_by_llm}' from LLM."
+            )
+            supervision_string_result = (
+                "Error: Invalid analysis type by LLM"
+            )
+
+        final_response_payload = {
+            "result": supervision_string_result,
+            "feature_id": chosen_feature_by_llm,
+            "is_from_supervision_llm": True,
+        }
+    except Exception as exec_e:
+        logger.error(
+            f"[{client_sid}] Error executing selected LLM feature '{chosen_feature_by_llm}': {exec_e}",
+            exc_info=True,
+        )
+        final_response_payload = {
+            "result": f"Error running {chosen_feature_by_llm}",
+            "feature_id": chosen_feature_by_llm,
+            "is_from_supervision_llm": True,
+        }
+    return final_response_payload
+
+
+def supervision_routing_failed_payload(client_sid):
+    logger.error(f"[{client_sid}] Failed to get feature choice from Ollama.")
+    return {
+        "result": "Error: Smart analysis failed (LLM issue)",
+        "feature_id": "supervision_error",
+        "is_from_supervision_llm": True,
+    }
+
+
+def run_direct_feature(detection_type_from_payload, image_np, data, client_sid):
+    """Runs a directly requested feature and returns its result dict."""
+    logger.info(
+        f"Processing direct request '{detection_type_from_payload}' from {client_sid}"
+    )
+    detection_function_output = {
+        "status": "error",
+        "message": "Error: Unknown processing error",
+    }  # Default
+    if detection_type_from_payload == "object_detection":
+        detection_function_output = detect_objects(image_np)
+    elif detection_type_from_payload == "focus_detection":
+        focus_object_name = data.get("focus_object")
+        if not focus_object_name:
+            logger.warning(
+                f"Direct focus_detection from {client_sid} missing 'focus_object'."
+            )
+            detection_function_output = {
+                "status": "error",
+                "message": "Missing 'focus_object' for focus detection",
+            }
+        else:
+            detection_function_output = track_focus_object(
+                image_np, focus_object_name, client_sid, roi_hint=data.get("roi")
+            )
+    elif detection_type_from_payload == "scene_detection":
+        scene_label = detect_scene(image_np)  # Returns a string
+        if "Error" in scene_label:  # detect_scene indicates error with "Error"
+            detection_function_output = {
+                "status": "error",
+                "message": scene_label,
+            }
+        elif (
+            "Unknown" in scene_label
+        ):  # detect_scene indicates no confident detection with "Unknown"
+            detection_function_output = {"status": "none", "scene": scene_label}
+        else:
+            detection_function_output = {"status": "ok", "scene": scene_label}
+    elif detection_type_from_payload == "text_detection":
+        # DEFAULT_OCR_LANG and SUPPORTED_OCR_LANGS should be from model_config
+        # "auto" and combined strings such as "eng+ara" are accepted too
+        default_language = (
+            OCR_AUTO_LANG if current_user_settings().auto_ocr_language else DEFAULT_OCR_LANG
+        )
+        requested_language = data.get("language", default_language).lower()
+        validated_language = validate_ocr_language(requested_language)
+        if validated_language is None:
+            logger.warning(
+                f"Client {client_sid} invalid lang '{requested_language}', using '{DEFAULT_OCR_LANG}'."
+            )
+            validated_language = DEFAULT_OCR_LANG
+        text_lines = detect_text_lines_scheduled(
+            image_np, validated_language, client_sid
+        )
+        if isinstance(text_lines, str) and "Error" in text_lines:
+            detection_function_output = {
+                "status": "error",
+                "message": text_lines,
+            }
+        elif isinstance(text_lines, str):
+            detection_function_output = {
+                "status": "none",
+                "text": text_lines,
+            }
+        elif current_user_settings().skip_text_cleaning:
+            detection_function_output = {
+                "status": "ok",
+                "text": join_ocr_lines(text_lines),
+            }
+        else:
+            logger.info(
+                f"[{client_sid}] Text detected by OCR (Direct), attempting LLM cleaning of low-confidence lines ({len(text_lines)} lines)."
+            )
+            cleaned_text, chunks_total, chunks_failed = clean_ocr_lines(
+                text_lines, client_sid
+            )
+            detection_function_output = {
+                "status": "ok",
+                "text": cleaned_text,
+            }
+            if chunks_failed:
+                detection_function_output["warning"] = (
+                    "Text cleaning by LLM failed, showing original OCR text."
+                )
+                logger.warning(
+                    f"[{client_sid}] Text cleaning failed for {chunks_failed}/{chunks_total} chunk(s) (Direct). Using original OCR text there."
+                )
+            else:
+                logger.info(
+                    f"[{client_sid}] Text cleaning done (Direct): {chunks_total} chunk(s) cleaned. Cleaned length: {len(cleaned_text)}"
+                )
+    elif detection_type_from_payload == "hazard_detection":
+        detection_function_output = detect_hazards(image_np)
+    elif detection_type_from_payload == "currency_detection":
+        detection_function_output = detect_currency(image_np)  # Returns dict
+    else:
+        logger.warning(
+            f"Unsupported direct type '{detection_type_from_payload}' from {client_sid}"
+        )
+        detection_function_output = {
+            "status": "error",
+            "message": f"Unsupported type '{detection_type_from_payload}'",
+        }
+    return detection_function_output
+
+
+def log_completion(final_response_payload, detection_type_from_payload, client_sid, start_time):
+    processing_time = time.time() - start_time
+    log_result_summary = str(final_response_payload.get("result", "N/A"))
+    if isinstance(final_response_payload.get("result"), dict):
+        log_result_summary = (
+            f"Dict keys: {list(final_response_payload['result'].keys())}"
+        )
+    log_result_short = (
+        (log_result_summary[:100] + "...")
+        if len(log_result_summary) > 100
+        else log_result_summary
+    )
+    log_type = final_response_payload.get(
+        "feature_id", detection_type_from_payload
+    )
+    log_origin = (
+        "Supervision(LLM)"
+        if final_response_payload.get("is_from_supervision_llm")
+        else "Direct"
+    )
+    logger.info(
+        f"Completed '{log_type}' ({log_origin}) for {client_sid} in {processing_time:.3f}s. Result summary: '{log_result_short}'"
+    )
+
+
+def response_status(final_response_payload):
+    """Status label for metrics/traces derived from a response payload."""
+    result = (final_response_payload or {}).get("result")
+    if isinstance(result, dict):
+        return result.get("status", "ok")
+    return "ok" if final_response_payload else "error"
+
+
+def history_summary(final_response_payload, limit=255):
+    """Short text of a response for the request history table."""
+    result = (final_response_payload or {}).get("result")
+    if isinstance(result, dict):
+        if result.get("detections"):
+            summary = ", ".join(d.get("name", "?") for d in result["detections"])
+        else:
+            summary = next(
+                (
+                    str(result[key])
+                    for key in ("scene", "text", "currency", "message", "status")
+                    if result.get(key)
+                ),
+                "",
+            )
+    else:
+        summary = str(result) if result is not None else ""
+    return summary[:limit]
@@ -0,0 +1,160 @@
+# backend/profiling.py
+# On-demand profiling windows, started from the admin route in App.py:
+# - "sample": a background thread samples every thread's Python stack at a fixed
+#   interval (py-spy style) and writes collapsed stacks for flamegraph tools.
+# - "cprofile": while the window is open, the threading server's handle_message, every
+#   CPU scheduler job and every async I/O pool job run under their own cProfile (model
+#   work runs on scheduler threads, so a handler's profile alone only shows it waiting
+#   on a future). The merged stats are dumped as a .pstats file when it closes.
+# Outside a window the only cost per request is one attribute check.
+
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("sample", "cprofile")
+
+_lock = threading.Lock()
+_active = None  # The running ProfileSession, if any
+_last_result = None
+
+
+class ProfileSession:
+    def __init__(self, mode, seconds, output_dir, sample_interval):
+        self.mode = mode
+        self.seconds = seconds
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.started_at = time.time()
+        self.ends_at = self.started_at + seconds
+        self.stack_counts = Counter()
+        self.samples = 0
+        self.stats = None
+        self.profiled_calls = 0
+        self._stats_lock = threading.Lock()
+
+    def describe(self):
+        return {
+            "mode": self.mode,
+            "seconds": self.seconds,
+            "started_at": self.started_at,
+            "ends_at": self.ends_at,
+        }
+
+    def _sample_loop(self):
+        own_ident = threading.get_ident()
+        while time.time() < self.ends_at:
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.stack_counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+            time.sleep(self.sample_interval)
+        self._finish()
+
+    def _timer_loop(self):
+        time.sleep(max(0.0, self.ends_at - time.time()))
+        self._finish()
+
+    def add_profile(self, profile):
+        with self._stats_lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+            self.profiled_calls += 1
+
+    def _finish(self):
+        global _active, _last_result
+        with _lock:
+            if _active is self:
+                _active = None
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+        result = self.describe()
+        if self.mode == "sample":
+            path = os.path.join(self.output_dir, f"stacks-{stamp}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in self.stack_counts.most_common():
+                    f.write(f"{stack} {count}\n")
+            result.update({"output": path, "samples": self.samples})
+        else:
+            path = os.path.join(self.output_dir, f"cprofile-{stamp}.pstats")
+            with self._stats_lock:
+                if self.stats is not None:
+                    self.stats.dump_stats(path)
+                else:
+                    path = None
+            result.update({"output": path, "profiled_calls": self.profiled_calls})
+        _last_result = result
+        logger.info(f"Profiling window finished: {result}")
+
+    def start(self):
+        target = self._sample_loop if self.mode == "sample" else self._timer_loop
+        threading.Thread(target=target, name=f"profiler-{self.mode}", daemon=True).start()
+
+
+def start_profiling(mode, seconds, output_dir, sample_interval=0.01):
+    """Opens a profiling window. Returns (session description, None) or (None, error message)."""
+    global _active
+    if mode not in PROFILE_MODES:
+        return None, f"Unknown profiling mode '{mode}'. Use one of {PROFILE_MODES}."
+    with _lock:
+        if _active is not None:
+            return None, "A profiling window is already running."
+        session = ProfileSession(mode, seconds, output_dir, sample_interval)
+        _active = session
+    session.start()
+    logger.info(f"Profiling window started: {session.describe()}")
+    return session.describe(), None
+
+
+def profiling_status():
+    session = _active
+    return {
+        "active": session.describe() if session is not None else None,
+        "last_result": _last_result,
+    }
+
+
+def start_request_profile():
+    """Returns an enabled cProfile.Profile while a cprofile window is open, else None."""
+    session = _active
+    if session is None or session.mode != "cprofile":
+        return None
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Another profiler is already active on this thread
+        return None
+    profile.session = session
+    return profile
+
+
+def stop_request_profile(profile):
+    if profile is None:
+        return
+    profile.disable()
+    profile.session.add_profile(profile)
+
+
+def run_profiled(func, *args, **kwargs):
+    """func(*args, **kwargs), under cProfile if a cprofile window is open."""
+    profile = start_request_profile()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        stop_request_profile(profile)
@@ -0,0 +1,95 @@
+# backend/request_context.py
+# Per-request state (client, feature, deadline) carried through handle_message and
+# every operation it calls, without threading extra arguments through each function.
+
+import contextvars
+import time
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request has no time budget left for the next stage."""
+
+    def __init__(self, stage, overrun):
+        super().__init__(f"Deadline exceeded before '{stage}' (over by {overrun:.3f}s)")
+        self.stage = stage
+        self.overrun = overrun
+
+
+class RequestContext:
+    def __init__(
+        self, client_sid="Unknown", feature=None, origin="direct", start_time=None, deadline=None
+    ):
+        self.client_sid = client_sid
+        self.feature = feature
+        self.origin = origin  # "direct" or "supervision"
+        self.trace = None  # tracing.Trace when this request is sampled
+        self.frame = None  # Decoded BGR frame
+        self.frame_bytes = None  # Image bytes as sent by the client
+        self.frame_jpeg_base64 = None  # Shared outbound encoding (see frame_encoding.py)
+        self.user_settings = None  # user_settings.UserSettings bound to the socket
+        self.embeddings = {}  # name -> (frame, embedding), see operations/extract_features.py
+        self.start_time = start_time if start_time is not None else time.time()
+        self.deadline = deadline  # Absolute time.time() value, or None for no deadline
+
+    def set_budget(self, seconds):
+        self.deadline = self.start_time + seconds if seconds is not None else None
+
+    def remaining(self):
+        """Seconds left before the deadline (may be negative), or None if unbounded."""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.time()
+
+    def expired(self):
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def check(self, stage):
+        """Raises DeadlineExceeded if the deadline has passed before `stage` starts."""
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(stage, -remaining)
+
+    def clamp_timeout(self, default_timeout, stage, minimum=0.0):
+        """
+        Returns default_timeout clamped to the remaining budget. Raises DeadlineExceeded
+        if less than `minimum` seconds are left, since such a call cannot finish in time.
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return default_timeout
+        if remaining <= minimum:
+            raise DeadlineExceeded(stage, -remaining)
+        if default_timeout is None:
+            return remaining
+        return min(default_timeout, remaining)
+
+
+_current_request = contextvars.ContextVar("visionaid_request", default=None)
+
+
+def begin_request(ctx):
+    """Makes ctx the current request context. Pass the returned token to end_request."""
+    return _current_request.set(ctx)
+
+
+def end_request(token):
+    _current_request.reset(token)
+
+
+def get_request_context():
+    return _current_request.get()
+
+
+def upstream_timeout(default_timeout, stage, minimum=0.0):
+    """Timeout for an outbound call, clamped to the current request's remaining budget."""
+    ctx = _current_request.get()
+    if ctx is None:
+        return default_timeout
+    return ctx.clamp_timeout(default_timeout, stage, minimum)
+
+
+def check_deadline(stage):
+    ctx = _current_request.get()
+    if ctx is not None:
+        ctx.check(stage)
@@ -0,0 +1,153 @@
+# backend/result_encoding.py
+# Optional compact binary encoding of detection results for high-rate streams
+# (object, focus and hazard detection). A client opts in per connection with
+# ?result_format=compact on the Socket.IO URL (or a "set_result_format" event);
+# it then receives the class table once as a "class_table" event, and each
+# detection "response" as bytes instead of a JSON dict. Other results stay JSON.
+#
+# Layout (little-endian), version 2:
+#   header  : version u8, status u8, count u8, alert u8, flags u8, reserved u8 x3
+#   per box : class_id u16, confidence u16, center_x u16, center_y u16, width u16, height u16,
+#             proximity u16, level u8, reserved u8
+# Confidence, box and proximity values are in [0, 1] and quantized to u16 (x * 65535).
+# alert and level are LEVEL_CODES (0 when absent, e.g. for object detection); flags
+# bit 0 is focus mode's "tracked". Version 1 had a 4-byte header and 12-byte boxes
+# without the hazard and tracking fields.
+
+import struct
+import threading
+
+RESULT_FORMAT_JSON = "json"
+RESULT_FORMAT_COMPACT = "compact"
+RESULT_FORMATS = (RESULT_FORMAT_JSON, RESULT_FORMAT_COMPACT)
+COMPACT_FORMAT_VERSION = 2
+
+COMPACT_FEATURES = ("object_detection", "focus_detection", "hazard_detection")
+STATUS_CODES = {"ok": 0, "none": 1, "found": 2, "not_found": 3}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+LEVEL_CODES = {"low": 1, "medium": 2, "high": 3}
+LEVEL_NAMES = {code: name for name, code in LEVEL_CODES.items()}
+FLAG_TRACKED = 0x01
+UNKNOWN_CLASS_ID = 0xFFFF
+
+_HEADER = struct.Struct("<BBBBB3x")
+_BOX = struct.Struct("<7HBx")
+_BOX_FIELDS = ("confidence", "center_x", "center_y", "width", "height")
+
+_client_formats = {}
+_client_formats_lock = threading.Lock()
+
+
+def set_client_result_format(client_sid, result_format):
+    if result_format not in RESULT_FORMATS:
+        return False
+    with _client_formats_lock:
+        if result_format == RESULT_FORMAT_JSON:
+            _client_formats.pop(client_sid, None)
+        else:
+            _client_formats[client_sid] = result_format
+    return True
+
+
+def get_client_result_format(client_sid):
+    with _client_formats_lock:
+        return _client_formats.get(client_sid, RESULT_FORMAT_JSON)
+
+
+def forget_client_result_format(client_sid):
+    with _client_formats_lock:
+        _client_formats.pop(client_sid, None)
+
+
+def class_table_payload(class_names):
+    return {"version": COMPACT_FORMAT_VERSION, "classes": list(class_names)}
+
+
+def _quantize(value):
+    return max(0, min(65535, int(round(float(value) * 65535))))
+
+
+def pack_detection_result(result, class_ids):
+    """
+    Packs a detect_objects, track_focus or detect_hazards result dict. Returns bytes,
+    or None if the result is not a detection result (e.g. an error), in which case it
+    should be sent as JSON.
+    """
+    status = result.get("status")
+    if status not in STATUS_CODES:
+        return None
+    if "detections" in result:
+        detections = result["detections"]
+    elif "detection" in result:
+        detections = [result["detection"]]
+    else:
+        detections = []
+    detections = detections[:255]
+
+    flags = FLAG_TRACKED if result.get("tracked") else 0
+    parts = [
+        _HEADER.pack(
+            COMPACT_FORMAT_VERSION,
+            STATUS_CODES[status],
+            len(detections),
+            LEVEL_CODES.get(result.get("alert"), 0),
+            flags,
+        )
+    ]
+    for detection in detections:
+        parts.append(
+            _BOX.pack(
+                class_ids.get(detection["name"], UNKNOWN_CLASS_ID),
+                *(_quantize(detection[field]) for field in _BOX_FIELDS),
+                _quantize(detection.get("proximity", 0.0)),
+                LEVEL_CODES.get(detection.get("level"), 0),
+            )
+        )
+    return b"".join(parts)
+
+
+def unpack_detection_result(data, class_names):
+    """Inverse of pack_detection_result, for clients, tests and benchmarks."""
+    version = data[0]
+    if version != COMPACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported compact result version {version}")
+    _, status_code, count, alert_code, flags = _HEADER.unpack_from(data, 0)
+    detections = []
+    offset = _HEADER.size
+    for _ in range(count):
+        values = _BOX.unpack_from(data, offset)
+        offset += _BOX.size
+        class_id = values[0]
+        detection = {
+            "name": class_names[class_id] if class_id < len(class_names) else None
+        }
+        for field, quantized in zip(_BOX_FIELDS, values[1:6]):
+            detection[field] = quantized / 65535.0
+        if values[7] in LEVEL_NAMES:  # Hazard boxes only
+            detection["proximity"] = values[6] / 65535.0
+            detection["level"] = LEVEL_NAMES[values[7]]
+        detections.append(detection)
+    result = {"status": STATUS_NAMES[status_code]}
+    if result["status"] == "found":
+        result["detection"] = detections[0] if detections else None
+        result["tracked"] = bool(flags & FLAG_TRACKED)
+    elif detections:
+        result["detections"] = detections
+    if alert_code in LEVEL_NAMES:
+        result["alert"] = LEVEL_NAMES[alert_code]
+    return result
+
+
+def encode_response(final_response_payload, client_sid, feature, class_ids):
+    """Returns the payload to emit for this client: packed bytes or the unchanged dict."""
+    if feature not in COMPACT_FEATURES:
+        return final_response_payload
+    if get_client_result_format(client_sid) != RESULT_FORMAT_COMPACT:
+        return final_response_payload
+    if final_response_payload.get("is_from_supervision_llm"):
+        return final_response_payload
+    result = final_response_payload.get("result")
+    if not isinstance(result, dict):
+        return final_response_payload
+    packed = pack_detection_result(result, class_ids)
+    return packed if packed is not None else final_response_payload
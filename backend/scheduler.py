@@ -0,0 +1,131 @@
+# backend/scheduler.py
+# Priority thread pool for CPU-bound operations. Both servers submit model work
+# here instead of running it on whatever thread received the frame, so at most
+# `workers` operations compete for the cores and, under load, queued jobs are
+# picked by priority (hazards first) rather than arrival order.
+
+import concurrent.futures
+import contextvars
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from metrics import Gauge, record_stage, register
+from profiling import run_profiled
+from request_context import check_deadline, get_request_context
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_QUEUE_DEPTH = register(
+    Gauge(
+        "visionaid_scheduler_queued_jobs",
+        "Operations waiting for a scheduler worker, by priority.",
+        ("priority",),
+    )
+)
+
+
+class PriorityExecutor(concurrent.futures.Executor):
+    """
+    concurrent.futures executor whose queue is ordered by (priority, arrival).
+    submit() takes the priority from the current request's feature, so it also
+    works as a drop-in for loop.run_in_executor(). Jobs run in a copy of the
+    submitter's context (request deadline, metrics labels, trace), and a job whose
+    request deadline passed while it was queued is not started.
+    """
+
+    def __init__(self, workers, feature_priority, default_priority, thread_name_prefix="scheduler",
+                 initializer=None):
+        self.feature_priority = feature_priority
+        self.initializer = initializer  # Called with the worker index in each worker thread
+        self.default_priority = default_priority
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._local = threading.local()
+        self._threads = [
+            threading.Thread(
+                target=self._worker, args=(i,), name=f"{thread_name_prefix}-{i}", daemon=True
+            )
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def in_worker(self):
+        """True on one of this executor's worker threads, where waiting on another job could deadlock."""
+        return getattr(self._local, "is_worker", False)
+
+    def priority_for(self, feature):
+        return self.feature_priority.get(feature, self.default_priority)
+
+    def current_priority(self):
+        ctx = get_request_context()
+        return self.priority_for(ctx.feature if ctx is not None else None)
+
+    def submit(self, fn, /, *args, **kwargs):
+        return self.submit_with_priority(self.current_priority(), fn, *args, **kwargs)
+
+    def submit_with_priority(self, priority, fn, /, *args, **kwargs):
+        future = concurrent.futures.Future()
+        job = (future, contextvars.copy_context(), fn, args, kwargs, time.perf_counter())
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new jobs after shutdown")
+            heapq.heappush(self._heap, (priority, next(self._seq), job))
+            SCHEDULER_QUEUE_DEPTH.inc(priority=str(priority))
+            self._cond.notify()
+        return future
+
+    def run(self, fn, *args, priority=None, **kwargs):
+        """Blocking submit-and-wait for thread-per-request callers."""
+        if priority is None:
+            priority = self.current_priority()
+        return self.submit_with_priority(priority, fn, *args, **kwargs).result()
+
+    def _worker(self, index):
+        self._local.is_worker = True
+        if self.initializer is not None:
+            try:
+                self.initializer(index)
+            except Exception as e:
+                logger.error(f"Scheduler worker {index} initializer failed: {e}", exc_info=True)
+        while True:
+            with self._cond:
+                while not self._heap and not self._shutdown:
+                    self._cond.wait()
+                if not self._heap:
+                    return
+                priority, _, job = heapq.heappop(self._heap)
+                SCHEDULER_QUEUE_DEPTH.dec(priority=str(priority))
+            future, ctx, fn, args, kwargs, queued_at = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = ctx.run(self._run_job, fn, args, kwargs, queued_at)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    @staticmethod
+    def _run_job(fn, args, kwargs, queued_at):
+        record_stage("queue_wait", time.perf_counter() - queued_at)
+        check_deadline("queue_wait")
+        return run_profiled(fn, *args, **kwargs)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self._cond:
+            self._shutdown = True
+            if cancel_futures:
+                while self._heap:
+                    priority, _, job = heapq.heappop(self._heap)
+                    SCHEDULER_QUEUE_DEPTH.dec(priority=str(priority))
+                    job[0].cancel()
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
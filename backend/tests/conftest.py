@@ -0,0 +1,10 @@
+# backend/tests/conftest.py
+# Run the tests from the backend directory (`python -m pytest -q`), like the bench
+# scripts: modules are imported top-level (`import circuit_breaker`, `bench.stubs`).
+
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
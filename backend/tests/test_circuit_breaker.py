@@ -0,0 +1,235 @@
+# backend/tests/test_circuit_breaker.py
+
+import types
+
+import pytest
+import requests
+
+import circuit_breaker
+from bench.stubs import RoboflowStub
+from circuit_breaker import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker, "time", types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+def make_breaker(**settings):
+    defaults = dict(
+        window_seconds=30.0, min_calls=4, failure_rate_threshold=0.5,
+        slow_call_seconds=1.0, open_seconds=10.0, half_open_max_calls=1,
+    )
+    defaults.update(settings)
+    return CircuitBreaker("test", **defaults)
+
+
+def fail():
+    raise RuntimeError("upstream down")
+
+
+def trip(breaker, calls=4):
+    for _ in range(calls):
+        with pytest.raises(RuntimeError):
+            breaker.call(fail)
+
+
+def test_stays_closed_below_min_calls(clock):
+    breaker = make_breaker()
+    trip(breaker, calls=3)
+    assert breaker.snapshot()["state"] == STATE_CLOSED
+    assert breaker.call(lambda: "ok") == "ok"
+
+
+def test_opens_at_failure_rate_and_fails_fast(clock):
+    breaker = make_breaker()
+    breaker.call(lambda: "ok")
+    breaker.call(lambda: "ok")
+    trip(breaker, calls=2)  # 2 of 4 bad reaches the 0.5 threshold
+    assert breaker.snapshot()["state"] == STATE_OPEN
+
+    called = []
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.call(called.append, 1)
+    assert called == []
+    assert excinfo.value.name == "test"
+    assert excinfo.value.retry_in == pytest.approx(10.0)
+    snapshot = breaker.snapshot()
+    assert snapshot["times_opened"] == 1
+    assert snapshot["rejected_calls"] == 1
+
+
+def test_slow_calls_count_as_bad(clock):
+    breaker = make_breaker()
+    for _ in range(4):
+        assert breaker.allow_request()
+        breaker.record(True, latency=2.5)
+    assert breaker.snapshot()["state"] == STATE_OPEN
+
+
+def test_old_failures_leave_the_window(clock):
+    breaker = make_breaker()
+    trip(breaker, calls=3)
+    clock.advance(31.0)
+    breaker.call(lambda: "ok")
+    snapshot = breaker.snapshot()
+    assert snapshot["state"] == STATE_CLOSED
+    assert snapshot["window_calls"] == 1
+    assert snapshot["window_failures"] == 0
+
+
+def test_half_open_probe_success_closes(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.advance(10.0)
+    assert breaker.snapshot()["state"] == STATE_HALF_OPEN
+
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # Only one probe at a time
+    breaker.record(True, latency=0.1)
+    snapshot = breaker.snapshot()
+    assert snapshot["state"] == STATE_CLOSED
+    assert snapshot["window_calls"] == 0
+
+
+def test_half_open_probe_failure_reopens(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.advance(10.0)
+    with pytest.raises(RuntimeError):
+        breaker.call(fail)
+    snapshot = breaker.snapshot()
+    assert snapshot["state"] == STATE_OPEN
+    assert snapshot["times_opened"] == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "ok")
+
+
+def test_late_result_while_open_is_ignored(clock):
+    breaker = make_breaker()
+    assert breaker.allow_request()  # Admitted before the breaker opened
+    trip(breaker)
+    breaker.record(True, latency=0.1)
+    assert breaker.snapshot()["state"] == STATE_OPEN
+
+
+def test_get_breaker_returns_one_breaker_per_name():
+    first = circuit_breaker.get_breaker("test-shared", min_calls=2)
+    second = circuit_breaker.get_breaker("test-shared", min_calls=99)
+    assert first is second
+    assert second.min_calls == 2
+    assert "test-shared" in circuit_breaker.get_breaker_states()
+
+
+@pytest.fixture
+def roboflow_stub():
+    stub = RoboflowStub().start()
+    yield stub
+    stub.stop()
+
+
+def post_to(stub):
+    response = requests.post(stub.endpoint, data="aW1hZ2U=", timeout=5)
+    response.raise_for_status()
+    return response.json()
+
+
+def test_outage_stops_reaching_the_upstream(roboflow_stub):
+    breaker = make_breaker(open_seconds=60.0)
+    assert breaker.call(post_to, roboflow_stub)["predictions"][0]["class"] == "100 AED"
+
+    roboflow_stub.fail = True
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.HTTPError):
+            breaker.call(post_to, roboflow_stub)
+    assert breaker.snapshot()["state"] == STATE_OPEN
+    served = roboflow_stub.requests_served
+
+    for _ in range(5):
+        with pytest.raises(CircuitOpenError):
+            breaker.call(post_to, roboflow_stub)
+    assert roboflow_stub.requests_served == served
+
+
+def test_slow_upstream_opens_the_breaker():
+    stub = RoboflowStub(latency=0.05).start()
+    try:
+        breaker = make_breaker(min_calls=2, slow_call_seconds=0.01)
+        breaker.call(post_to, stub)
+        breaker.call(post_to, stub)
+        assert breaker.snapshot()["state"] == STATE_OPEN
+    finally:
+        stub.stop()
+
+
+def time_out():
+    raise requests.exceptions.Timeout("read timed out")
+
+
+def test_deadline_clamped_timeouts_do_not_trip(clock):
+    breaker = make_breaker()
+    for _ in range(10):
+        with pytest.raises(requests.exceptions.Timeout):
+            breaker.call_clamped(True, requests.exceptions.Timeout, time_out)
+    snapshot = breaker.snapshot()
+    assert snapshot["state"] == STATE_CLOSED
+    assert snapshot["window_calls"] == 0
+
+
+def test_full_timeouts_and_other_errors_still_trip(clock):
+    breaker = make_breaker()
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.Timeout):
+            breaker.call_clamped(False, requests.exceptions.Timeout, time_out)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            breaker.call_clamped(True, requests.exceptions.Timeout, fail)
+    assert breaker.snapshot()["state"] == STATE_OPEN
+
+
+def test_clamped_timeout_frees_the_half_open_probe(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.advance(10.0)
+    with pytest.raises(requests.exceptions.Timeout):
+        breaker.call_clamped(True, requests.exceptions.Timeout, time_out)
+    assert breaker.call_clamped(True, requests.exceptions.Timeout, lambda: "ok") == "ok"
+    assert breaker.snapshot()["state"] == STATE_CLOSED
+
+
+def test_short_client_deadlines_against_a_slow_upstream():
+    stub = RoboflowStub(latency=0.2).start()
+    try:
+        breaker = make_breaker(min_calls=3)
+
+        def post(timeout):
+            response = requests.post(stub.endpoint, data="aW1hZ2U=", timeout=timeout)
+            response.raise_for_status()
+            return response.json()
+
+        for _ in range(5):
+            with pytest.raises(requests.exceptions.Timeout):
+                breaker.call_clamped(True, requests.exceptions.Timeout, post, 0.05)
+        assert breaker.snapshot()["state"] == STATE_CLOSED
+        assert breaker.call_clamped(False, requests.exceptions.Timeout, post, 5.0)["predictions"]
+    finally:
+        stub.stop()
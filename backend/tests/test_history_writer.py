@@ -0,0 +1,160 @@
+# backend/tests/test_history_writer.py
+# HistoryWriter with db.insert_history_rows on a throwaway SQLite database, the
+# local stand-in for MySQL.
+
+import time
+from datetime import datetime
+
+import pytest
+from flask import Flask
+
+import db as db_module
+from db import RequestHistory, db, insert_history_rows
+from history_writer import HistoryWriter
+
+
+@pytest.fixture
+def history_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_module, "DB_URI", f"sqlite:///{tmp_path / 'history.db'}")
+    monkeypatch.setattr(db_module, "_schema_ready", False)
+    monkeypatch.setattr(db_module, "_schema_failed_at", None)
+    app = Flask(__name__)
+    db_module.init_db(app)
+    assert db_module.ensure_schema()
+    return app
+
+
+def stored_rows(app):
+    with app.app_context():
+        return db.session.query(RequestHistory).order_by(RequestHistory.id).all()
+
+
+def history_row(i, **overrides):
+    row = {
+        "created_at": datetime.utcnow(),
+        "client_sid": f"sid-{i}",
+        "user_email": None,
+        "feature": "object_detection",
+        "origin": "direct",
+        "status": "ok",
+        "latency_ms": float(i),
+        "result_summary": "person",
+    }
+    row.update(overrides)
+    return row
+
+
+class CountingFlush:
+    def __init__(self, func):
+        self.func = func
+        self.batch_sizes = []
+
+    def __call__(self, rows):
+        self.batch_sizes.append(len(rows))
+        return self.func(rows)
+
+
+def test_rows_are_written_in_batches(history_db):
+    flush = CountingFlush(insert_history_rows)
+    writer = HistoryWriter(flush, batch_size=10, flush_interval=60.0)
+    for i in range(25):
+        writer.record(**history_row(i))
+    writer.flush()
+
+    assert flush.batch_sizes == [10, 10, 5]
+    rows = stored_rows(history_db)
+    assert [row.client_sid for row in rows] == [f"sid-{i}" for i in range(25)]
+    assert writer.pending() == 0
+
+
+def test_background_thread_flushes_on_interval(history_db):
+    writer = HistoryWriter(insert_history_rows, batch_size=100, flush_interval=0.05)
+    writer.start()
+    try:
+        for i in range(3):
+            writer.record(**history_row(i))
+        deadline = time.monotonic() + 5.0
+        while len(stored_rows(history_db)) < 3 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert len(stored_rows(history_db)) == 3
+    finally:
+        writer.stop()
+
+
+def test_stop_flushes_what_is_buffered(history_db):
+    writer = HistoryWriter(insert_history_rows, batch_size=100, flush_interval=60.0)
+    writer.start()
+    for i in range(7):
+        writer.record(**history_row(i))
+    writer.stop()
+    assert len(stored_rows(history_db)) == 7
+
+
+def test_bad_row_does_not_cost_the_batch(history_db):
+    flush = CountingFlush(insert_history_rows)
+    writer = HistoryWriter(flush, batch_size=5, flush_interval=60.0)
+    for i in range(5):
+        writer.record(**history_row(i, feature=None if i == 2 else "scene_detection"))
+    writer.flush()
+
+    assert flush.batch_sizes == [5, 1, 1, 1, 1, 1]
+    assert [row.client_sid for row in stored_rows(history_db)] == ["sid-0", "sid-1", "sid-3", "sid-4"]
+
+
+def test_long_values_are_cut_to_the_column(history_db):
+    insert_history_rows([history_row(0, feature="x" * 200, result_summary="y" * 1000)])
+    row = stored_rows(history_db)[0]
+    assert row.feature == "x" * 64
+    assert row.result_summary == "y" * 255
+
+
+def test_schema_setup_backs_off_while_the_database_is_down(history_db, monkeypatch):
+    attempts = []
+
+    def unreachable(app):
+        attempts.append(app)
+        return False
+
+    monkeypatch.setattr(db_module, "_schema_ready", False)
+    monkeypatch.setattr(db_module, "test_db_connection", unreachable)
+    assert not db_module.ensure_schema()
+    assert not db_module.ensure_schema()
+    with pytest.raises(RuntimeError):
+        insert_history_rows([history_row(0)])
+    assert len(attempts) == 1
+
+    monkeypatch.setattr(db_module, "DB_RETRY_SECONDS", 0.0)
+    monkeypatch.setattr(db_module, "test_db_connection", lambda app: True)
+    assert db_module.ensure_schema()
+    assert db_module._schema_failed_at is None
+
+
+def test_database_down_drops_the_batch():
+    calls = []
+
+    def unavailable(rows):
+        calls.append(len(rows))
+        raise RuntimeError("Database unavailable")
+
+    writer = HistoryWriter(unavailable, batch_size=10, flush_interval=60.0, max_row_failures=3)
+    for i in range(10):
+        writer.record(**history_row(i))
+    writer.flush()
+
+    assert calls == [10, 1, 1, 1]  # One bulk insert, then three rows and give up
+    assert writer.pending() == 0
+
+
+def test_buffer_is_bounded():
+    writer = HistoryWriter(lambda rows: None, batch_size=100, flush_interval=60.0, max_buffer=5)
+    for i in range(8):
+        writer.record(**history_row(i))
+    assert writer.pending() == 5
+    batch = writer._take_batch()
+    assert [row["client_sid"] for row in batch] == [f"sid-{i}" for i in range(3, 8)]
+
+
+def test_record_fills_in_created_at():
+    writer = HistoryWriter(lambda rows: None)
+    writer.record(feature="scene_detection")
+    assert isinstance(writer._take_batch()[0]["created_at"], datetime)
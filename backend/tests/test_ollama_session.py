@@ -0,0 +1,114 @@
+# backend/tests/test_ollama_session.py
+# Warm-up and keep-alive of OllamaSessionManager against bench.stubs.OllamaStub,
+# which tracks model residency the way Ollama does (keep_alive, loads on demand).
+
+import time
+
+import pytest
+import requests
+
+from bench.stubs import OllamaStub, parse_keep_alive
+from ollama_session import OllamaSessionManager
+
+MODELS = ("routing-model", "cleaning-model")
+
+
+@pytest.fixture
+def stub():
+    stub = OllamaStub().start()
+    yield stub
+    stub.stop()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def test_warm_loads_model_with_keep_alive(stub):
+    session = OllamaSessionManager(stub.generate_url, MODELS, "30m", ping_interval=600)
+    assert session.warm("routing-model")
+    assert stub.is_loaded("routing-model")
+    assert not stub.is_loaded("cleaning-model")
+    assert stub.last_payload == {
+        "model": "routing-model", "prompt": "", "keep_alive": "30m", "stream": False,
+    }
+    assert session.idle_models() == ["cleaning-model"]
+
+
+def test_warm_reports_failure(stub):
+    stub.fail = True
+    session = OllamaSessionManager(stub.generate_url, MODELS, "30m", ping_interval=600)
+    assert not session.warm("routing-model")
+    assert session.idle_models() == list(MODELS)
+
+
+def test_unreachable_server_is_not_fatal():
+    session = OllamaSessionManager(
+        "http://127.0.0.1:9/api/generate", MODELS, "30m", ping_interval=600, request_timeout=1
+    )
+    assert not session.warm("routing-model")
+
+
+def test_shared_model_is_warmed_once():
+    session = OllamaSessionManager("http://unused", ["gemma3", "gemma3"], "30m", ping_interval=600)
+    assert session.models == ["gemma3"]
+
+
+def test_start_warms_every_model(stub):
+    session = OllamaSessionManager(stub.generate_url, MODELS, "30m", ping_interval=600)
+    session.start()
+    try:
+        assert wait_for(lambda: all(stub.is_loaded(model) for model in MODELS))
+        assert stub.loads == 2
+        assert session.idle_models() == []
+    finally:
+        session.stop()
+
+
+def test_warm_model_skips_the_load_latency(stub):
+    stub.load_latency = 0.3
+    session = OllamaSessionManager(stub.generate_url, MODELS, "30m", ping_interval=600)
+    assert session.warm("routing-model")
+
+    start = time.monotonic()
+    response = requests.post(
+        stub.generate_url,
+        json={"model": "routing-model", "prompt": "hello", "stream": False, "keep_alive": "30m"},
+        timeout=5,
+    )
+    response.raise_for_status()
+    assert time.monotonic() - start < 0.3
+    assert stub.loads == 1
+
+
+def test_pinger_keeps_idle_models_resident(stub):
+    # keep_alive of 0.5s: without the pinger both models would unload
+    session = OllamaSessionManager(stub.generate_url, MODELS, 0.5, ping_interval=0.1)
+    session.start()
+    try:
+        assert wait_for(lambda: stub.loads == 2)
+        time.sleep(1.0)
+        assert all(stub.is_loaded(model) for model in MODELS)
+        assert stub.loads == 2  # Re-pinged before unloading, never reloaded
+    finally:
+        session.stop()
+
+
+def test_recently_used_model_is_not_pinged(stub):
+    session = OllamaSessionManager(stub.generate_url, MODELS, "30m", ping_interval=60)
+    session.mark_used("routing-model")
+    assert session.idle_models() == ["cleaning-model"]
+
+
+def test_parse_keep_alive():
+    assert parse_keep_alive("30m") == 1800
+    assert parse_keep_alive("90s") == 90
+    assert parse_keep_alive("1h") == 3600
+    assert parse_keep_alive(45) == 45
+    assert parse_keep_alive(-1) == float("inf")
+    assert parse_keep_alive(None) == 300
@@ -0,0 +1,115 @@
+# backend/tests/test_parity.py
+# Scoring helpers of bench/parity.py and the committed fixture frames.
+
+import os
+
+import pytest
+
+from bench.common import load_frames
+from bench.parity import box_iou, edit_distance, match_detections, score_detections, score_text
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench", "fixtures")
+
+
+def box(name, center_x, center_y, width, height):
+    return {"name": name, "center_x": center_x, "center_y": center_y, "width": width, "height": height}
+
+
+def test_box_iou_identical():
+    a = box("person", 0.5, 0.5, 0.2, 0.4)
+    assert box_iou(a, a) == pytest.approx(1.0)
+
+
+def test_box_iou_disjoint():
+    assert box_iou(box("cup", 0.2, 0.2, 0.1, 0.1), box("cup", 0.8, 0.8, 0.1, 0.1)) == 0.0
+
+
+def test_box_iou_touching_edges():
+    assert box_iou(box("cup", 0.25, 0.5, 0.5, 0.5), box("cup", 0.75, 0.5, 0.5, 0.5)) == 0.0
+
+
+def test_box_iou_partial_overlap():
+    # Unit squares offset by half a side: intersection 0.5, union 1.5
+    a = box("cup", 0.5, 0.5, 1.0, 1.0)
+    b = box("cup", 1.0, 0.5, 1.0, 1.0)
+    assert box_iou(a, b) == pytest.approx(1 / 3)
+    assert box_iou(b, a) == pytest.approx(1 / 3)
+
+
+def test_box_iou_contained():
+    outer = box("cup", 0.5, 0.5, 0.4, 0.4)
+    inner = box("cup", 0.5, 0.5, 0.2, 0.2)
+    assert box_iou(outer, inner) == pytest.approx(0.25)
+
+
+def test_box_iou_empty_boxes():
+    empty = box("cup", 0.5, 0.5, 0.0, 0.0)
+    assert box_iou(empty, empty) == 0.0
+
+
+def test_match_detections_same_class_only():
+    golden = [box("person", 0.5, 0.5, 0.2, 0.2)]
+    candidate = [box("chair", 0.5, 0.5, 0.2, 0.2)]
+    assert match_detections(golden, candidate, min_iou=0.5) == []
+
+
+def test_match_detections_below_min_iou():
+    golden = [box("cup", 0.5, 0.5, 1.0, 1.0)]
+    candidate = [box("cup", 1.0, 0.5, 1.0, 1.0)]
+    assert match_detections(golden, candidate, min_iou=0.5) == []
+    assert match_detections(golden, candidate, min_iou=0.3) == [pytest.approx(1 / 3)]
+
+
+def test_match_detections_best_pairs_first():
+    golden = [box("cup", 0.30, 0.5, 0.2, 0.2), box("cup", 0.70, 0.5, 0.2, 0.2)]
+    candidate = [box("cup", 0.71, 0.5, 0.2, 0.2), box("cup", 0.30, 0.5, 0.2, 0.2)]
+    ious = match_detections(golden, candidate, min_iou=0.5)
+    assert len(ious) == 2
+    assert ious[0] == pytest.approx(1.0)
+    assert ious[1] == pytest.approx(box_iou(golden[1], candidate[0]))
+
+
+def test_match_detections_one_to_one():
+    golden = [box("cup", 0.5, 0.5, 0.2, 0.2)]
+    candidate = [box("cup", 0.5, 0.5, 0.2, 0.2), box("cup", 0.51, 0.5, 0.2, 0.2)]
+    assert match_detections(golden, candidate, min_iou=0.5) == [pytest.approx(1.0)]
+
+
+def test_score_detections_counts_misses_and_extras():
+    golden = {"a.png": {"detections": [box("cup", 0.5, 0.5, 0.2, 0.2), box("dog", 0.2, 0.2, 0.1, 0.1)]}}
+    candidate = {"a.png": {"detections": [box("cup", 0.5, 0.5, 0.2, 0.2)]}}
+    scores = score_detections(golden, candidate, min_iou=0.5)
+    assert scores == {"mean_iou": pytest.approx(1.0), "recall": 0.5, "precision": 1.0}
+
+
+@pytest.mark.parametrize(
+    "a, b, distance",
+    [
+        ("", "", 0),
+        ("abc", "", 3),
+        ("", "abc", 3),
+        ("kitten", "sitting", 3),
+        ("flaw", "lawn", 2),
+        ("Exit", "Exit", 0),
+        ("مرحبا", "مرحب", 1),
+    ],
+)
+def test_edit_distance(a, b, distance):
+    assert edit_distance(a, b) == distance
+    assert edit_distance(b, a) == distance
+
+
+def test_score_text_character_error_rate():
+    golden = {"a.png": "hello world", "b.png": ""}
+    candidate = {"a.png": "hel1o world", "b.png": None}
+    assert score_text(golden, candidate)["cer"] == pytest.approx(1 / 12)
+
+
+def test_fixture_frames_load_by_relative_path():
+    frames = load_frames([FIXTURES_DIR])
+    names = [name for name, _ in frames]
+    assert names == sorted(names)
+    assert "text/printed_page.png" in names
+    assert all(not os.path.isabs(name) and "\\" not in name for name in names)
+    for _, frame in frames:
+        assert frame.ndim == 3 and frame.shape[2] == 3
@@ -0,0 +1,125 @@
+# backend/tests/test_result_encoding.py
+# Round trips of the compact binary result format (v2).
+
+import pytest
+
+from result_encoding import (
+    COMPACT_FORMAT_VERSION,
+    RESULT_FORMAT_COMPACT,
+    encode_response,
+    forget_client_result_format,
+    pack_detection_result,
+    set_client_result_format,
+    unpack_detection_result,
+)
+
+CLASS_NAMES = ["person", "car", "knife"]
+CLASS_IDS = {name: index for index, name in enumerate(CLASS_NAMES)}
+STEP = 1 / 65535  # Quantization step of confidences, boxes and proximity
+
+
+def box(name, confidence=0.9, center_x=0.5, center_y=0.5, width=0.25, height=0.4, **extra):
+    return dict(
+        name=name, confidence=confidence, center_x=center_x, center_y=center_y,
+        width=width, height=height, **extra,
+    )
+
+
+def round_trip(result):
+    data = pack_detection_result(result, CLASS_IDS)
+    assert data[0] == COMPACT_FORMAT_VERSION
+    return unpack_detection_result(data, CLASS_NAMES)
+
+
+def assert_box_equal(unpacked, expected):
+    assert set(unpacked) == set(expected)
+    for field, value in expected.items():
+        if isinstance(value, float):
+            assert unpacked[field] == pytest.approx(value, abs=STEP)
+        else:
+            assert unpacked[field] == value
+
+
+def test_object_detections():
+    detections = [box("person", 0.87), box("car", 0.61, 0.1, 0.9, 0.05, 0.12)]
+    unpacked = round_trip({"status": "ok", "detections": detections})
+    assert unpacked["status"] == "ok"
+    assert "alert" not in unpacked
+    assert len(unpacked["detections"]) == 2
+    for got, expected in zip(unpacked["detections"], detections):
+        assert_box_equal(got, expected)
+
+
+def test_none_result():
+    data = pack_detection_result({"status": "none", "message": "No objects detected"}, CLASS_IDS)
+    assert len(data) == 8  # Header only
+    assert unpack_detection_result(data, CLASS_NAMES) == {"status": "none"}
+
+
+def test_hazard_boxes_keep_level_and_proximity():
+    detections = [
+        box("knife", proximity=0.72, level="high"),
+        box("car", proximity=0.4, level="medium"),
+        box("person", proximity=0.0, level="low"),
+    ]
+    unpacked = round_trip({"status": "ok", "alert": "high", "detections": detections})
+    assert unpacked["alert"] == "high"
+    for got, expected in zip(unpacked["detections"], detections):
+        assert_box_equal(got, expected)
+
+
+@pytest.mark.parametrize("tracked", [True, False])
+def test_focus_result(tracked):
+    detection = box("car", 0.77)
+    unpacked = round_trip({"status": "found", "detection": detection, "tracked": tracked})
+    assert unpacked["status"] == "found"
+    assert unpacked["tracked"] is tracked
+    assert_box_equal(unpacked["detection"], detection)
+
+
+def test_focus_not_found():
+    assert round_trip({"status": "not_found"}) == {"status": "not_found"}
+
+
+def test_unknown_class_name():
+    unpacked = round_trip({"status": "ok", "detections": [box("giraffe")]})
+    assert unpacked["detections"][0]["name"] is None
+
+
+def test_values_are_clamped_to_unit_range():
+    unpacked = round_trip({"status": "ok", "detections": [box("person", 1.2, -0.1)]})
+    assert unpacked["detections"][0]["confidence"] == 1.0
+    assert unpacked["detections"][0]["center_x"] == 0.0
+
+
+def test_detections_are_capped_at_255():
+    detections = [box("person", confidence=i / 300) for i in range(300)]
+    data = pack_detection_result({"status": "ok", "detections": detections}, CLASS_IDS)
+    unpacked = unpack_detection_result(data, CLASS_NAMES)
+    assert len(unpacked["detections"]) == 255
+    assert unpacked["detections"][-1]["confidence"] == pytest.approx(254 / 300, abs=STEP)
+
+
+def test_error_results_are_not_packed():
+    assert pack_detection_result({"status": "error", "message": "boom"}, CLASS_IDS) is None
+
+
+def test_other_versions_are_rejected():
+    data = bytearray(pack_detection_result({"status": "none"}, CLASS_IDS))
+    data[0] = 1
+    with pytest.raises(ValueError):
+        unpack_detection_result(bytes(data), CLASS_NAMES)
+
+
+def test_encode_response_only_for_opted_in_detection_results():
+    payload = {"result": {"status": "ok", "detections": [box("person")]}}
+    assert encode_response(payload, "sid-1", "object_detection", CLASS_IDS) is payload
+
+    set_client_result_format("sid-1", RESULT_FORMAT_COMPACT)
+    try:
+        assert isinstance(encode_response(payload, "sid-1", "object_detection", CLASS_IDS), bytes)
+        assert encode_response(payload, "sid-1", "scene_detection", CLASS_IDS) is payload
+        error = {"result": {"status": "error", "message": "boom"}}
+        assert encode_response(error, "sid-1", "object_detection", CLASS_IDS) is error
+    finally:
+        forget_client_result_format("sid-1")
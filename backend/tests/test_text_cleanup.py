@@ -0,0 +1,140 @@
+# backend/tests/test_text_cleanup.py
+# Which OCR lines reach the cleaning model and how the cleaned chunks are spliced
+# back. clean_text_with_llm is replaced by a local function; text_cleanup imports
+# model_config through ollama.py, so this skips without the model stack.
+
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("model_config")
+
+import text_cleanup
+from operations.detect_text import OcrLine, join_ocr_lines
+from text_cleanup import chunk_ranges, clean_ocr_lines, low_confidence_spans
+
+HIGH = 95.0
+LOW = 40.0
+
+
+def ocr_line(index, confidence, paragraph=0, width=40):
+    return OcrLine(f"p{paragraph} line {index} ".ljust(width, "x"), confidence, (1, paragraph))
+
+
+class FakeCleaner:
+    """Stands in for clean_text_with_llm: brackets the text, or fails for chosen inputs."""
+
+    def __init__(self, fail_containing=(), raise_containing=(), reverse_delay=False):
+        self.fail_containing = fail_containing
+        self.raise_containing = raise_containing
+        self.reverse_delay = reverse_delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, raw_text, client_sid="Unknown", context_before="", context_after=""):
+        with self._lock:
+            self.calls.append((raw_text, context_before, context_after))
+            order = len(self.calls)
+        if self.reverse_delay:
+            time.sleep(max(0.0, 0.2 - 0.03 * order))  # Later chunks finish first
+        if any(marker in raw_text for marker in self.raise_containing):
+            raise RuntimeError("cleaning failed")
+        if any(marker in raw_text for marker in self.fail_containing):
+            return None
+        return f"[{raw_text.upper()}]"
+
+
+@pytest.fixture
+def cleaner(monkeypatch):
+    def install(**options):
+        fake = FakeCleaner(**options)
+        monkeypatch.setattr(text_cleanup, "clean_text_with_llm", fake)
+        return fake
+
+    return install
+
+
+def test_low_confidence_spans():
+    lines = [ocr_line(i, c) for i, c in enumerate([HIGH, LOW, LOW, HIGH, LOW])]
+    assert low_confidence_spans(lines, min_confidence=85) == [(1, 3), (4, 5)]
+    assert low_confidence_spans([ocr_line(0, HIGH)], min_confidence=85) == []
+
+
+def test_confident_page_skips_the_llm(cleaner):
+    fake = cleaner()
+    lines = [ocr_line(i, HIGH) for i in range(5)]
+    assert clean_ocr_lines(lines) == (join_ocr_lines(lines), 0, 0)
+    assert fake.calls == []
+
+
+def test_confident_lines_pass_through_verbatim(cleaner):
+    fake = cleaner()
+    confidences = [HIGH, HIGH, LOW, HIGH, LOW, LOW, HIGH]
+    lines = [ocr_line(i, c) for i, c in enumerate(confidences)]
+    text, total, failed = clean_ocr_lines(lines)
+
+    assert (total, failed) == (2, 0)
+    assert text.split("\n") == [
+        lines[0].text,
+        lines[1].text,
+        f"[{lines[2].text.upper()}]",
+        lines[3].text,
+        f"[{lines[4].text.upper()}",
+        f"{lines[5].text.upper()}]",
+        lines[6].text,
+    ]
+    # Only the low-confidence lines are sent, with their neighbours as context
+    sent = sorted(fake.calls)
+    assert sent[0][0] == lines[2].text
+    assert lines[1].text in sent[0][1] and lines[3].text in sent[0][2]
+    assert sent[1][0] == join_ocr_lines(lines[4:6])
+
+
+def test_chunks_cut_at_paragraph_boundaries():
+    # Paragraphs of 3 lines, 21 characters per line: 4 lines fit in 100 characters
+    lines = [ocr_line(i, LOW, paragraph=i // 3, width=20) for i in range(12)]
+    ranges = chunk_ranges(lines, 0, 12, max_chars=100)
+    assert ranges == [(0, 3), (3, 6), (6, 9), (9, 12)]
+
+
+def test_chunks_cover_the_span_in_order():
+    lines = [ocr_line(i, LOW, paragraph=i // 2, width=20) for i in range(15)]
+    ranges = chunk_ranges(lines, 2, 15, max_chars=70)
+    assert ranges[0][0] == 2 and ranges[-1][1] == 15
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    paragraph_starts = {i for i in range(1, 15) if lines[i].paragraph != lines[i - 1].paragraph}
+    assert all(start in paragraph_starts for start, _ in ranges[1:])
+
+
+def test_long_paragraph_cuts_at_lines():
+    lines = [ocr_line(i, LOW, paragraph=0, width=20) for i in range(6)]
+    assert chunk_ranges(lines, 0, 6, max_chars=50) == [(0, 2), (2, 4), (4, 6)]
+
+
+def test_chunks_come_back_in_order(cleaner):
+    fake = cleaner(reverse_delay=True)
+    lines = [ocr_line(i, LOW, paragraph=i // 3, width=100) for i in range(30)]
+    text, total, failed = clean_ocr_lines(lines)
+
+    jobs = text_cleanup._cleaning_jobs(lines, [(0, 30)])
+    assert total == len(jobs) > 1 and failed == 0
+    assert text == "\n".join(
+        f"[{join_ocr_lines(lines[start:end]).upper()}]" for start, end, _, _ in jobs
+    )
+    assert len(fake.calls) == total
+
+
+def test_failed_chunks_keep_their_ocr_text(cleaner):
+    lines = [ocr_line(i, LOW, paragraph=i // 3, width=100) for i in range(30)]
+    lines.insert(15, ocr_line(99, HIGH, paragraph=99, width=100))
+    cleaner(fail_containing=("p0 line 0 ",), raise_containing=("p9 line 29 ",))
+    text, total, failed = clean_ocr_lines(lines)
+
+    assert failed == 2
+    output = text.split("\n")
+    assert len(output) == len(lines)
+    assert output[0] == lines[0].text  # Returned None
+    assert output[-1] == lines[-1].text  # Raised
+    assert output[15] == lines[15].text  # Confident line between the spans
+    assert output[16].startswith("[")
@@ -0,0 +1,79 @@
+# backend/tests/test_tracing.py
+
+import contextvars
+import threading
+
+from tracing import Trace, to_otlp
+
+
+def parents(trace):
+    names = {span["spanId"]: span["name"] for span in trace.spans}
+    return {span["name"]: names.get(span["parentSpanId"]) for span in trace.spans}
+
+
+def test_nested_spans():
+    trace = Trace("handle_message")
+    outer = trace.start_span("detect_text")
+    inner = trace.start_span("ocr")
+    trace.add_span("queue_wait", 0.01)
+    trace.end_span(inner)
+    trace.end_span(outer)
+    after = trace.start_span("emit")
+    trace.end_span(after)
+
+    assert parents(trace) == {
+        "handle_message": None,
+        "detect_text": "handle_message",
+        "ocr": "detect_text",
+        "queue_wait": "ocr",
+        "emit": "handle_message",
+    }
+
+
+def test_concurrent_branches_keep_their_own_parents():
+    trace = Trace("handle_message")
+    cleanup = trace.start_span("text_cleanup")
+    both_open = threading.Barrier(2)
+
+    def clean_chunk(index):
+        span = trace.start_span(f"chunk{index}")
+        both_open.wait(timeout=5)  # Both chunk spans are open at the same time
+        trace.add_span(f"upstream{index}", 0.001)
+        trace.end_span(span)
+
+    workers = [
+        threading.Thread(target=contextvars.copy_context().run, args=(clean_chunk, index))
+        for index in range(2)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    trace.end_span(cleanup)
+
+    assert parents(trace) == {
+        "handle_message": None,
+        "text_cleanup": "handle_message",
+        "chunk0": "text_cleanup",
+        "chunk1": "text_cleanup",
+        "upstream0": "chunk0",
+        "upstream1": "chunk1",
+    }
+
+
+def test_spans_of_another_trace_are_not_parents():
+    first = Trace("first")
+    open_span = first.start_span("left_open")
+    second = Trace("second")
+    span = second.start_span("stage")
+    assert span["parentSpanId"] == second.root["spanId"]
+    second.end_span(span)
+    first.end_span(open_span)
+
+
+def test_otlp_export():
+    trace = Trace("handle_message", {"client_sid": "abc"})
+    trace.end_span(trace.root)
+    span = to_otlp([trace])["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert span["traceId"] == trace.trace_id
+    assert span["attributes"] == [{"key": "client_sid", "value": {"stringValue": "abc"}}]
@@ -0,0 +1,104 @@
+# backend/tests/test_upstream_fallbacks.py
+# Ollama and Roboflow calls against the local stubs: a healthy upstream is used, an
+# outage returns the fallback value, and an open breaker answers without a request.
+# Needs the full model stack, since ollama.py and detect_currency.py import model_config.
+
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("model_config")
+
+import ollama
+from bench.stubs import OllamaStub, RoboflowStub
+from circuit_breaker import CircuitBreaker
+from model_config import CIRCUIT_BREAKER_SETTINGS
+from operations import detect_currency as currency_ops
+from request_context import RequestContext, begin_request, end_request
+from text_cleaning_cache import TextCleaningCache
+
+FRAME = np.full((120, 160, 3), 128, dtype=np.uint8)
+
+
+def fresh_breaker(name):
+    return CircuitBreaker(name, **CIRCUIT_BREAKER_SETTINGS[name])
+
+
+@pytest.fixture
+def roboflow(monkeypatch):
+    stub = RoboflowStub(currency="50 AED", confidence=0.95).start()
+    monkeypatch.setattr(currency_ops, "ROBOFLOW_MODEL_ENDPOINT", stub.endpoint)
+    monkeypatch.setattr(currency_ops, "roboflow_breaker", fresh_breaker("roboflow"))
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture
+def ollama_stub(monkeypatch):
+    stub = OllamaStub(feature="text_detection").start()
+    monkeypatch.setattr(ollama, "OLLAMA_API_URL", stub.generate_url)
+    monkeypatch.setattr(ollama, "ollama_breaker", fresh_breaker("ollama"))
+    monkeypatch.setattr(ollama, "text_cleaning_cache", TextCleaningCache("", 16, 16))
+    yield stub
+    stub.stop()
+
+
+def test_roboflow_result(roboflow):
+    result = currency_ops.detect_currency_roboflow(FRAME)
+    assert result == {"status": "ok", "currency": "50 AED", "confidence": 0.95}
+
+
+def test_roboflow_low_confidence_is_no_currency(roboflow):
+    roboflow.confidence = 0.1
+    assert currency_ops.detect_currency_roboflow(FRAME)["status"] == "none"
+
+
+def test_roboflow_outage_fails_fast(roboflow):
+    roboflow.fail = True
+    min_calls = CIRCUIT_BREAKER_SETTINGS["roboflow"]["min_calls"]
+    for _ in range(min_calls):
+        assert currency_ops.detect_currency_roboflow(FRAME)["status"] == "error"
+    served = roboflow.requests_served
+
+    result = currency_ops.detect_currency_roboflow(FRAME)
+    assert result == {"status": "error", "message": "Currency detection unavailable"}
+    assert roboflow.requests_served == served
+
+
+def test_short_client_deadlines_keep_the_breaker_closed(ollama_stub):
+    ollama_stub.latency = 1.0
+    min_calls = CIRCUIT_BREAKER_SETTINGS["ollama"]["min_calls"]
+    for _ in range(min_calls + 1):
+        token = begin_request(RequestContext(deadline=time.time() + 0.7))
+        try:
+            assert ollama.get_llm_feature_choice(FRAME, "test") is None
+        finally:
+            end_request(token)
+    assert ollama.ollama_breaker.snapshot()["state"] == "closed"
+
+
+def test_ollama_feature_choice(ollama_stub):
+    assert ollama.get_llm_feature_choice(FRAME, "test") == "text_detection"
+    assert ollama_stub.last_payload["system"] == ollama.FEATURE_CHOICE_PROMPT
+    assert ollama_stub.last_payload["keep_alive"] == ollama.OLLAMA_KEEP_ALIVE
+
+
+def test_ollama_outage_falls_back(ollama_stub):
+    ollama_stub.fail = True
+    min_calls = CIRCUIT_BREAKER_SETTINGS["ollama"]["min_calls"]
+    for _ in range(min_calls):
+        assert ollama.get_llm_feature_choice(FRAME, "test") is None
+    served = ollama_stub.requests_served
+
+    # None sends the caller to local routing / the raw OCR text, without a request
+    assert ollama.get_llm_feature_choice(FRAME, "test") is None
+    assert ollama.clean_text_with_llm("Hel1o w0rld", "test") is None
+    assert ollama_stub.requests_served == served
+
+
+def test_text_cleaning_and_cache(ollama_stub):
+    assert ollama.clean_text_with_llm("Hel1o w0rld", "test") == "Hel1o w0rld"
+    served = ollama_stub.requests_served
+    assert ollama.clean_text_with_llm("Hel1o w0rld", "test") == "Hel1o w0rld"
+    assert ollama_stub.requests_served == served
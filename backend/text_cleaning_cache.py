@@ -0,0 +1,126 @@
+# backend/text_cleaning_cache.py
+# Cache of LLM-cleaned OCR text. Users rescan the same label, menu or sign all the
+# time, and identical OCR output should not cost seconds of generation again.
+# Two tiers: an in-process LRU, and a SQLite file (WAL mode) that survives restarts
+# and is shared by every worker process on the host. Keys hash the normalized OCR
+# text together with the cleaning model and prompt, so changing either one simply
+# stops matching the old entries.
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_ocr_text(text):
+    """Unicode-normalized, whitespace-collapsed text (what the cache key is built from)."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cleaning_cache_key(text, model, prompt):
+    digest = hashlib.sha256()
+    for part in (normalize_ocr_text(text), model, prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class TextCleaningCache:
+    def __init__(self, path, memory_entries=1024, max_rows=100000):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_rows = max_rows
+        self._memory = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._local = threading.local()  # One SQLite connection per thread
+        self._writes = 0
+        self._disk_ok = True
+        if path:
+            try:
+                self._init_db()
+            except sqlite3.Error as e:
+                self._disk_ok = False
+                logger.error(f"Text cleaning cache at '{path}' unavailable, memory only: {e}")
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")  # Readers don't block the writer
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _init_db(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cleaned_text ("
+                " key TEXT PRIMARY KEY, cleaned TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS cleaned_text_created_at ON cleaned_text (created_at)"
+            )
+
+    def _remember(self, key, cleaned):
+        with self._memory_lock:
+            self._memory[key] = cleaned
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        with self._memory_lock:
+            cleaned = self._memory.get(key)
+            if cleaned is not None:
+                self._memory.move_to_end(key)
+        record_cache_lookup("text_cleaning_memory", cleaned is not None)
+        if cleaned is not None or not (self.path and self._disk_ok):
+            return cleaned
+
+        try:
+            row = self._connection().execute(
+                "SELECT cleaned FROM cleaned_text WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Text cleaning cache read failed: {e}")
+            return None
+        record_cache_lookup("text_cleaning_disk", row is not None)
+        if row is None:
+            return None
+        self._remember(key, row[0])
+        return row[0]
+
+    def put(self, key, cleaned):
+        self._remember(key, cleaned)
+        if not (self.path and self._disk_ok):
+            return
+        try:
+            with self._connection() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO cleaned_text (key, cleaned, created_at) VALUES (?, ?, ?)",
+                    (key, cleaned, time.time()),
+                )
+                self._writes += 1
+                if self._writes % 1000 == 0:
+                    self._prune(connection)
+        except sqlite3.Error as e:
+            logger.warning(f"Text cleaning cache write failed: {e}")
+
+    def _prune(self, connection):
+        """Keeps the newest `max_rows` entries."""
+        connection.execute(
+            "DELETE FROM cleaned_text WHERE key IN ("
+            " SELECT key FROM cleaned_text ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_rows,),
+        )
@@ -0,0 +1,142 @@
+# backend/text_cleanup.py
+# Confidence-gated LLM cleanup of OCR output. Tesseract reports a confidence for
+# every word; lines it read confidently are kept verbatim, and only runs of
+# low-confidence lines ("spans") are sent to the cleaning model, each with its
+# neighbouring lines as read-only context. The cleaned spans are spliced back in
+# place, so a mostly clean page costs one short LLM call (or none) instead of a
+# full rewrite, and the model cannot alter text that was already right.
+# Long spans are split into paragraph-aligned chunks that are cleaned concurrently
+# (up to OLLAMA_CLEANING_CONCURRENCY requests across all clients), so a full page
+# takes about as long as its slowest chunk and one timeout only loses that chunk.
+
+import concurrent.futures
+import contextvars
+
+from ollama import *
+from operations.detect_text import join_ocr_lines
+
+# Shared by every request: the bound is on what the Ollama server runs in parallel
+_cleaning_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=max(1, OLLAMA_CLEANING_CONCURRENCY), thread_name_prefix="ollama-clean"
+)
+
+
+def low_confidence_spans(lines, min_confidence=OCR_CLEANUP_MIN_CONFIDENCE):
+    """[(start, end)] index ranges (end exclusive) of consecutive lines below min_confidence."""
+    spans = []
+    start = None
+    for i, line in enumerate(lines):
+        if line.confidence < min_confidence:
+            if start is None:
+                start = i
+        elif start is not None:
+            spans.append((start, i))
+            start = None
+    if start is not None:
+        spans.append((start, len(lines)))
+    return spans
+
+
+def chunk_ranges(lines, start, end, max_chars=OCR_CLEANUP_CHUNK_CHARS):
+    """
+    Splits lines[start:end] into [(start, end)] chunks of about max_chars, cutting
+    at the last paragraph boundary that fits, else at a line boundary.
+    """
+    ranges = []
+    chunk_start = start
+    size = 0
+    last_break = None  # Start of the latest paragraph inside the current chunk
+    for i in range(start, end):
+        if i > chunk_start and lines[i].paragraph != lines[i - 1].paragraph:
+            last_break = i
+        length = len(lines[i].text) + 1
+        if i > chunk_start and size + length > max_chars:
+            cut = last_break if last_break is not None else i
+            ranges.append((chunk_start, cut))
+            size = sum(len(line.text) + 1 for line in lines[cut:i])
+            chunk_start = cut
+            last_break = None
+        size += length
+    ranges.append((chunk_start, end))
+    return ranges
+
+
+def _cleaning_jobs(lines, spans):
+    """
+    (start, end, context_before, context_after) per chunk. Only the outer edges of a
+    span get context: lines inside a span are low-confidence themselves.
+    """
+    jobs = []
+    for span_start, span_end in spans:
+        for start, end in chunk_ranges(lines, span_start, span_end):
+            context_before = context_after = ""
+            if start == span_start:
+                context_before = join_ocr_lines(
+                    lines[max(0, start - OCR_CLEANUP_CONTEXT_LINES):start]
+                )
+            if end == span_end:
+                context_after = join_ocr_lines(lines[end:end + OCR_CLEANUP_CONTEXT_LINES])
+            jobs.append((start, end, context_before, context_after))
+    return jobs
+
+
+def clean_ocr_lines(lines, client_sid="Unknown"):
+    """
+    Cleans [OcrLine] from detect_text_lines. Returns (text, chunks_total,
+    chunks_failed); a failed chunk keeps its original OCR text.
+    """
+    spans = low_confidence_spans(lines)
+    if not spans:
+        logger.info(
+            f"[{client_sid}] All {len(lines)} OCR lines above confidence {OCR_CLEANUP_MIN_CONFIDENCE}, skipping LLM cleaning."
+        )
+        return join_ocr_lines(lines), 0, 0
+
+    jobs = _cleaning_jobs(lines, spans)
+    logger.info(
+        f"[{client_sid}] Cleaning {sum(end - start for start, end in spans)}/{len(lines)} "
+        f"low-confidence OCR lines in {len(jobs)} chunk(s)."
+    )
+    if len(jobs) == 1:
+        start, end, context_before, context_after = jobs[0]
+        cleaned_chunks = [
+            clean_text_with_llm(
+                join_ocr_lines(lines[start:end]),
+                client_sid,
+                context_before=context_before,
+                context_after=context_after,
+            )
+        ]
+    else:
+        futures = [
+            _cleaning_executor.submit(
+                contextvars.copy_context().run,  # Keep the request deadline and metric labels
+                clean_text_with_llm,
+                join_ocr_lines(lines[start:end]),
+                client_sid,
+                context_before,
+                context_after,
+            )
+            for start, end, context_before, context_after in jobs
+        ]
+        cleaned_chunks = []
+        for future in futures:
+            try:
+                cleaned_chunks.append(future.result())
+            except Exception as e:
+                logger.error(f"[{client_sid}] Text cleaning chunk failed: {e}", exc_info=True)
+                cleaned_chunks.append(None)
+
+    pieces = []
+    failed = 0
+    position = 0
+    for (start, end, _, _), cleaned in zip(jobs, cleaned_chunks):
+        pieces.append(join_ocr_lines(lines[position:start]))
+        if cleaned:
+            pieces.append(cleaned)
+        else:
+            failed += 1
+            pieces.append(join_ocr_lines(lines[start:end]))
+        position = end
+    pieces.append(join_ocr_lines(lines[position:]))
+    return "\n".join(piece for piece in pieces if piece), len(jobs), failed
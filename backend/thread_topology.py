@@ -0,0 +1,205 @@
+# backend/thread_topology.py
+# CPU thread budgets for the engines sharing this process. Left alone, every
+# scheduler worker running YOLO or ResNet starts a full PyTorch/OpenMP team, OpenCV
+# keeps its own pool and each Tesseract subprocess spawns one OpenMP thread per core,
+# so N concurrent operations run ~N x cores threads on `cores` cores and p99 latency
+# explodes. Here the cores are split between the SCHEDULER_WORKERS workers: each
+# operation gets cores // workers threads in every engine, optionally pinned to its
+# own cores. The trade-off is single-request latency against throughput: one worker
+# per core maximizes concurrent operations, but each inference then runs on a single
+# thread and an idle server answers one request several times slower than with the
+# whole machine. The default of cores // 2 workers keeps two threads per operation
+# (like batch_process.py); set SCHEDULER_WORKERS to move along that curve. This module is imported by model_config.py *before* torch, so the
+# OpenMP/MKL environment limits are in place when the libraries initialize.
+#
+# Environment: SCHEDULER_WORKERS, TORCH_THREADS, OPENCV_THREADS, OMP_THREAD_LIMIT
+# (Tesseract), PIN_WORKER_THREADS=true to pin each scheduler worker to its cores.
+
+import logging
+import os
+import re
+import threading
+import time
+
+from metrics import Gauge, register, register_collector
+
+logger = logging.getLogger(__name__)
+
+THREAD_BUDGET = register(
+    Gauge(
+        "visionaid_thread_budget",
+        "Threads each operation may use, by engine.",
+        ("engine",),
+    )
+)
+CPU_UTILIZATION = register(
+    Gauge(
+        "visionaid_cpu_utilization_ratio",
+        "Share of the available cores used since the previous scrape, by thread pool.",
+        ("pool",),
+    )
+)
+PROCESS_THREADS = register(
+    Gauge("visionaid_process_threads", "OS threads in this process.")
+)
+
+_POOL_SUFFIX = re.compile(r"[-_]\d+(_\d+)?$")  # "visionaid-cpu-3" -> "visionaid-cpu"
+
+
+def available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _env_int(name):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+def _thread_cpu_seconds():
+    """{native thread id: CPU seconds} from /proc (Linux); {} elsewhere."""
+    ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+    times = {}
+    try:
+        task_ids = os.listdir("/proc/self/task")
+    except OSError:
+        return times
+    for task_id in task_ids:
+        try:
+            with open(f"/proc/self/task/{task_id}/stat") as stat_file:
+                stat = stat_file.read()
+        except OSError:
+            continue  # Thread exited
+        fields = stat[stat.rindex(")") + 2:].split()  # The name field may contain spaces
+        times[int(task_id)] = (int(fields[11]) + int(fields[12])) / ticks  # utime + stime
+    return times
+
+
+class ThreadTopology:
+    def __init__(self, cores, workers, torch_threads=None, opencv_threads=None,
+                 ocr_threads=None, pin_workers=False):
+        self.cores = list(cores)
+        self.workers = max(1, workers)
+        per_worker = max(1, len(self.cores) // self.workers)
+        self.budgets = {
+            "torch": torch_threads or per_worker,
+            "opencv": opencv_threads or per_worker,
+            "tesseract": ocr_threads or per_worker,
+        }
+        self.pin_workers = pin_workers and hasattr(os, "sched_setaffinity")
+        self._sample_lock = threading.Lock()
+        self._last_sample = None  # (monotonic, process CPU seconds, {pool: CPU seconds})
+
+    @classmethod
+    def from_env(cls):
+        cores = available_cores()
+        workers = (
+            _env_int("SCHEDULER_WORKERS")
+            or _env_int("ASYNC_CPU_WORKERS")
+            or max(1, len(cores) // 2)
+        )
+        return cls(
+            cores,
+            workers,
+            torch_threads=_env_int("TORCH_THREADS"),
+            opencv_threads=_env_int("OPENCV_THREADS"),
+            ocr_threads=_env_int("OMP_THREAD_LIMIT"),
+            pin_workers=os.environ.get("PIN_WORKER_THREADS", "False").lower() in ("true", "1", "t"),
+        )
+
+    def export_env(self):
+        """OpenMP/MKL limits; only effective before torch is imported. Explicit env wins."""
+        os.environ.setdefault("OMP_NUM_THREADS", str(self.budgets["torch"]))
+        os.environ.setdefault("MKL_NUM_THREADS", str(self.budgets["torch"]))
+        # Read by every Tesseract subprocess pytesseract starts
+        os.environ.setdefault("OMP_THREAD_LIMIT", str(self.budgets["tesseract"]))
+
+    def apply(self):
+        """Process-wide limits, once torch and OpenCV are loaded."""
+        import cv2
+        import torch
+
+        torch.set_num_threads(self.budgets["torch"])
+        try:
+            torch.set_num_interop_threads(1)  # Concurrency comes from the scheduler workers
+        except RuntimeError:
+            pass  # Only allowed before the first parallel op; already set in that case
+        cv2.setNumThreads(self.budgets["opencv"])
+        for engine, budget in self.budgets.items():
+            THREAD_BUDGET.set(budget, engine=engine)
+        logger.info(
+            f"Thread topology: {len(self.cores)} cores, {self.workers} scheduler workers, "
+            f"budgets {self.budgets}, pinning {'on' if self.pin_workers else 'off'}."
+        )
+
+    def worker_cores(self, index):
+        """The cores scheduler worker `index` is pinned to (wraps if workers > cores)."""
+        per_worker = max(1, len(self.cores) // self.workers)
+        start = (index * per_worker) % len(self.cores)
+        return self.cores[start:start + per_worker]
+
+    def init_worker(self, index):
+        """Scheduler worker initializer: OpenMP team size is per calling thread."""
+        import torch
+
+        torch.set_num_threads(self.budgets["torch"])
+        if self.pin_workers:
+            cores = self.worker_cores(index)
+            try:
+                os.sched_setaffinity(0, cores)  # 0 = the calling thread on Linux
+            except OSError as e:
+                logger.warning(f"Could not pin scheduler worker {index} to cores {cores}: {e}")
+
+    def _pool_cpu_seconds(self):
+        names = {thread.native_id: thread.name for thread in threading.enumerate()}
+        pools = {}
+        thread_times = _thread_cpu_seconds()
+        for thread_id, seconds in thread_times.items():
+            name = names.get(thread_id)
+            # Threads Python doesn't know about belong to torch/OpenMP/OpenCV pools
+            pool = _POOL_SUFFIX.sub("", name) if name else "native"
+            pools[pool] = pools.get(pool, 0.0) + seconds
+        return pools, len(thread_times)
+
+    def sample(self):
+        """
+        Utilization since the previous sample as a share of the available cores,
+        per thread pool and in total. The first call only sets the baseline.
+        """
+        now = time.monotonic()
+        process_seconds = time.process_time()
+        pools, thread_count = self._pool_cpu_seconds()
+        with self._sample_lock:
+            last = self._last_sample
+            self._last_sample = (now, process_seconds, pools)
+        utilization = {}
+        if last is not None and now > last[0]:
+            capacity = (now - last[0]) * len(self.cores)
+            utilization["total"] = (process_seconds - last[1]) / capacity
+            for pool, seconds in pools.items():
+                # Exited threads take their CPU time with them, so clamp at 0
+                utilization[pool] = max(0.0, seconds - last[2].get(pool, 0.0)) / capacity
+        return utilization, thread_count
+
+    def report(self):
+        utilization, thread_count = self.sample()
+        return {
+            "cores": len(self.cores),
+            "scheduler_workers": self.workers,
+            "budgets": dict(self.budgets),
+            "pinned": self.pin_workers,
+            "threads": thread_count or threading.active_count(),
+            "utilization": {pool: round(value, 4) for pool, value in utilization.items()},
+        }
+
+    def collect_metrics(self):
+        utilization, thread_count = self.sample()
+        for pool, value in utilization.items():
+            CPU_UTILIZATION.set(value, pool=pool)
+        PROCESS_THREADS.set(thread_count or threading.active_count())
+
+
+thread_topology = ThreadTopology.from_env()
+thread_topology.export_env()
+register_collector(thread_topology.collect_metrics)
@@ -0,0 +1,200 @@
+# backend/tracing.py
+# Sampled per-request span traces. Spans come from metrics.observe_stage, so every
+# instrumented stage (decode, operations, upstream calls, emit) shows up in a trace.
+# Finished traces are written as OTLP/JSON (one ExportTraceServiceRequest per line)
+# to a local file and/or POSTed to an OpenTelemetry collector's /v1/traces endpoint.
+# With a sample rate of 0 (the default) no trace objects are created at all.
+
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+_settings = {
+    "sample_rate": 0.0,
+    "output_path": None,
+    "otlp_endpoint": None,
+    "service_name": "visionaid-backend",
+}
+_export_queue = queue.Queue(maxsize=1000)
+_exporter_thread = None
+_exporter_lock = threading.Lock()
+# Spans open in the current context, innermost last. A contextvar rather than a list on
+# the Trace: work fanned out under copy_context() (e.g. text_cleanup.py's chunk workers)
+# shares the trace, and each branch must parent its spans to its own open span.
+_open_spans = contextvars.ContextVar("visionaid_open_spans", default=())
+
+
+class Trace:
+    def __init__(self, name, attributes=None):
+        self.trace_id = os.urandom(16).hex()
+        self.spans = []
+        self._lock = threading.Lock()
+        self.root = self._new_span(name, attributes, "")
+        with self._lock:
+            self.spans.append(self.root)
+
+    def _parent_id(self):
+        """The innermost span of this trace open in the current context, else the root."""
+        for span in reversed(_open_spans.get()):
+            if span["traceId"] == self.trace_id:
+                return span["spanId"]
+        return self.root["spanId"] if self.root is not None else ""
+
+    def _new_span(self, name, attributes, parent_id, start_ns=None, end_ns=None):
+        return {
+            "traceId": self.trace_id,
+            "spanId": os.urandom(8).hex(),
+            "parentSpanId": parent_id,
+            "name": name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": start_ns if start_ns is not None else time.time_ns(),
+            "endTimeUnixNano": end_ns,
+            "attributes": dict(attributes or {}),
+        }
+
+    def start_span(self, name, attributes=None):
+        """Opens a child of the current context's open span. Close it with end_span in the same context."""
+        span = self._new_span(name, attributes, self._parent_id())
+        with self._lock:
+            self.spans.append(span)
+        _open_spans.set(_open_spans.get() + (span,))
+        return span
+
+    def add_span(self, name, seconds, attributes=None):
+        """Records an already finished span that ended now and lasted `seconds`."""
+        end_ns = time.time_ns()
+        span = self._new_span(
+            name, attributes, self._parent_id(), end_ns - int(seconds * 1e9), end_ns
+        )
+        with self._lock:
+            self.spans.append(span)
+
+    def end_span(self, span):
+        span["endTimeUnixNano"] = time.time_ns()
+        open_spans = _open_spans.get()
+        if span in open_spans:
+            _open_spans.set(tuple(open_span for open_span in open_spans if open_span is not span))
+
+
+def configure_tracing(sample_rate=0.0, output_path=None, otlp_endpoint=None, service_name=None):
+    _settings["sample_rate"] = max(0.0, min(1.0, float(sample_rate)))
+    _settings["output_path"] = output_path or None
+    _settings["otlp_endpoint"] = otlp_endpoint or None
+    if service_name:
+        _settings["service_name"] = service_name
+    if _settings["sample_rate"] > 0 and not (output_path or otlp_endpoint):
+        logger.warning("Trace sampling enabled but no output path or OTLP endpoint set. Traces are dropped.")
+    elif _settings["sample_rate"] > 0:
+        logger.info(
+            f"Tracing {_settings['sample_rate']:.1%} of requests to {output_path or ''} {otlp_endpoint or ''}".strip()
+        )
+
+
+def set_sample_rate(sample_rate):
+    _settings["sample_rate"] = max(0.0, min(1.0, float(sample_rate)))
+
+
+def get_sample_rate():
+    return _settings["sample_rate"]
+
+
+def maybe_start_trace(name, attributes=None):
+    """Returns a new Trace for a sampled request, or None (the common, zero-cost case)."""
+    rate = _settings["sample_rate"]
+    if rate <= 0.0 or random.random() >= rate:
+        return None
+    return Trace(name, attributes)
+
+
+def finish_trace(trace, attributes=None):
+    if trace is None:
+        return
+    if attributes:
+        trace.root["attributes"].update(attributes)
+    trace.end_span(trace.root)
+    _ensure_exporter()
+    try:
+        _export_queue.put_nowait(trace)
+    except queue.Full:
+        logger.debug("Trace export queue full. Dropping trace.")
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(traces):
+    spans = []
+    for trace in traces:
+        for span in trace.spans:
+            otlp_span = dict(span)
+            otlp_span["startTimeUnixNano"] = str(span["startTimeUnixNano"])
+            otlp_span["endTimeUnixNano"] = str(span["endTimeUnixNano"] or span["startTimeUnixNano"])
+            otlp_span["attributes"] = [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in span["attributes"].items()
+            ]
+            spans.append(otlp_span)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": _settings["service_name"]}}
+                    ]
+                },
+                "scopeSpans": [{"scope": {"name": "visionaid.tracing"}, "spans": spans}],
+            }
+        ]
+    }
+
+
+def _export_loop():
+    while True:
+        batch = [_export_queue.get()]
+        while len(batch) < 50:
+            try:
+                batch.append(_export_queue.get_nowait())
+            except queue.Empty:
+                break
+        document = to_otlp(batch)
+        output_path = _settings["output_path"]
+        if output_path:
+            try:
+                with open(output_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(document) + "\n")
+            except OSError as e:
+                logger.error(f"Failed to write traces to {output_path}: {e}")
+        otlp_endpoint = _settings["otlp_endpoint"]
+        if otlp_endpoint:
+            try:
+                requests.post(otlp_endpoint, json=document, timeout=5).raise_for_status()
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Failed to export traces to {otlp_endpoint}: {e}")
+
+
+def _ensure_exporter():
+    global _exporter_thread
+    if _exporter_thread is not None:
+        return
+    with _exporter_lock:
+        if _exporter_thread is None:
+            _exporter_thread = threading.Thread(
+                target=_export_loop, name="trace-exporter", daemon=True
+            )
+            _exporter_thread.start()
@@ -0,0 +1,101 @@
+# backend/user_auth.py
+# Bearer tokens for the per-user routes and for binding a socket to a user's settings.
+# POST /login checks an email and password against db.User and returns a signed,
+# expiring token that carries the email (itsdangerous, which ships with Flask).
+# /get_user_info and /update_customization act only on the token's email, and a
+# socket binds to a user's settings only with ?token=... on its URL. Everything here
+# is disabled unless VISIONAID_AUTH_SECRET is set.
+
+import hmac
+import logging
+
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from werkzeug.security import check_password_hash
+
+from db import User, ensure_schema
+from user_settings import normalize_email
+
+logger = logging.getLogger(__name__)
+
+_HASH_PREFIXES = ("pbkdf2:", "scrypt:")  # werkzeug.security.generate_password_hash
+
+_app = None
+_serializer = None
+_max_age = None
+
+
+def configure_user_auth(app, secret, max_age_seconds):
+    global _app, _serializer, _max_age
+    _app = app
+    _serializer = URLSafeTimedSerializer(secret, salt="visionaid-user-token") if secret else None
+    _max_age = max_age_seconds
+    if _serializer is None:
+        logger.warning("VISIONAID_AUTH_SECRET not set. Login and per-user routes are disabled.")
+
+
+def auth_enabled():
+    return _serializer is not None
+
+
+def _password_matches(stored, password):
+    """Werkzeug password hashes, or plaintext rows from older signups (constant-time compare)."""
+    if not stored or not isinstance(password, str):
+        return False
+    if stored.startswith(_HASH_PREFIXES):
+        return check_password_hash(stored, password)
+    return hmac.compare_digest(stored.encode("utf-8"), password.encode("utf-8"))
+
+
+def authenticate_user(email, password):
+    """The normalized email if the password is right, else None. DB errors propagate."""
+    email = normalize_email(email)
+    if not email:
+        return None
+    ensure_schema()
+    with _app.app_context():
+        user = User.query.filter(User.email == email).first()
+        if user is None or not _password_matches(user.password, password):
+            return None
+    return email
+
+
+def issue_user_token(email):
+    return _serializer.dumps(normalize_email(email))
+
+
+def verify_user_token(token):
+    """The token's email, or None if auth is disabled or the token is invalid or expired."""
+    if _serializer is None or not isinstance(token, str) or not token:
+        return None
+    try:
+        email = _serializer.loads(token, max_age=_max_age)
+    except SignatureExpired:
+        logger.info("Rejected an expired user token.")
+        return None
+    except BadSignature:
+        logger.warning("Rejected a user token with a bad signature.")
+        return None
+    return email if isinstance(email, str) else None
+
+
+def bearer_token(authorization_header):
+    """The token of an "Authorization: Bearer <token>" header, or None."""
+    scheme, _, token = (authorization_header or "").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    return token.strip()
+
+
+def token_email(token, claimed_email=None):
+    """
+    The email a request may act for: the token's, provided any email the client
+    also sent is the same one. None if the token is missing or invalid, or the
+    emails differ.
+    """
+    email = verify_user_token(token)
+    if email is None:
+        return None
+    if claimed_email and normalize_email(claimed_email) != email:
+        logger.warning("Rejected a user token sent with another user's email.")
+        return None
+    return email
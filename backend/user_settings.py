@@ -0,0 +1,216 @@
+# backend/user_settings.py
+# Per-user settings from db.User.customization, cached in-process so the socket
+# handlers never touch MySQL per frame. A client identifies itself on connect
+# (?token=... from POST /login on the Socket.IO URL, see user_auth.py); its settings
+# are loaded once through the cache and bound to the sid, and handle_message reads
+# them from there.
+#
+# customization is a 255-char "0"/"1" string. All-zero means defaults, so every
+# flag below is an opt-in. Bits beyond the known flags are kept untouched on write.
+#   bit 0: auto_ocr_language     - OCR script auto-detection when no language is sent
+#   bit 1: skip_text_cleaning    - return raw OCR text, no LLM cleanup (faster)
+#   bit 2: compact_results       - compact binary detection results (result_encoding.py)
+#   bit 3: prefer_local_routing  - SuperVision routes on-device instead of via Ollama
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from db import User, db, ensure_schema
+from metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+CUSTOMIZATION_LENGTH = 255
+DEFAULT_CUSTOMIZATION = "0" * CUSTOMIZATION_LENGTH
+
+
+class UserSettings:
+    """Typed view of a customization bit-string. Decode once, read many."""
+
+    FLAGS = (
+        "auto_ocr_language",
+        "skip_text_cleaning",
+        "compact_results",
+        "prefer_local_routing",
+    )
+    __slots__ = FLAGS + ("bits",)
+
+    def __init__(self, bits=DEFAULT_CUSTOMIZATION):
+        self.bits = bits
+        for index, flag in enumerate(self.FLAGS):
+            setattr(self, flag, len(bits) > index and bits[index] == "1")
+
+    def to_dict(self):
+        return {flag: getattr(self, flag) for flag in self.FLAGS}
+
+
+DEFAULT_USER_SETTINGS = UserSettings()
+
+
+def normalize_customization(bits):
+    """Returns `bits` padded to CUSTOMIZATION_LENGTH, or None if it is not a 0/1 string."""
+    if not isinstance(bits, str) or len(bits) > CUSTOMIZATION_LENGTH:
+        return None
+    if bits.strip("01"):
+        return None
+    return bits.ljust(CUSTOMIZATION_LENGTH, "0")
+
+
+class UserRecord:
+    """Cached user row (without the password) plus its decoded settings."""
+
+    __slots__ = ("id", "name", "email", "customization", "settings")
+
+    def __init__(self, user_id, name, email, customization):
+        self.id = user_id
+        self.name = name
+        self.email = email
+        self.customization = customization or DEFAULT_CUSTOMIZATION
+        self.settings = UserSettings(self.customization)
+
+
+class UserSettingsCache:
+    """
+    Bounded LRU keyed by email. Entries expire `ttl_seconds` after load so edits
+    made outside this process are picked up; writes through this process update
+    the DB first and then the cache. Unknown emails are cached too (as None).
+    """
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # email -> (loaded_at, UserRecord or None)
+        self._lock = threading.Lock()
+
+    def get(self, email):
+        """Returns (found, record). `found` is False on a miss or an expired entry."""
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None:
+                return False, None
+            loaded_at, record = entry
+            if time.monotonic() - loaded_at > self.ttl_seconds:
+                del self._entries[email]
+                return False, None
+            self._entries.move_to_end(email)
+            return True, record
+
+    def put(self, email, record):
+        with self._lock:
+            self._entries[email] = (time.monotonic(), record)
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, email):
+        with self._lock:
+            self._entries.pop(email, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+_app = None
+_cache = None
+_session_settings = {}  # sid -> (email, UserSettings)
+_session_lock = threading.Lock()
+
+
+def configure_user_settings(app, max_entries, ttl_seconds):
+    global _app, _cache
+    _app = app
+    _cache = UserSettingsCache(max_entries, ttl_seconds)
+
+
+def normalize_email(email):
+    # Lookups compare the column as-is so MySQL can use the unique index on users.email;
+    # its default collation is case-insensitive, so the lowercased key still matches.
+    return email.strip().lower() if isinstance(email, str) else ""
+
+
+def _query_user(email):
+    ensure_schema()
+    with _app.app_context():
+        user = User.query.filter(User.email == email).first()
+        if user is None:
+            return None
+        return UserRecord(user.id, user.name, user.email, user.customization)
+
+
+def get_user_record(email):
+    """Cached lookup. Returns a UserRecord, or None for an unknown email. DB errors propagate."""
+    email = normalize_email(email)
+    if not email:
+        return None
+    found, record = _cache.get(email)
+    record_cache_lookup("user_settings", found)
+    if found:
+        return record
+    record = _query_user(email)
+    _cache.put(email, record)
+    return record
+
+
+def update_user_customization(email, bits):
+    """
+    Write-through update. Returns the updated UserRecord, or None if there is no
+    such user. `bits` must already be normalized (see normalize_customization).
+    """
+    email = normalize_email(email)
+    ensure_schema()
+    with _app.app_context():
+        user = User.query.filter(User.email == email).first()
+        if user is None:
+            _cache.put(email, None)
+            return None
+        user.customization = bits
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            _cache.invalidate(email)
+            raise
+        record = UserRecord(user.id, user.name, user.email, bits)
+    _cache.put(email, record)
+    # Connected sessions of this user see the new settings on their next frame
+    with _session_lock:
+        for sid, bound in list(_session_settings.items()):
+            if bound[0] == email:
+                _session_settings[sid] = (email, record.settings)
+    return record
+
+
+def bind_session_user(client_sid, email):
+    """Loads `email`'s settings and binds them to the socket. Returns the settings, or None."""
+    try:
+        record = get_user_record(email)
+    except Exception as e:
+        logger.error(f"[{client_sid}] Failed to load user settings: {e}", exc_info=False)
+        return None
+    if record is None:
+        logger.warning(f"[{client_sid}] No user found for settings lookup.")
+        return None
+    with _session_lock:
+        _session_settings[client_sid] = (normalize_email(email), record.settings)
+    logger.info(f"[{client_sid}] User settings loaded: {record.settings.to_dict()}")
+    return record.settings
+
+
+def get_session_email(client_sid):
+    with _session_lock:
+        bound = _session_settings.get(client_sid)
+    return bound[0] if bound else None
+
+
+def get_session_settings(client_sid):
+    with _session_lock:
+        bound = _session_settings.get(client_sid)
+    return bound[1] if bound else DEFAULT_USER_SETTINGS
+
+
+def forget_session_user(client_sid):
+    with _session_lock:
+        _session_settings.pop(client_sid, None)
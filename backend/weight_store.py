@@ -0,0 +1,182 @@
+# backend/weight_store.py
+# Model weights every worker process maps from the same file instead of copying
+# into its own heap. A checkpoint is converted once into torch's zipfile format next
+# to the original (`<source>.mmap.pt`), then loaded with torch.load(mmap=True) and
+# bound into the module with load_state_dict(assign=True), so the tensors stay backed
+# by page cache pages shared by all processes on the node. Needs torch >= 2.1; on
+# older versions, or for modules on a GPU, weights are loaded into the heap as before.
+# A store is reused when its sidecar fingerprint (`<store>.json`: source size and mtime,
+# torch version and a caller-supplied variant) matches, so startup never reads the
+# tensors themselves to check them.
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+
+import torch
+
+from metrics import Gauge, register, register_collector
+
+logger = logging.getLogger(__name__)
+
+MMAP_SUPPORTED = (
+    "mmap" in inspect.signature(torch.load).parameters
+    and "assign" in inspect.signature(torch.nn.Module.load_state_dict).parameters
+)
+
+PROCESS_MEMORY = register(
+    Gauge(
+        "visionaid_process_memory_bytes",
+        "Memory of this process: rss, pss (shared pages split between processes), shared, private.",
+        ("kind",),
+    )
+)
+
+
+def store_path_for(source_path, tag=""):
+    return f"{source_path}.{tag}.mmap.pt" if tag else f"{source_path}.mmap.pt"
+
+
+def store_fingerprint(source_path, variant=""):
+    """
+    What a store was built from. `variant` covers anything besides the checkpoint that
+    changes the values (e.g. a YOLO-World class list), and is stored as a hash.
+    """
+    stat = os.stat(source_path)
+    return {
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "torch": torch.__version__,
+        "variant": hashlib.sha256(str(variant).encode("utf-8")).hexdigest(),
+    }
+
+
+def _fingerprint_path(store_path):
+    return f"{store_path}.json"
+
+
+def _is_fresh(store_path, fingerprint):
+    if not os.path.exists(store_path):
+        return False
+    try:
+        with open(_fingerprint_path(store_path), encoding="utf-8") as f:
+            return json.load(f) == fingerprint
+    except (OSError, ValueError):
+        return False
+
+
+def _same_layout(shared, state_dict):
+    """Same keys, shapes and dtypes. Only reads tensor metadata, not the mmapped data."""
+    return shared.keys() == state_dict.keys() and all(
+        shared[key].shape == value.shape and shared[key].dtype == value.dtype
+        for key, value in state_dict.items()
+    )
+
+
+def _atomic_write(path, write):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    write(temp_path)
+    os.replace(temp_path, path)
+
+
+def save_weight_store(state_dict, store_path, fingerprint=None):
+    """
+    Writes the state dict atomically, so concurrently starting workers never see half
+    a file, then its fingerprint (a store without one is never reused).
+    """
+    _atomic_write(
+        store_path,
+        lambda path: torch.save(
+            {key: value.detach().cpu().contiguous() for key, value in state_dict.items()}, path
+        ),
+    )
+    if fingerprint is not None:
+        def write_fingerprint(path):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(fingerprint, f)
+
+        _atomic_write(_fingerprint_path(store_path), write_fingerprint)
+    logger.info(f"Wrote weight store {store_path}.")
+
+
+def load_weight_store(store_path):
+    return torch.load(store_path, map_location="cpu", mmap=True, weights_only=True)
+
+
+def load_state_dict_shared(source_path, convert):
+    """
+    State dict of `source_path`, mmapped. `convert(source_path)` builds the state dict
+    the slow way (into the heap) only when the store is missing or its fingerprint differs.
+    """
+    if not MMAP_SUPPORTED:
+        return convert(source_path)
+    store_path = store_path_for(source_path)
+    fingerprint = store_fingerprint(source_path)
+    if not _is_fresh(store_path, fingerprint):
+        save_weight_store(convert(source_path), store_path, fingerprint)
+    return load_weight_store(store_path)
+
+
+def share_module_weights(module, source_path, tag, variant=""):
+    """
+    Rebinds an already-loaded module's parameters and buffers to an mmapped copy, for
+    models whose loader we don't control (ultralytics). The store is rewritten when its
+    fingerprint (see store_fingerprint) or its key/shape layout differs from the module.
+    Returns True if weights are shared.
+    """
+    if not MMAP_SUPPORTED:
+        return False
+    state_dict = module.state_dict()
+    if any(value.device.type != "cpu" for value in state_dict.values()):
+        return False
+    store_path = store_path_for(source_path, tag)
+    fingerprint = store_fingerprint(source_path, variant)
+    shared = None
+    if _is_fresh(store_path, fingerprint):
+        try:
+            shared = load_weight_store(store_path)
+        except Exception as e:
+            logger.warning(f"Unreadable weight store {store_path}, rewriting it: {e}")
+        if shared is not None and not _same_layout(shared, state_dict):
+            shared = None
+    if shared is None:
+        save_weight_store(state_dict, store_path, fingerprint)
+        shared = load_weight_store(store_path)
+    module.load_state_dict(shared, assign=True)
+    return True
+
+
+def process_memory():
+    """Bytes of rss, pss, shared and private memory from /proc on Linux; peak RSS elsewhere."""
+    fields = {"Rss": "rss", "Pss": "pss", "Shared_Clean": "shared", "Shared_Dirty": "shared",
+              "Private_Clean": "private", "Private_Dirty": "private"}
+    memory = {}
+    try:
+        with open("/proc/self/smaps_rollup") as smaps:
+            for line in smaps:
+                name, _, value = line.partition(":")
+                if name in fields:
+                    kind = fields[name]
+                    memory[kind] = memory.get(kind, 0) + int(value.split()[0]) * 1024
+    except OSError:
+        try:
+            import resource  # Unix only
+        except ImportError:
+            return memory
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # Peak; KB on Linux, bytes on macOS
+        memory["max_rss"] = maxrss if os.uname().sysname == "Darwin" else maxrss * 1024
+    return memory
+
+
+def format_memory(memory):
+    return ", ".join(f"{kind} {value / 2**20:.0f} MB" for kind, value in memory.items())
+
+
+def _collect_memory_metrics():
+    for kind, value in process_memory().items():
+        PROCESS_MEMORY.set(value, kind=kind)
+
+
+register_collector(_collect_memory_metrics)